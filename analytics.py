@@ -0,0 +1,159 @@
+import datetime
+from collections import Counter
+import storage
+
+# 감정 분석용 사전 집계
+#
+# 사용자 데이터의 "emotion_stats" 키에 일/주/월별 감정 횟수와 시간대 × 감정 횟수를
+# 보관합니다. 채팅 세션이 저장되거나 감정이 바뀔 때마다 이전 값의 기여분을 빼고
+# 새 값을 더하는 방식으로 갱신하므로, 분석 페이지는 세션 수가 아닌 집계 구간 수에
+# 비례하는 데이터만 읽습니다.
+# 여러 탭의 집계가 서로 충돌하면 storage가 저장된 세션 헤더로 다시 만듭니다 (register_derived).
+
+STATS_VERSION = 2
+
+# 한국 시간대 (UTC+9, 일광 절약 시간 없음)
+KST = datetime.timezone(datetime.timedelta(hours=9), "KST")
+
+# 시간대 구분 (분석 페이지의 pd.cut 구간과 동일: [0, 6], (6, 12], (12, 18], (18, 24])
+TIME_CATEGORIES = ['새벽 (0-6시)', '오전 (6-12시)', '오후 (12-18시)', '저녁 (18-24시)']
+
+def to_kst(date_str):
+    """저장된 ISO 날짜 문자열을 한국 시간으로 변환합니다 (시간대가 없으면 UTC로 간주)."""
+    date = datetime.datetime.fromisoformat(date_str)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date.astimezone(KST)
+
+def time_category(hour):
+    """시간(0-23)을 시간대 구분으로 변환합니다."""
+    if hour <= 6:
+        return TIME_CATEGORIES[0]
+    if hour <= 12:
+        return TIME_CATEGORIES[1]
+    if hour <= 18:
+        return TIME_CATEGORIES[2]
+    return TIME_CATEGORIES[3]
+
+def empty_stats():
+    """빈 집계 데이터를 만듭니다."""
+    return {
+        "version": STATS_VERSION,
+        "total": {},
+        "daily": {},
+        "weekly": {},
+        "monthly": {},
+        "time_of_day": {},
+    }
+
+def _is_counted(session):
+    """분석 대상 세션인지 확인합니다 (날짜와 감정이 모두 있는 세션)."""
+    return bool(session and session.get("date") and session.get("emotion"))
+
+def _bucket_keys(date_str):
+    date = to_kst(date_str)
+    return {
+        "daily": date.strftime("%Y-%m-%d"),
+        # ISO 주차는 ISO 연도와 함께 사용 (12월 말/1월 초의 주가 다른 해의 1주차와 섞이지 않도록)
+        "weekly": "{}-{:02d}".format(*date.isocalendar()[:2]),
+        "monthly": f"{date.year}-{date.month:02d}",
+        "time_of_day": time_category(date.hour),
+    }
+
+def _add(counts, emotion, delta):
+    value = counts.get(emotion, 0) + delta
+    if value > 0:
+        counts[emotion] = value
+    else:
+        counts.pop(emotion, None)
+
+def _apply(stats, session, delta):
+    emotion = session["emotion"]
+    _add(stats["total"], emotion, delta)
+    for name, key in _bucket_keys(session["date"]).items():
+        bucket = stats[name].setdefault(key, {})
+        _add(bucket, emotion, delta)
+        if not bucket:
+            del stats[name][key]
+
+def update_session(stats, old_session, new_session):
+    """
+    세션 저장 시 집계를 갱신합니다.
+    old_session: 변경 전 세션 (새 세션이면 None), new_session: 변경 후 세션
+    """
+    if _is_counted(old_session):
+        _apply(stats, old_session, -1)
+    if _is_counted(new_session):
+        _apply(stats, new_session, 1)
+
+def remove_session(stats, session):
+    """세션 삭제 시 집계에서 제외합니다."""
+    update_session(stats, session, None)
+
+def build_stats(chat_sessions):
+    """전체 세션으로 집계를 새로 만듭니다."""
+    stats = empty_stats()
+    for session in chat_sessions:
+        update_session(stats, None, session)
+    return stats
+
+storage.register_derived("emotion_stats", build_stats)
+
+def ensure_stats(user_data, verify=False):
+    """
+    사용자 데이터에 최신 버전의 집계가 없으면 한 번 만들어 둡니다.
+    verify가 True이면 감정별 전체 횟수가 실제 세션과 다를 때도 다시 만듭니다
+    (여러 탭에서 동시에 저장하여 갱신이 빠진 경우, 로그인 시 확인).
+    새로 만들었으면 True를 반환하므로 호출한 쪽에서 저장하면 됩니다.
+    """
+    stats = user_data.get("emotion_stats")
+    if stats and stats.get("version") == STATS_VERSION:
+        if not verify:
+            return False
+        counted = Counter(session["emotion"] for session in user_data.get("chat_sessions", []) if _is_counted(session))
+        if stats["total"] == dict(counted):
+            return False
+    user_data["emotion_stats"] = build_stats(user_data.get("chat_sessions", []))
+    return True
+
+def get_stats(user_data):
+    """사용자 데이터의 집계를 반환합니다."""
+    ensure_stats(user_data)
+    return user_data["emotion_stats"]
+
+def period_labels(stats, period):
+    """
+    주간/월간 구간 목록을 시간순으로 반환합니다.
+    반환값: {표시 이름: 구간 키}
+    """
+    labels = {}
+    for key in sorted(stats[period]):
+        year, number = key.split("-")
+        if period == "weekly":
+            labels[f"{year}년 {int(number)}주차"] = key
+        else:
+            labels[f"{year}년 {int(number)}월"] = key
+    return labels
+
+def period_counts(stats, period, key):
+    """특정 구간의 감정별 횟수를 반환합니다."""
+    return dict(stats[period].get(key, {}))
+
+def overall_counts(stats):
+    """전체 감정별 횟수를 반환합니다."""
+    return dict(stats["total"])
+
+def time_of_day_counts(stats):
+    """시간대별 감정 횟수를 시간대 순서대로 반환합니다 (데이터가 있는 시간대만)."""
+    return {
+        category: dict(stats["time_of_day"][category])
+        for category in TIME_CATEGORIES
+        if stats["time_of_day"].get(category)
+    }
+
+def peak_time_category(stats):
+    """대화가 가장 많았던 시간대를 반환합니다."""
+    counts = time_of_day_counts(stats)
+    if not counts:
+        return None
+    return max(counts, key=lambda category: sum(counts[category].values()))
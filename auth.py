@@ -1,22 +1,30 @@
 import streamlit as st
-import yaml
-from yaml.loader import SafeLoader
 import os
-import pickle
-from pathlib import Path
 import hashlib
 import uuid
-import datetime
+import threading
+import contextlib
+import storage
+import profiling
+import write_behind
+import summarizer
+import session_store
+import credential_store
 
 # 절대 경로 설정
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
 CONFIG_PATH = os.path.join(DATA_DIR, "config.yaml")
+CREDENTIALS_DB_PATH = os.path.join(DATA_DIR, "credentials.db")
 USER_DATA_DIR = os.path.join(DATA_DIR, "user_data")
 
 # 데이터 디렉토리 생성
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(USER_DATA_DIR, exist_ok=True)
 
+# 인증 정보 (프로세스 내 모든 세션이 공유)
+_credentials = None
+_credentials_lock = threading.Lock()
+
 # 비밀번호 해싱 함수
 def hash_password(password):
     """비밀번호를 안전하게 해싱합니다."""
@@ -29,35 +37,37 @@ def check_password(hashed_password, user_password):
     return password == hashlib.sha256(salt.encode() + user_password.encode()).hexdigest()
 
 # 사용자 인증 설정
+@profiling.timed("setup_auth_seconds")
 def setup_auth():
-    # 설정 파일이 없는 경우 생성
-    config_file = Path(CONFIG_PATH)
-    if not config_file.exists():
-        # 기본 사용자 생성
-        credentials = {
-            'usernames': {
-                'guest': {
-                    'name': '게스트',
-                    'password': hash_password('guest'),
-                    'email': 'guest@example.com'
-                }
-            }
-        }
-        config = {
-            'credentials': credentials,
-            'cookie': {
-                'expiry_days': 30
-            }
-        }
-        with open(config_file, 'w') as file:
-            yaml.dump(config, file, default_flow_style=False)
+    """
+    인증 정보를 반환합니다.
+    credentials['usernames']는 사용자 이름으로 인덱싱된 데이터베이스 조회 매핑이며,
+    프로세스당 한 번만 생성되므로 재실행 시 파일 I/O가 발생하지 않습니다.
+    """
+    global _credentials
+    with _credentials_lock:
+        if _credentials is not None:
+            return _credentials
 
-    # 설정 파일 로드
-    with open(config_file) as file:
-        config = yaml.load(file, Loader=SafeLoader)
-    
-    # 인증 클래스 대신 딕셔너리 반환
-    return config['credentials']
+        # 기존 config.yaml이 있으면 데이터베이스로 한 번만 옮김
+        if os.path.exists(CONFIG_PATH):
+            credential_store.migrate_yaml(CONFIG_PATH, CREDENTIALS_DB_PATH)
+
+        # 사용자가 없는 경우 기본 사용자 생성
+        if credential_store.is_empty(CREDENTIALS_DB_PATH):
+            credential_store.add_user(CREDENTIALS_DB_PATH, 'guest', '게스트', 'guest@example.com', hash_password('guest'))
+
+        # 인증 클래스 대신 딕셔너리 반환
+        _credentials = {'usernames': credential_store.UserIndex(CREDENTIALS_DB_PATH)}
+        return _credentials
+
+def add_credentials(username, name, email, password_hash):
+    """
+    새 사용자의 인증 정보를 추가합니다.
+    이미 존재하는 사용자 이름이면 False를 반환합니다.
+    """
+    setup_auth()
+    return credential_store.add_user(CREDENTIALS_DB_PATH, username, name, email, password_hash)
 
 # 로그인 함수
 def login(credentials, username, password):
@@ -101,32 +111,13 @@ def register_user(credentials):
                 st.error("비밀번호가 일치하지 않습니다.")
                 return
                 
-            # 설정 파일 로드
-            config_file = Path(CONFIG_PATH)
             try:
-                # 사용자 이름 중복 확인
-                if username in credentials['usernames']:
+                # 새 사용자 추가 (사용자 이름 중복 확인 포함)
+                hashed_password = hash_password(password)
+                if not add_credentials(username, name, email, hashed_password):
                     st.error("이미 존재하는 사용자 이름입니다.")
                     return
                     
-                # 새 사용자 추가
-                hashed_password = hash_password(password)
-                credentials['usernames'][username] = {
-                    'name': name,
-                    'password': hashed_password,
-                    'email': email
-                }
-                
-                # 설정 파일 저장
-                with open(config_file, 'w') as file:
-                    config = {
-                        'credentials': credentials,
-                        'cookie': {
-                            'expiry_days': 30
-                        }
-                    }
-                    yaml.dump(config, file, default_flow_style=False)
-                    
                 # 사용자 데이터 초기화 및 저장
                 if create_new_user(username, name, email, hashed_password):
                     st.success("계정이 생성되었습니다. 로그인해 주세요.")
@@ -177,48 +168,135 @@ def create_new_user(username, name, email, password_hash):
         return False
 
 # 사용자 데이터 관리
+def _user_db_path(username):
+    return os.path.join(USER_DATA_DIR, f"{username}.db")
+
+def _user_lock(username):
+    """
+    사용자 데이터 기록용 잠금을 반환합니다.
+    SQLite 잠금으로 데이터베이스는 보호되고, 공유 세션 저장소를 사용하면
+    (한 호스트의 여러 프로세스) 저장소의 사용자별 잠금으로 프로세스 사이의 저장 순서도 맞춥니다.
+    """
+    store = session_store.get_store()
+    if store is None:
+        return contextlib.nullcontext()
+    return store.lock(f"{username}.data")
+
+def _write_user_data(username, data):
+    """사용자 데이터를 데이터베이스에 기록합니다. 변경된 세션과 메시지만 기록됩니다."""
+    with _user_lock(username), profiling.timer("save_user_data_seconds"):
+        written = storage.save_user(_user_db_path(username), data)
+    profiling.observe("save_user_data_bytes", written)
+
 def save_user_data(username, data):
-    """사용자 데이터를 저장합니다."""
-    user_data_path = os.path.join(USER_DATA_DIR, f"{username}.pkl")
-    with open(user_data_path, "wb") as f:
-        pickle.dump(data, f)
-
-def load_user_data(username):
-    """사용자 데이터를 로드합니다."""
-    user_data_path = os.path.join(USER_DATA_DIR, f"{username}.pkl")
+    """
+    사용자 데이터를 저장합니다.
+    짧은 시간 안의 여러 저장 요청은 하나로 모아 백그라운드에서 한 번 기록합니다 (write_behind 참고).
+    같은 사용자의 여러 탭은 각자의 데이터를 따로 기록하며, 저장소에서 서로의 변경을 합칩니다.
+    """
+    # 이전 저장에서 다른 탭의 값과 합친 항목을 먼저 반영
+    storage.apply_merged(data)
+    # 탭마다 로드한 데이터의 버전 정보에 탭 구분값을 붙여 예약 키로 사용
+    versions = data.setdefault(storage.VERSIONS_KEY, {})
+    tab = versions.setdefault("tab", uuid.uuid4().hex)
+    # 백그라운드 스레드가 기록하는 동안 이 탭이 데이터를 바꿔도 영향이 없도록 지금 복사
+    write_behind.schedule((username, tab), lambda snapshot: _write_user_data(username, snapshot), storage.freeze(data))
+
+def flush_user_data(username):
+    """예약된 사용자 데이터 저장을 바로 기록합니다 (로그아웃 시)."""
+    return write_behind.flush(username)
+
+def delete_chat_session(username, chat_id):
+    """
+    채팅 세션을 삭제합니다.
+    같은 세션을 가진 다른 탭이 저장해도 삭제된 세션은 다시 생기지 않습니다.
+    """
+    with _user_lock(username):
+        storage.delete_session(_user_db_path(username), chat_id)
+
+def emotion_events_path(username):
+    """감정 이벤트 로그 파일 경로를 반환합니다."""
+    return os.path.join(USER_DATA_DIR, f"{username}.events")
+
+def load_chat_messages(username, chat_id):
+    """채팅 세션 하나의 메시지를 로드합니다."""
+    write_behind.flush(username)
+    return storage.load_session_messages(_user_db_path(username), chat_id)
+
+def search_chat_history(username, query, limit=50):
+    """사용자의 지난 대화 내용을 검색하여 관련도 순으로 반환합니다."""
+    write_behind.flush(username)
+    return storage.search_messages(_user_db_path(username), query, limit)
+
+def summarize_chat_session(username, chat_id, emotion=None):
+    """
+    채팅 세션 하나의 요약을 계산하여 저장합니다 (요약 작업 스레드에서 실행).
+    아직 기록되지 않은 저장 요청을 먼저 기록하여 마지막 메시지까지 요약합니다.
+    """
+    write_behind.flush(username)
+    user_db_path = _user_db_path(username)
+    messages = storage.load_session_messages(user_db_path, chat_id)
+    if not messages:
+        return None
+    summary = summarizer.summarize(messages, emotion)
+    with _user_lock(username):
+        storage.save_summary(user_db_path, chat_id, summary)
+    return summary
+
+def submit_chat_summary(username, chat_id, emotion=None):
+    """끝난 채팅 세션의 요약을 백그라운드에서 계산하도록 예약합니다."""
+    if chat_id:
+        summarizer.submit((username, chat_id), summarize_chat_session, username, chat_id, emotion)
+
+def summarize_pending_sessions(username, chat_sessions):
+    """
+    요약이 없거나, 그 뒤에 메시지가 추가되었거나, 요약 형식 버전(SUMMARY_VERSION)이 다른 세션을
+    최근 것부터 SUMMARY_BACKFILL개까지 예약합니다 (로그인 시).
+    """
+    counts = storage.load_summary_counts(_user_db_path(username))
+    pending = [
+        session for session in chat_sessions
+        if counts.get(session['id']) != (
+            session.get('message_count', len(session.get('messages', []))), summarizer.SUMMARY_VERSION
+        )
+    ]
+    pending.sort(key=lambda session: session.get('date', ''), reverse=True)
+    for session in pending[:summarizer.SUMMARY_BACKFILL]:
+        submit_chat_summary(username, session['id'], session.get('emotion'))
+    return len(pending)
+
+def load_chat_summary(username, chat_id):
+    """채팅 세션의 저장된 요약을 반환합니다 (없으면 None)."""
+    summaries = storage.load_summaries(_user_db_path(username), [chat_id])
+    return summaries[0][1] if summaries else None
+
+def load_chat_memory(username, exclude_chat_id=None):
+    """새 대화에 함께 보낼 최근 대화들의 요약을 최근 것부터 반환합니다."""
+    if summarizer.MEMORY_SESSIONS <= 0:
+        return []
+    summaries = storage.load_summaries(_user_db_path(username), limit=summarizer.MEMORY_SESSIONS + 1)
+    return [summary for chat_id, summary in summaries if chat_id != exclude_chat_id][:summarizer.MEMORY_SESSIONS]
+
+@profiling.timed("load_user_data_seconds")
+def load_user_data(username, include_messages=True):
+    """
+    사용자 데이터를 로드합니다.
+    include_messages가 False이면 채팅 세션 목록(헤더)만 로드하고 메시지 본문은 제외합니다.
+    """
+    user_db_path = _user_db_path(username)
+    legacy_path = os.path.join(USER_DATA_DIR, f"{username}.pkl")
+    # 아직 기록되지 않은 저장 요청이 있으면 먼저 기록
+    write_behind.flush(username)
     try:
-        with open(user_data_path, "rb") as f:
-            data = pickle.load(f)
-            
-            # 이전 버전 데이터 구조 마이그레이션
-            if 'chat_sessions' not in data:
-                data['chat_sessions'] = []
-                
-                # 기존 채팅 기록이 있으면 새 형식으로 변환
-                if 'chat_history' in data and data['chat_history']:
-                    timestamp = datetime.datetime.now().isoformat()
-                    chat_id = f"chat_legacy_{timestamp}"
-                    
-                    emotion = None
-                    if 'emotions' in data and data['emotions']:
-                        emotion = data['emotions'][-1]
-                        
-                    chat_preview = data['chat_history'][0]['content'] if data['chat_history'] else "이전 대화"
-                    
-                    # 레거시 채팅 세션 생성
-                    chat_session = {
-                        "id": chat_id,
-                        "date": timestamp,
-                        "emotion": emotion,
-                        "preview": chat_preview,
-                        "messages": data['chat_history']
-                    }
-                    
-                    data['chat_sessions'].append(chat_session)
-            
-            return data
+        # 기존 pickle 파일이 있으면 데이터베이스로 한 번만 옮김
+        if not storage.exists(user_db_path) and os.path.exists(legacy_path):
+            with _user_lock(username):
+                storage.import_pickle(user_db_path, legacy_path)
+
+        # 이전 형식(chat_history만 있는 데이터)은 pickle을 옮기거나 데이터베이스를 처음 열 때 한 번 변환됨 (storage 참고)
+        return storage.load_user(user_db_path, include_messages=include_messages)
     except FileNotFoundError:
         # 새 사용자 데이터 초기화
         initial_data = {"chat_history": [], "emotions": [], "chat_sessions": []}
         save_user_data(username, initial_data)
-        return initial_data 
\ No newline at end of file
+        return initial_data
@@ -0,0 +1,123 @@
+"""
+저장 형식 벤치마크 (기존 pickle 파일 vs SQLite + msgpack)
+
+세션 N개 × 메시지 M개인 가상 사용자 데이터를 기존 형식(<username>.pkl, pickle.dump)으로 저장한 뒤
+storage.import_pickle로 현재 형식(SQLite, msgpack 직렬화)으로 옮겨 다음을 비교합니다.
+- 파일 크기 (데이터베이스는 검색 색인을 뺀 크기도 표시, SQLite에 dbstat이 있는 경우)
+- 전체 로드 시간 (pickle.load vs storage.load_user), 헤더만 로드, 세션 하나의 메시지 로드
+- meta 값(emotion_stats) 하나의 직렬화 크기와 역직렬화 시간 (pickle vs msgpack)
+
+데이터는 임시 디렉토리에 만들어지며 끝나면 삭제됩니다.
+
+사용법:
+    python benchmarks/bench_format.py                        # 10, 1000, 100000 세션
+    python benchmarks/bench_format.py --sessions 1000 --messages 8 --repeat 10
+"""
+import os
+import sys
+import time
+import pickle
+import shutil
+import sqlite3
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+sys.path.insert(0, ROOT)
+
+import storage
+import analytics
+from bench_paths import make_user_data, measure, pad, print_row
+
+def file_size(path):
+    """데이터베이스는 WAL 파일까지 포함한 크기를 반환합니다."""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+def index_size(db_path):
+    """검색 색인(postings)이 차지하는 크기를 반환합니다 (dbstat을 쓸 수 없으면 None)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = 'postings'"
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+def print_size(label, size, base=None):
+    ratio = f"  ({size / base * 100:5.1f}%)" if base else ""
+    print(f"  {pad(label, 34)} {size / 1024 / 1024:10.2f} MB{ratio}")
+
+def run_size(sessions, messages, args):
+    """세션 수 하나에 대해 두 형식을 비교합니다."""
+    data = make_user_data(sessions, messages, args.seed)
+    data["profile"] = {"name": "벤치마크", "email": "bench@example.com"}
+    data["emotion_stats"] = analytics.build_stats(data["chat_sessions"])
+    session_id = data["chat_sessions"][sessions // 2]["id"]
+
+    workdir = tempfile.mkdtemp(prefix="therapychat_format_")
+    try:
+        pickle_path = os.path.join(workdir, "bench.pkl")
+        db_path = os.path.join(workdir, "bench.db")
+        with open(pickle_path, "wb") as f:
+            pickle.dump(data, f)
+        pickle_size = os.path.getsize(pickle_path)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as f:
+                pickle.load(f)
+        pickle_times, pickle_peak = measure(load_pickle, repeat=args.repeat, budget=args.budget, memory=not args.no_memory)
+
+        started = time.perf_counter()
+        storage.import_pickle(db_path, pickle_path)
+        import_seconds = time.perf_counter() - started
+        db_size = file_size(db_path)
+
+        print(f"[{sessions} 세션 × {messages} 메시지]  (pickle 이전 {import_seconds:.1f}s)")
+        print_size("pickle 파일", pickle_size)
+        print_size("SQLite + msgpack", db_size, pickle_size)
+        postings_size = index_size(db_path)
+        if postings_size is not None:
+            print_size("SQLite + msgpack (검색 색인 제외)", db_size - postings_size, pickle_size)
+
+        print_row("pickle.load (전체)", pickle_times, pickle_peak)
+        for label, func in (
+            ("load_user (전체)", lambda: storage.load_user(db_path)),
+            ("load_user (헤더만)", lambda: storage.load_user(db_path, include_messages=False)),
+            ("load_session_messages (1개)", lambda: storage.load_session_messages(db_path, session_id)),
+        ):
+            times, peak = measure(func, repeat=args.repeat, budget=args.budget, memory=not args.no_memory)
+            print_row(label, times, peak)
+
+        # meta 값 하나의 직렬화 형식 비교
+        stats = data["emotion_stats"]
+        pickled = pickle.dumps(stats, protocol=pickle.HIGHEST_PROTOCOL)
+        packed = storage._pack(stats)
+        print_size("emotion_stats (pickle)", len(pickled))
+        print_size("emotion_stats (msgpack)", len(packed), len(pickled))
+        for label, func in (
+            ("emotion_stats 역직렬화 (pickle)", lambda: pickle.loads(pickled)),
+            ("emotion_stats 역직렬화 (msgpack)", lambda: storage._unpack(packed)),
+        ):
+            times, peak = measure(func, repeat=args.repeat, budget=args.budget, memory=False)
+            print_row(label, times, peak)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="저장 형식 벤치마크")
+    parser.add_argument("--sessions", default="10,1000,100000", help="측정할 세션 수 (쉼표로 구분)")
+    parser.add_argument("--messages", type=int, default=8, help="세션당 메시지 수")
+    parser.add_argument("--repeat", type=int, default=20, help="항목별 최대 반복 횟수")
+    parser.add_argument("--budget", type=float, default=10.0, help="항목별 최대 측정 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 메모리 측정 생략")
+    args = parser.parse_args()
+
+    for sessions in [int(value) for value in args.sessions.split(",")]:
+        run_size(sessions, args.messages, args)
+
+if __name__ == "__main__":
+    main()
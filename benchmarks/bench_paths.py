@@ -0,0 +1,261 @@
+"""
+저장소 / 채팅 기록 / 감정 분석 경로 벤치마크
+
+세션 N개 × 메시지 M개인 가상 사용자를 만들어 (기존 pickle 형식 파일로 저장한 뒤 첫 로드에서 옮김)
+다음 경로의 지연 시간 분위수(p50/p95/최대)와 최대 메모리 사용량(tracemalloc)을 측정합니다.
+- load_user_data / save_user_data (pickle 이전, 헤더만/전체 로드, 전체 쓰기, 변경 없는 저장)
+- save_current_chat (대화 중 메시지 추가 후 저장하는 경로)
+- 채팅 한 턴 (로컬 가짜 OpenAI 서버의 스트리밍 응답 + 저장)
+- 채팅 기록 인덱스 생성, 필터/정렬 조회, 전문 검색
+- 끝난 대화 요약 (요약 작업 스레드가 하는 일) 및 대화를 이어갈 때 보내는 컨텍스트 토큰 수
+- 감정 분석 페이지 (이벤트 로드 + 탭별 DataFrame 생성, Streamlit bare 모드로 실행)
+
+OpenAI 호출은 benchmarks/fake_openai.py 서버로 보내므로 API 키와 네트워크가 필요 없습니다.
+데이터는 임시 디렉토리에 만들어지며 끝나면 삭제됩니다. 100000 세션은 10분 이상 걸립니다 (pickle 이전과 전체 쓰기가 대부분).
+
+사용법:
+    python benchmarks/bench_paths.py                               # 10, 1000, 100000 세션
+    python benchmarks/bench_paths.py --sessions 10,1000 --messages 8 --repeat 20
+    python benchmarks/bench_paths.py --sessions 1000 --no-memory   # 메모리 측정 생략 (더 빠름)
+"""
+import os
+import sys
+import time
+import random
+import pickle
+import shutil
+import logging
+import argparse
+import datetime
+import tempfile
+import tracemalloc
+import unicodedata
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_openai
+
+EMOTION_NAMES = ["기쁨", "슬픔", "분노", "불안", "스트레스", "외로움", "후회", "좌절", "혼란", "감사"]
+
+# 가상 메시지를 만들 단어
+WORDS = (
+    "오늘 어제 내일 회사 학교 친구 가족 엄마 아빠 동생 시험 과제 발표 회의 상사 동료 "
+    "마음 기분 생각 걱정 불안 우울 행복 피곤 잠 밥 운동 산책 주말 여행 비 날씨 "
+    "정말 너무 조금 계속 다시 갑자기 그냥 많이 힘들어요 괜찮아요 모르겠어요 싶어요 했어요 같아요"
+).split()
+
+def make_message(rng, role):
+    return {"role": role, "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24)))}
+
+def make_user_data(sessions, messages, seed=0):
+    """
+    앱과 같은 구조의 사용자 데이터를 만듭니다.
+    세션은 최근 2년 사이에 무작위로 흩어져 있고 날짜순으로 저장됩니다.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    chat_sessions = []
+    for i in range(sessions):
+        date = (start + datetime.timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))).isoformat()
+        chat_messages = [make_message(rng, "user" if j % 2 == 0 else "assistant") for j in range(messages)]
+        chat_sessions.append({
+            "id": f"chat_{date}_{i}",
+            "date": date,
+            "emotion": rng.choice(EMOTION_NAMES),
+            "preview": chat_messages[0]["content"] if chat_messages else "새로운 대화",
+            "messages": chat_messages,
+        })
+    chat_sessions.sort(key=lambda session: session["date"])
+    return {
+        "chat_history": [],
+        "emotions": [session["emotion"] for session in chat_sessions],
+        "chat_sessions": chat_sessions,
+    }
+
+def measure(func, setup=None, repeat=10, budget=10.0, memory=True):
+    """
+    func를 최대 repeat번 실행하여 실행 시간 목록과 최대 메모리(바이트)를 반환합니다.
+    budget초가 지나면 repeat번을 채우지 않아도 멈춥니다 (최소 1번). setup은 시간 측정에서 제외합니다.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - started < budget):
+        if setup:
+            setup()
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return times, peak
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def pad(text, width):
+    """한글처럼 두 칸을 차지하는 글자를 고려하여 오른쪽을 공백으로 채웁니다."""
+    display_width = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    return text + " " * max(width - display_width, 0)
+
+def print_row(label, times, peak):
+    print(
+        f"  {pad(label, 34)} n={len(times):<3} p50 {percentile(times, 0.5) * 1000:9.2f} ms  "
+        f"p95 {percentile(times, 0.95) * 1000:9.2f} ms  max {max(times) * 1000:9.2f} ms  "
+        f"peak {'-' if peak is None else f'{peak / 1024 / 1024:8.2f} MB'}"
+    )
+
+def run_size(sessions, messages, args):
+    """세션 수 하나에 대해 모든 경로를 측정합니다."""
+    import streamlit as st
+    import auth
+    import analytics
+    import emotion_events
+    import chatbot
+    import context_builder
+    from history_index import HistoryIndex
+    from views import common, analysis
+
+    username = f"bench_{sessions}"
+    options = {"repeat": args.repeat, "budget": args.budget, "memory": not args.no_memory}
+
+    def run(label, func, setup=None, **overrides):
+        times, peak = measure(func, setup, **dict(options, **overrides))
+        print_row(label, times, peak)
+
+    t = time.perf_counter()
+    user_data = make_user_data(sessions, messages, args.seed)
+    print(f"[{sessions} 세션 × {messages} 메시지]  (데이터 생성 {time.perf_counter() - t:.1f}s)")
+
+    # 기존 pickle 형식 파일을 첫 로드에서 데이터베이스로 옮기는 경로 (매번 새 사용자 이름 사용)
+    legacy = {"count": 0}
+    def prepare_legacy():
+        legacy["count"] += 1
+        legacy["name"] = f"{username}_legacy{legacy['count']}"
+        with open(os.path.join(auth.USER_DATA_DIR, f"{legacy['name']}.pkl"), "wb") as f:
+            pickle.dump(user_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    run("load_user_data (pickle 이전)", lambda: auth.load_user_data(legacy["name"], include_messages=False),
+        prepare_legacy, repeat=min(args.repeat, 3))
+    os.replace(auth._user_db_path(legacy["name"]), auth._user_db_path(username))
+    for name in os.listdir(auth.USER_DATA_DIR):
+        if "_legacy" in name:
+            os.remove(os.path.join(auth.USER_DATA_DIR, name))
+
+    # 빈 데이터베이스에 전체 쓰기
+    fresh = {"count": 0}
+    def prepare_fresh():
+        fresh["count"] += 1
+    run("save_user_data (전체 쓰기)", lambda: auth.save_user_data(f"{username}_fresh{fresh['count']}", user_data),
+        prepare_fresh, repeat=min(args.repeat, 3))
+    for name in os.listdir(auth.USER_DATA_DIR):
+        if "_fresh" in name:
+            os.remove(os.path.join(auth.USER_DATA_DIR, name))
+
+    run("load_user_data (헤더만)", lambda: auth.load_user_data(username, include_messages=False))
+    run("load_user_data (전체)", lambda: auth.load_user_data(username))
+
+    # 로그인 직후 상태 (앱과 같이 헤더만 로드하고 집계/이벤트 로그 준비)
+    headers = auth.load_user_data(username, include_messages=False)
+    run("로그인 준비 (집계 + 이벤트 로그)", lambda: (
+        headers.pop("emotion_stats", None),
+        analytics.ensure_stats(headers),
+        emotion_events.rebuild(auth.emotion_events_path(username), headers["chat_sessions"]),
+    ))
+    auth.save_user_data(username, headers)
+    run("save_user_data (변경 없음)", lambda: auth.save_user_data(username, headers))
+
+    run("채팅 기록 인덱스 생성", lambda: HistoryIndex(headers["chat_sessions"]))
+    index = HistoryIndex(headers["chat_sessions"])
+    st.session_state.history_index = index
+    run("채팅 기록 조회 (전체, 1쪽)", lambda: index.query(offset=0, limit=20))
+    run("채팅 기록 조회 (감정 3개 + 날짜)", lambda: index.query(
+        emotions=EMOTION_NAMES[:3],
+        start=datetime.datetime(2024, 6, 1),
+        end=datetime.datetime(2025, 6, 1),
+        offset=20,
+        limit=20,
+    ))
+    run("채팅 기록 검색", lambda: auth.search_chat_history(username, "회사 걱정", 200))
+
+    # 대화 중 저장 경로 (save_current_chat): 매번 메시지 두 개를 추가하고 저장
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.user_data = headers
+    st.session_state.selected_emotion = "불안"
+    st.session_state.messages = [
+        {"role": "system", "content": chatbot.get_system_prompt("불안")},
+        {"role": "assistant", "content": "안녕하세요. 오늘은 어떤 감정을 느끼고 계신가요?"},
+    ]
+    st.session_state.pop("current_chat_id", None)
+    rng = random.Random(args.seed)
+    def add_turn():
+        st.session_state.messages.append(make_message(rng, "user"))
+        st.session_state.messages.append(make_message(rng, "assistant"))
+    run("save_current_chat", common.save_current_chat, add_turn)
+
+    # 채팅 한 턴 (가짜 OpenAI 서버에서 스트리밍 응답을 받은 뒤 저장)
+    # openai 모듈은 첫 호출 때 로드되므로 측정 전에 한 번 호출
+    "".join(chatbot.get_ai_response_stream(st.session_state.messages, api_key="bench"))
+    def chat_turn():
+        st.session_state.messages.append(make_message(rng, "user"))
+        reply = "".join(chatbot.get_ai_response_stream(st.session_state.messages, api_key="bench"))
+        st.session_state.messages.append({"role": "assistant", "content": reply})
+        common.save_current_chat()
+    run("채팅 한 턴 (가짜 OpenAI)", chat_turn)
+
+    # 방금 대화한 세션의 요약 (작업 스레드에서 하는 일을 직접 실행)
+    chat_id = st.session_state.current_chat_id
+    run("대화 요약 (세션 1개)", lambda: auth.summarize_chat_session(username, chat_id, "불안"))
+    summary = auth.load_chat_summary(username, chat_id)
+    resumed = st.session_state.messages + [make_message(rng, "user")]
+    for label, stored_summary in (("요약 없음", None), ("저장된 요약", summary)):
+        context = context_builder.build_context(resumed, "불안", summary_cache={}, stored_summary=stored_summary)
+        tokens = sum(context_builder.message_tokens(message) for message in context)
+        print(f"  {pad(f'이어가기 컨텍스트 ({label})', 34)} {tokens:10d} 토큰  (메시지 {len(resumed)}개)")
+
+    # 감정 분석 페이지 (Streamlit bare 모드에서 화면 출력 없이 실행)
+    run("감정 분석 페이지", analysis.render)
+
+def main():
+    parser = argparse.ArgumentParser(description="저장소/채팅 기록/감정 분석 경로 벤치마크")
+    parser.add_argument("--sessions", default="10,1000,100000", help="측정할 세션 수 (쉼표로 구분)")
+    parser.add_argument("--messages", type=int, default=8, help="세션당 메시지 수")
+    parser.add_argument("--repeat", type=int, default=20, help="경로별 최대 반복 횟수")
+    parser.add_argument("--budget", type=float, default=10.0, help="경로별 최대 측정 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc 메모리 측정 생략")
+    args = parser.parse_args()
+
+    # 가짜 OpenAI 서버를 먼저 띄우고, 앱 모듈을 가져오기 전에 환경 변수를 설정
+    server, api_base = fake_openai.start()
+    os.environ["OPENAI_API_BASE"] = api_base
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["RESPONSE_CACHE"] = "off"
+    os.environ["PROFILING"] = "off"
+    # 저장 경로의 실제 기록 비용을 재도록 쓰기 지연 없이 바로 기록
+    os.environ["WRITE_BEHIND_DELAY"] = "0"
+
+    # Streamlit bare 모드 경고(ScriptRunContext 없음, 사용 중단 안내) 숨김
+    logging.disable(logging.WARNING)
+    import auth
+
+    data_dir = tempfile.mkdtemp(prefix="bench_paths_")
+    auth.USER_DATA_DIR = data_dir
+    try:
+        for sessions in [int(value) for value in args.sessions.split(",")]:
+            run_size(sessions, args.messages, args)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
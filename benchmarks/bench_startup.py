@@ -0,0 +1,107 @@
+"""
+콜드 스타트 / 재실행 시간 벤치마크
+
+로그인 화면과 채팅 화면을 Streamlit AppTest로 실행하여 다음을 측정합니다.
+- cold: 새 프로세스에서 첫 실행까지 걸린 시간 (모듈 임포트 포함)
+- rerun: 같은 세션에서 다시 실행할 때의 중앙값
+- heavy: 실행 후 로드되어 있는 무거운 라이브러리 (numpy, pandas, openai, yaml)
+
+사용법:
+    python benchmarks/bench_startup.py                  # 현재 작업 트리
+    python benchmarks/bench_startup.py --compare HEAD~1 # 지정한 git 리비전과 비교
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행할 측정 코드 (앱 디렉토리에서 실행)
+CHILD = r"""
+import sys, time, json, statistics
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+page, reruns = sys.argv[1], int(sys.argv[2])
+at = AppTest.from_file("app.py", default_timeout=120)
+if page != "login":
+    at.session_state.logged_in = True
+    at.session_state.username = "bench_startup"
+    at.session_state.user_data = {"chat_sessions": []}
+    at.session_state.active_page = page
+    at.session_state.selected_emotion = "기쁨"
+    at.session_state.messages = [
+        {"role": "system", "content": "system"},
+        {"role": "assistant", "content": "안녕하세요. 오늘은 어떤 감정을 느끼고 계신가요?"},
+    ]
+at.run()
+cold = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(f"{page}: {at.exception[0].value}")
+
+times = []
+for _ in range(reruns):
+    t = time.perf_counter()
+    at.run()
+    times.append(time.perf_counter() - t)
+
+print(json.dumps({
+    "cold": cold,
+    "rerun": statistics.median(times),
+    "heavy": [name for name in ("numpy", "pandas", "openai", "yaml") if name in sys.modules],
+}))
+"""
+
+PAGES = ("login", "chat")
+
+def measure(app_dir, page, reruns):
+    """새 프로세스에서 한 페이지를 측정합니다."""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, page, str(reruns)],
+        cwd=app_dir, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_tree(app_dir, repeat, reruns):
+    """페이지별로 repeat번 측정하여 콜드 스타트는 최솟값, 재실행은 중앙값의 최솟값을 사용합니다."""
+    results = {}
+    for page in PAGES:
+        runs = [measure(app_dir, page, reruns) for _ in range(repeat)]
+        results[page] = {
+            "cold": min(run["cold"] for run in runs),
+            "rerun": min(run["rerun"] for run in runs),
+            "heavy": runs[0]["heavy"],
+        }
+    return results
+
+def export_revision(revision, target):
+    """git 리비전의 파일을 임시 디렉토리에 풉니다."""
+    archive = subprocess.run(["git", "archive", revision], cwd=ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+
+def print_results(label, results):
+    print(f"[{label}]")
+    for page, result in results.items():
+        print(
+            f"  {page:<6} cold {result['cold'] * 1000:8.1f} ms   rerun {result['rerun'] * 1000:7.1f} ms   "
+            f"heavy: {', '.join(result['heavy']) or '-'}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="로그인/채팅 화면 콜드 스타트와 재실행 시간 측정")
+    parser.add_argument("--compare", metavar="REV", help="비교할 git 리비전 (예: HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=3, help="페이지별 프로세스 실행 횟수")
+    parser.add_argument("--reruns", type=int, default=10, help="프로세스당 재실행 횟수")
+    args = parser.parse_args()
+
+    if args.compare:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            export_revision(args.compare, temp_dir)
+            print_results(args.compare, measure_tree(temp_dir, args.repeat, args.reruns))
+    print_results("working tree", measure_tree(ROOT, args.repeat, args.reruns))
+
+if __name__ == "__main__":
+    main()
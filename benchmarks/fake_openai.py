@@ -0,0 +1,125 @@
+"""
+로컬 가짜 OpenAI 서버
+
+/v1/chat/completions 요청에 고정된 답변을 돌려주는 HTTP 서버입니다.
+stream=true 요청에는 SSE(server-sent events) 형식으로 토큰 단위 청크를 보냅니다.
+fail_after를 지정하면 그 수만큼 토큰을 보낸 뒤 종료 청크 없이 연결을 끊습니다 (스트리밍 도중 오류 시험용).
+OPENAI_API_BASE를 이 서버 주소로 지정하면 실제 API 키와 네트워크 없이 앱과 벤치마크를 실행할 수 있습니다.
+
+사용법:
+    python benchmarks/fake_openai.py --port 8000 --latency 0.2
+    OPENAI_API_BASE=http://127.0.0.1:8000/v1 streamlit run app.py
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 기본 답변 (감정 분석 요청에는 감정 이름만 답함)
+REPLY = "그런 마음이 드셨군요. 조금 더 이야기해 주시면 함께 생각해 볼게요."
+EMOTION_REPLY = "불안"
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """채팅 완성 API를 흉내 내는 요청 처리기"""
+
+    protocol_version = "HTTP/1.1"
+    # 작은 SSE 청크가 Nagle 알고리즘 때문에 지연되지 않도록 설정
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # keep-alive 재사용을 확인할 수 있도록 새 연결 수를 셈
+        with self.server.connections_lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+
+        time.sleep(self.server.latency)
+        messages = request.get("messages", [])
+        system = messages[0].get("content", "") if messages else ""
+        reply = EMOTION_REPLY if "감정" in system and request.get("max_tokens", 0) <= 50 else REPLY
+        tokens = list(reply)
+        usage = {"prompt_tokens": sum(len(m.get("content", "")) for m in messages),
+                 "completion_tokens": len(tokens)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, token in enumerate(tokens):
+                if self.server.fail_after is not None and index >= self.server.fail_after:
+                    self.close_connection = True
+                    return
+                self._send_chunk({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+                if self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+            self._send_chunk({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_chunk(self, body):
+        body = dict(body, id="chatcmpl-fake", object="chat.completion.chunk")
+        self._write_chunk(b"data: " + json.dumps(body, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+def start(port=0, latency=0.0, token_delay=0.0, fail_after=None):
+    """
+    가짜 서버를 백그라운드 스레드에서 시작하고 (서버, API 주소)를 반환합니다.
+    port=0이면 비어 있는 포트를 사용합니다. 서버의 fail_after 속성은 실행 중에 바꿀 수 있습니다.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_delay = token_delay
+    server.fail_after = fail_after
+    server.connections = 0
+    server.connections_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 가짜 OpenAI 서버")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="첫 응답까지 지연 (초)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="스트리밍 토큰 사이 지연 (초)")
+    args = parser.parse_args()
+
+    server, api_base = start(args.port, args.latency, args.token_delay)
+    print(f"OPENAI_API_BASE={api_base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,23 @@
 import os
-import openai
+import time
+import logging
 import streamlit as st
+import openai_client
+import emotion_classifier
+import response_cache
+import profiling
+from emotions import EMOTIONS
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 
 # 환경 변수 로드
 load_dotenv()
 
-# 감정 목록
-EMOTIONS = {
-    "기쁨": "행복하고 즐거운 상태",
-    "슬픔": "마음이 아프고 우울한 상태",
-    "분노": "화가 나고 짜증이 나는 상태",
-    "불안": "걱정이 많고 초조한 상태",
-    "스트레스": "압박감과 중압감을 느끼는 상태",
-    "외로움": "혼자라고 느끼는 상태",
-    "후회": "과거의 선택이나 행동에 대해 아쉬움을 느끼는 상태",
-    "좌절": "목표 달성에 실패하고 실망한 상태",
-    "혼란": "명확한 방향이나 생각을 잡지 못하는 상태",
-    "감사": "고마움을 느끼는 상태"
-}
+# 응답 생성에 실패했을 때 대신 표시하고 저장하는 답변
+ERROR_REPLY = "죄송합니다. 응답을 생성하는 중에 문제가 발생했습니다. 잠시 후 다시 시도해주세요."
+
+class ResponseInterrupted(Exception):
+    """스트리밍 응답이 일부를 보낸 뒤 실패했을 때 발생합니다 (args[0]: 이미 보낸 내용)."""
 
 # AI 원칙 (시스템 프롬프트에서는 직접 사용하지 않지만 참조용으로 보존)
 _AI_PRINCIPLES = """
@@ -49,25 +48,97 @@ def get_system_prompt(emotion=None):
     
     return base_prompt
 
-def get_ai_response(messages):
+def _record_usage(call, response):
+    """응답의 토큰 사용량을 프로파일에 기록합니다."""
+    usage = response.get("usage") or {}
+    if usage.get("completion_tokens") is not None:
+        profiling.observe("openai_completion_tokens", usage["completion_tokens"], call=call)
+    if usage.get("total_tokens") is not None:
+        profiling.observe("openai_total_tokens", usage["total_tokens"], call=call)
+
+def _resolve_api_key(api_key=None):
+    """요청에 사용할 API 키를 결정합니다 (전역 openai.api_key는 변경하지 않음)."""
+    if api_key:
+        return api_key
+    return st.session_state.get("api_key") or os.getenv("OPENAI_API_KEY", "")
+
+def get_ai_response(messages, api_key=None):
     """
     OpenAI API를 사용하여 AI 응답을 생성합니다.
     """
+    # 캐시된 응답이 있으면 API 호출 생략
+    cache_key = response_cache.chat_key(messages, st.session_state.get("username"))
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        # API 키 사용
-        openai.api_key = st.session_state.api_key
-        
-        # openai 0.28.0 버전용 API 호출 방식
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
+        # 공용 클라이언트로 호출 (타임아웃 및 재시도 포함)
+        with profiling.timer("openai_request_seconds", call="chat"):
+            response = openai_client.chat_completion(
+                messages,
+                api_key=_resolve_api_key(api_key),
+                temperature=0.7,
+                max_tokens=1000
+            )
+        _record_usage("chat", response)
+        content = response.choices[0].message.content
+        response_cache.put(cache_key, content)
+        return content
+    except Exception as e:
+        st.error(f"AI 응답 생성 중 오류가 발생했습니다: {e}")
+        return ERROR_REPLY
+
+def get_ai_response_stream(messages, api_key=None):
+    """
+    OpenAI API 응답을 토큰 단위로 생성하는 제너레이터입니다.
+    st.write_stream에 전달하여 응답을 점진적으로 표시할 수 있습니다.
+    첫 토큰 전에 실패하면 ERROR_REPLY를 생성하고, 일부를 보낸 뒤 실패하면
+    사과 문구를 이어 붙이지 않고 ResponseInterrupted를 발생시킵니다 (호출한 쪽에서 일부 응답을 버림).
+    """
+    # 캐시된 응답이 있으면 API 호출 없이 바로 반환
+    cache_key = response_cache.chat_key(messages, st.session_state.get("username"))
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    try:
+        # 공용 클라이언트로 스트리밍 호출
+        start = time.perf_counter()
+        response = openai_client.chat_completion(
+            messages,
+            api_key=_resolve_api_key(api_key),
             temperature=0.7,
-            max_tokens=1000
+            max_tokens=1000,
+            stream=True
         )
-        return response.choices[0].message.content
+        parts = []
+        for chunk in response:
+            delta = chunk.choices[0].delta.get("content")
+            if delta:
+                if not parts:
+                    profiling.observe("openai_ttft_seconds", time.perf_counter() - start, call="chat_stream")
+                parts.append(delta)
+                yield delta
+        # 스트리밍 응답에는 사용량이 없으므로 내용이 있는 청크 수를 출력 토큰 수로 기록
+        profiling.observe("openai_request_seconds", time.perf_counter() - start, call="chat_stream")
+        profiling.observe("openai_completion_tokens", len(parts), call="chat_stream")
+        # 스트림이 끝까지 완료된 응답만 캐시에 저장
+        response_cache.put(cache_key, "".join(parts))
     except Exception as e:
         st.error(f"AI 응답 생성 중 오류가 발생했습니다: {e}")
-        return "죄송합니다. 응답을 생성하는 중에 문제가 발생했습니다. 잠시 후 다시 시도해주세요."
+        if parts:
+            raise ResponseInterrupted("".join(parts)) from e
+        yield ERROR_REPLY
+
+# 채팅 화면에 기본으로 표시할 최근 메시지 수 ("이전 메시지 보기"로 같은 수만큼 늘어남)
+CHAT_RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "50"))
+
+# 메시지 순번(seq)은 st.session_state.messages 안의 위치입니다. 한 대화 안에서 메시지는
+# 뒤에 추가되기만 하므로 순번은 단조 증가하며, 내용이 같은 메시지도 서로 구분됩니다.
+# st.session_state.rendered_seq는 이번 실행에서 화면에 그린 마지막 순번(high-water mark)으로,
+# 대화 입력 처리 중 새로 추가된 메시지만 이어서 그릴 때 사용합니다.
 
 def initialize_chat_history():
     """
@@ -75,52 +146,73 @@ def initialize_chat_history():
     """
     if "messages" not in st.session_state:
         st.session_state.messages = []
-        
-    # 채팅 페이지에 처음 접속할 때만 displayed_messages 초기화
-    if st.session_state.get('active_page') == "chat" and "displayed_messages" not in st.session_state:
-        st.session_state.displayed_messages = []
+    if "chat_render_window" not in st.session_state:
+        st.session_state.chat_render_window = CHAT_RENDER_WINDOW
+
+def reset_chat_rendering():
+    """
+    다른 대화로 바뀔 때 표시 범위를 기본값으로 되돌립니다.
+    """
+    st.session_state.chat_render_window = CHAT_RENDER_WINDOW
+    st.session_state.rendered_seq = -1
 
 def add_message(role, content):
     """
-    메시지를 채팅 기록에 추가합니다.
+    메시지를 채팅 기록에 추가하고 순번을 반환합니다.
     """
     st.session_state.messages.append({"role": role, "content": content})
+    return len(st.session_state.messages) - 1
+
+def _render_message(message):
+    if message["role"] in ("user", "assistant"):
+        st.chat_message(message["role"]).write(message["content"])
 
 def display_chat_history():
     """
     채팅 기록을 표시합니다.
+    최근 chat_render_window개의 메시지만 그리고, 그보다 오래된 메시지는 버튼으로 불러옵니다.
     """
-    # 표시할 메시지들
-    messages_to_display = []
+    messages = st.session_state.messages
+    window = st.session_state.get("chat_render_window", CHAT_RENDER_WINDOW)
+    start = max(len(messages) - window, 0)
     
-    # 세션 상태에서 메시지 가져오기
-    for message in st.session_state.messages:
-        if message["role"] in ["user", "assistant"]:
-            messages_to_display.append(message)
+    # 표시 범위 밖의 이전 메시지
+    hidden = start
+    if start and messages[0]["role"] == "system":
+        hidden -= 1
+    if hidden:
+        if st.button(f"이전 메시지 보기 ({hidden}개)", key="show_earlier_messages"):
+            st.session_state.chat_render_window = window + CHAT_RENDER_WINDOW
+            st.rerun()
     
-    # 첫 로드 시에만 메시지 표시 (중복 표시 방지)
-    if "displayed_messages" not in st.session_state:
-        st.session_state.displayed_messages = []
-    
-    # 아직 표시되지 않은 메시지만 표시
-    for message in messages_to_display:
-        # 메시지 ID 생성 (내용과 역할 기반)
-        msg_id = f"{message['role']}_{hash(message['content'])}"
-        
-        if msg_id not in st.session_state.displayed_messages:
-            if message["role"] == "user":
-                st.chat_message("user").write(message["content"])
-            else:  # assistant
-                st.chat_message("assistant").write(message["content"])
-                
-            # 표시된 메시지 기록
-            st.session_state.displayed_messages.append(msg_id)
+    for seq in range(start, len(messages)):
+        _render_message(messages[seq])
+    st.session_state.rendered_seq = len(messages) - 1
+
+def display_new_messages():
+    """
+    이번 실행에서 아직 그리지 않은 메시지(rendered_seq 이후)만 표시합니다.
+    """
+    messages = st.session_state.messages
+    for seq in range(st.session_state.get("rendered_seq", -1) + 1, len(messages)):
+        _render_message(messages[seq])
+    mark_rendered(len(messages) - 1)
+
+def mark_rendered(seq):
+    """
+    다른 방법(스트리밍 등)으로 이미 화면에 그린 메시지의 순번을 기록합니다.
+    """
+    st.session_state.rendered_seq = max(st.session_state.get("rendered_seq", -1), seq)
 
 def start_new_chat(emotion=None):
     """
     새 채팅을 시작합니다.
     """
     st.session_state.messages = []
+    reset_chat_rendering()
+    # 이어가던 대화의 요약과 이전 대화의 기억 제거 (기억은 첫 응답 때 다시 로드)
+    st.session_state.pop("chat_summary", None)
+    st.session_state.pop("chat_memory", None)
     system_prompt = get_system_prompt(emotion)
     st.session_state.messages.append({"role": "system", "content": system_prompt})
     
@@ -133,35 +225,152 @@ def start_new_chat(emotion=None):
     add_message("assistant", greeting_message)
     return greeting_message
 
-def analyze_emotion(text):
+# 감정 분석용 시스템 프롬프트
+EMOTION_ANALYSIS_PROMPT = "당신은 텍스트에서 감정을 분석하는 전문가입니다. 주어진 텍스트에서 주요 감정을 파악하여 '기쁨', '슬픔', '분노', '불안', '스트레스', '외로움', '후회', '좌절', '혼란', '감사' 중 하나만 선택하여 응답하세요. 다른 말은 덧붙이지 말고 감정 단어 하나만 응답하세요."
+
+# 채팅 응답과 동시에 사용자 메시지의 감정을 태그하는 방식
+# - off: 태그하지 않음
+# - local: 로컬 분류기의 확신도가 충분할 때만 태그 (기본값, API를 호출하지 않음)
+# - llm: 확신도가 낮으면 LLM으로 다시 분석 (메시지마다 API 호출이 하나 늘 수 있음)
+MESSAGE_EMOTION_TAGGING = os.getenv("MESSAGE_EMOTION_TAGGING", "local")
+
+# 응답 완료 후 감정 분석 결과를 기다리는 최대 시간 (초)
+EMOTION_RESULT_TIMEOUT = float(os.getenv("EMOTION_RESULT_TIMEOUT", "5"))
+
+logger = logging.getLogger(__name__)
+
+def _emotion_request(text):
+    return [
+        {"role": "system", "content": EMOTION_ANALYSIS_PROMPT},
+        {"role": "user", "content": text}
+    ]
+
+def _parse_emotion(content):
+    """모델 응답에서 감정 목록에 있는 감정을 찾습니다."""
+    detected_emotion = content.strip()
+    for emotion in EMOTIONS.keys():
+        if emotion in detected_emotion:
+            return emotion
+    return None
+
+def _emotion_cache_key(text):
+    return response_cache.make_key("emotion", EMOTION_ANALYSIS_PROMPT, [{"role": "user", "content": text}])
+
+def _analyze_emotion_llm(text, api_key):
+    """LLM으로 텍스트의 감정을 분석합니다. 같은 텍스트의 결과는 캐시에서 가져옵니다."""
+    cache_key = _emotion_cache_key(text)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with profiling.timer("openai_request_seconds", call="emotion"):
+        response = openai_client.chat_completion(
+            _emotion_request(text),
+            api_key=api_key,
+            temperature=0.3,
+            max_tokens=50
+        )
+    _record_usage("emotion", response)
+    emotion = _parse_emotion(response.choices[0].message.content)
+    response_cache.put(cache_key, emotion)
+    return emotion
+
+def analyze_emotion(text, api_key=None):
     """
     텍스트에서 감정을 분석합니다.
+    로컬 분류기를 먼저 사용하고, 확신도가 낮을 때만 LLM을 호출합니다.
     """
+    emotion, confidence = emotion_classifier.classify(text)
+    if emotion_classifier.is_confident(confidence):
+        return emotion
+
+    api_key = _resolve_api_key(api_key)
+    if not api_key:
+        return emotion
+
     try:
-        # API 키 사용
-        openai.api_key = st.session_state.api_key
-        
-        messages = [
-            {"role": "system", "content": "당신은 텍스트에서 감정을 분석하는 전문가입니다. 주어진 텍스트에서 주요 감정을 파악하여 '기쁨', '슬픔', '분노', '불안', '스트레스', '외로움', '후회', '좌절', '혼란', '감사' 중 하나만 선택하여 응답하세요. 다른 말은 덧붙이지 말고 감정 단어 하나만 응답하세요."},
-            {"role": "user", "content": text}
-        ]
-        
-        # openai 0.28.0 버전용 API 호출 방식
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
+        return _analyze_emotion_llm(text, api_key) or emotion
+    except Exception as e:
+        st.error(f"감정 분석 중 오류가 발생했습니다: {e}")
+        return emotion
+
+async def analyze_emotion_async(text, api_key):
+    """
+    LLM 감정 분석의 asyncio 버전입니다.
+    Streamlit 스크립트 밖(공용 이벤트 루프)에서 실행되므로 오류는 호출한 쪽에서 처리합니다.
+    """
+    cache_key = _emotion_cache_key(text)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with profiling.timer("openai_request_seconds", call="emotion_async"):
+        response = await openai_client.achat_completion(
+            _emotion_request(text),
+            api_key=api_key,
             temperature=0.3,
             max_tokens=50
         )
-        
-        detected_emotion = response.choices[0].message.content.strip()
-        
-        # 감정 목록에 있는지 확인
-        for emotion in EMOTIONS.keys():
-            if emotion in detected_emotion:
-                return emotion
-        
+    _record_usage("emotion_async", response)
+    emotion = _parse_emotion(response.choices[0].message.content)
+    response_cache.put(cache_key, emotion)
+    return emotion
+
+async def _analyze_with_fallback(text, api_key, local_emotion):
+    try:
+        return await analyze_emotion_async(text, api_key) or local_emotion
+    except Exception as e:
+        logger.warning("감정 분석 오류: %s", e)
+        return local_emotion
+
+def start_emotion_analysis(text, api_key=None, use_llm=True):
+    """
+    감정 분석을 시작하고 Future를 반환합니다.
+    로컬 분류기의 확신도가 충분하면 즉시 완료된 Future를, 아니면 공용 이벤트 루프에서
+    LLM 분석을 실행합니다. 채팅 응답 생성과 동시에 실행되므로 한 턴의 지연 시간은
+    두 호출 중 긴 쪽이 됩니다.
+    use_llm이 False이면 LLM을 호출하지 않고, 확신도가 낮으면 None을 결과로 합니다.
+    """
+    emotion, confidence = emotion_classifier.classify(text)
+    confident = emotion_classifier.is_confident(confidence)
+    api_key = _resolve_api_key(api_key) if use_llm else None
+    if confident or not api_key:
+        future = Future()
+        future.set_result(emotion if confident or use_llm else None)
+        return future
+    return openai_client.submit(_analyze_with_fallback(text, api_key, emotion))
+
+def analyze_emotions(texts, api_key=None):
+    """
+    여러 텍스트의 감정을 한 번에 분석합니다.
+    로컬 분류기로 일괄 분류한 뒤 확신도가 낮은 텍스트만 LLM으로 동시에 분석합니다.
+    """
+    texts = list(texts)
+    results = emotion_classifier.classify_batch(texts)
+    api_key = _resolve_api_key(api_key)
+
+    emotions = [emotion for emotion, _ in results]
+    if not api_key:
+        return emotions
+
+    pending = {
+        i: openai_client.submit(_analyze_with_fallback(texts[i], api_key, emotion))
+        for i, (emotion, confidence) in enumerate(results)
+        if not emotion_classifier.is_confident(confidence)
+    }
+    for i, future in pending.items():
+        emotions[i] = collect_emotion(future)
+    return emotions
+
+def collect_emotion(future, timeout=EMOTION_RESULT_TIMEOUT):
+    """start_emotion_analysis의 결과를 가져옵니다. 실패하거나 시간이 초과되면 None을 반환합니다."""
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        logger.warning("감정 분석 결과 대기 시간 초과 (%s초)", timeout)
         return None
     except Exception as e:
-        st.error(f"감정 분석 중 오류가 발생했습니다: {e}")
-        return None 
\ No newline at end of file
+        future.cancel()
+        logger.warning("감정 분석 오류: %s", e)
+        return None
\ No newline at end of file
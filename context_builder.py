@@ -0,0 +1,186 @@
+import os
+import summarizer
+from chatbot import get_system_prompt
+
+# API에 보낼 대화 컨텍스트의 최대 토큰 수 (응답용 max_tokens 1000 제외)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# 오래된 대화를 요약한 메시지에 할당하는 최대 토큰 수
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "400"))
+
+# 메시지 하나당 역할/구분자에 붙는 대략적인 토큰 수
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 요약에 포함되는 메시지 한 건의 최대 길이
+SUMMARY_LINE_CHARS = 80
+
+# 지난 대화를 이어갈 때 저장된 요약과 함께 그대로 보낼 마지막 메시지 수
+RESUME_RECENT_MESSAGES = int(os.getenv("RESUME_RECENT_MESSAGES", "6"))
+
+# 새 대화에 함께 보내는 지난 대화 기억(최근 대화 요약)의 최대 토큰 수
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+
+ROLE_LABELS = {
+    "user": "사용자",
+    "assistant": "상담사"
+}
+
+def estimate_tokens(text):
+    """
+    텍스트의 토큰 수를 로컬에서 추정합니다.
+    영문/숫자는 약 4글자당 1토큰, 한글 등 비ASCII 문자는 1글자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def message_tokens(message):
+    """메시지 하나의 토큰 수를 추정합니다."""
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+def _summary_line(message):
+    """요약에 들어갈 한 줄을 만듭니다 (첫 문장 위주)."""
+    content = " ".join(message.get("content", "").split())
+    for delimiter in (". ", "? ", "! ", "\n"):
+        index = content.find(delimiter)
+        if 0 < index < SUMMARY_LINE_CHARS:
+            content = content[:index + 1]
+            break
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS] + "..."
+    return f"- {ROLE_LABELS.get(message['role'], message['role'])}: {content}"
+
+_fingerprint = summarizer.fingerprint
+
+def _rolling_summary(folded, summary_cache):
+    """
+    컨텍스트에서 밀려난 오래된 대화를 요약합니다.
+    summary_cache에 이전 결과를 보관하여 새로 밀려난 메시지만 요약에 추가합니다.
+    """
+    cached_count = summary_cache.get("count", 0)
+    cached_lines = summary_cache.get("lines", [])
+
+    # 캐시가 현재 대화의 앞부분과 일치하는지 확인
+    if (cached_count > len(folded) or
+            (cached_count and summary_cache.get("fingerprint") != _fingerprint(folded[cached_count - 1]))):
+        cached_count, cached_lines = 0, []
+
+    lines = cached_lines + [_summary_line(msg) for msg in folded[cached_count:]]
+
+    # 요약 예산을 넘으면 가장 오래된 줄부터 제거
+    total = sum(estimate_tokens(line) for line in lines)
+    while lines and total > SUMMARY_TOKEN_BUDGET:
+        total -= estimate_tokens(lines.pop(0))
+
+    if folded:
+        summary_cache["count"] = len(folded)
+        summary_cache["fingerprint"] = _fingerprint(folded[-1])
+        summary_cache["lines"] = lines
+    return "\n".join(lines)
+
+def _emotion_line(facts):
+    """요약의 감정 정보를 한 줄로 만듭니다."""
+    emotions = ", ".join(f"{label} {count}회" for label, count in list(facts.get("emotions", {}).items())[:3])
+    line = f"감정: {facts.get('emotion') or facts.get('dominant') or '알 수 없음'}"
+    if emotions:
+        line += f" (대화 중 {emotions})"
+    if facts.get("arc"):
+        line += f", {facts['arc'][0]} → {facts['arc'][1]}"
+    return line
+
+def format_summary(summary, token_budget=None):
+    """
+    저장된 세션 요약(summarizer.summarize 결과)을 컨텍스트에 넣을 텍스트로 만듭니다.
+    token_budget을 넘으면 뒤쪽 핵심 문장부터 제외합니다.
+    """
+    if token_budget is None:
+        token_budget = SUMMARY_TOKEN_BUDGET
+    lines = [f"- {_emotion_line(summary.get('facts', {}))}"]
+    lines.extend(f"- {ROLE_LABELS['user']}: {highlight}" for highlight in summary.get("highlights", []))
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > token_budget:
+        lines.pop()
+    return "\n".join(lines)
+
+def format_memory(summaries, token_budget=None):
+    """
+    최근 대화들의 요약을 "지난 대화 기억" 텍스트로 만듭니다.
+    summaries는 최근 대화부터 정렬된 요약 목록이며, 예산 안에 들어가는 대화까지만 포함합니다.
+    """
+    if token_budget is None:
+        token_budget = MEMORY_TOKEN_BUDGET
+    lines = []
+    used = 0
+    for summary in summaries:
+        line = f"- {_emotion_line(summary.get('facts', {}))}"
+        highlights = summary.get("highlights", [])[:2]
+        if highlights:
+            line += ": " + " / ".join(highlights)
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+def build_context(messages, emotion=None, token_budget=None, summary_cache=None, stored_summary=None, memory=None):
+    """
+    OpenAI API에 보낼 메시지 목록을 만듭니다.
+    시스템 프롬프트를 유지하고, 최근 사용자/어시스턴트 메시지를 토큰 예산 안에서 최대한 포함하며,
+    예산을 넘는 오래된 대화는 요약 메시지로 대체합니다.
+    stored_summary: 이어가는 대화의 저장된 요약. 대화와 일치하면 요약한 메시지 중
+    마지막 RESUME_RECENT_MESSAGES개만 그대로 보내고 나머지는 요약으로 대체합니다.
+    memory: 지난 대화 기억 텍스트 (format_memory 결과)
+    """
+    if token_budget is None:
+        token_budget = CONTEXT_TOKEN_BUDGET
+    if summary_cache is None:
+        summary_cache = {}
+
+    system_messages = [msg for msg in messages if msg["role"] == "system"]
+    conversation = [msg for msg in messages if msg["role"] in ROLE_LABELS]
+
+    system_message = system_messages[0] if system_messages else {"role": "system", "content": get_system_prompt(emotion)}
+    budget = token_budget - message_tokens(system_message)
+
+    context = [{"role": "system", "content": system_message["content"]}]
+
+    if memory:
+        memory_message = {"role": "system", "content": "지난 대화 기억:\n" + memory}
+        context.append(memory_message)
+        budget -= message_tokens(memory_message)
+
+    # 이어가는 대화는 저장된 요약이 대신하는 앞부분을 보내지 않음
+    if summarizer.is_current(stored_summary, conversation):
+        covered = max(stored_summary["message_count"] - RESUME_RECENT_MESSAGES, 0)
+        if covered:
+            resume_message = {"role": "system", "content": "지난번 대화 요약:\n" + format_summary(stored_summary)}
+            context.append(resume_message)
+            budget -= message_tokens(resume_message)
+            conversation = conversation[covered:]
+
+    # 최근 메시지부터 역순으로 예산 안에 들어가는 만큼 선택
+    recent_start = len(conversation)
+    used = 0
+    for index in range(len(conversation) - 1, -1, -1):
+        cost = message_tokens(conversation[index])
+        # 마지막 메시지는 예산을 넘더라도 항상 포함
+        if used + cost > budget and index < len(conversation) - 1:
+            break
+        used += cost
+        recent_start = index
+
+    folded = conversation[:recent_start]
+    if folded:
+        summary = _rolling_summary(folded, summary_cache)
+        summary_message = {"role": "system", "content": "이전 대화 요약:\n" + summary}
+        # 요약이 들어갈 자리를 만들기 위해 필요하면 가장 오래된 최근 메시지를 추가로 제외
+        while recent_start < len(conversation) - 1 and used + message_tokens(summary_message) > budget:
+            used -= message_tokens(conversation[recent_start])
+            recent_start += 1
+            summary = _rolling_summary(conversation[:recent_start], summary_cache)
+            summary_message = {"role": "system", "content": "이전 대화 요약:\n" + summary}
+        context.append(summary_message)
+
+    context.extend({"role": msg["role"], "content": msg["content"]} for msg in conversation[recent_start:])
+    return context
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# 인증 정보 저장소 (SQLite)
+#
+# 사용자 이름에 기본 키 인덱스가 있는 users 테이블에 사용자 한 명당 한 행을 저장합니다.
+# 조회와 추가가 모두 O(1)이며, 추가는 하나의 트랜잭션으로 처리되어
+# 동시에 가입하는 사용자끼리 서로의 기록을 덮어쓰지 않습니다.
+# 데이터베이스 파일마다 프로세스 공용 연결을 하나만 열어 사용하며(WAL 설정과 테이블 생성도 그때 한 번),
+# 조회한 사용자 정보는 USER_CACHE_SIZE개까지 메모리에 보관하여 재실행마다 다시 읽지 않습니다.
+
+# 메모리에 보관할 사용자 정보 수
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    password TEXT NOT NULL
+)
+"""
+
+_connections = {}       # 데이터베이스 경로 -> 공용 연결
+_cache = OrderedDict()  # (데이터베이스 경로, 사용자 이름) -> 사용자 정보
+_lock = threading.Lock()
+
+def _connect(db_path):
+    """데이터베이스의 공용 연결을 반환합니다 (_lock 안에서 호출, 처음 열 때만 설정)."""
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        _connections[db_path] = conn
+    return conn
+
+def _query(db_path, sql, params=()):
+    with _lock:
+        return _connect(db_path).execute(sql, params).fetchall()
+
+class UserIndex(Mapping):
+    """
+    사용자 이름으로 인증 정보를 조회하는 읽기 전용 매핑입니다.
+    credentials['usernames'][username]['password'] 형태의 기존 사용 방식을 그대로 지원합니다.
+    찾은 사용자만 캐시에 보관하고, 없는 사용자는 다른 프로세스에서 가입했을 수 있으므로 매번 데이터베이스에서 확인합니다.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def __getitem__(self, username):
+        key = (self.db_path, username)
+        with _lock:
+            user = _cache.get(key)
+            if user is not None:
+                _cache.move_to_end(key)
+                return dict(user)
+        rows = _query(self.db_path, "SELECT name, email, password FROM users WHERE username = ?", (username,))
+        if not rows:
+            raise KeyError(username)
+        name, email, password = rows[0]
+        user = {'name': name, 'email': email, 'password': password}
+        with _lock:
+            _cache[key] = user
+            while len(_cache) > USER_CACHE_SIZE:
+                _cache.popitem(last=False)
+        return dict(user)
+
+    def __contains__(self, username):
+        try:
+            self[username]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter([row[0] for row in _query(self.db_path, "SELECT username FROM users ORDER BY username")])
+
+    def __len__(self):
+        return _query(self.db_path, "SELECT COUNT(*) FROM users")[0][0]
+
+def add_user(db_path, username, name, email, password_hash):
+    """
+    사용자를 추가합니다.
+    이미 존재하는 사용자 이름이면 False를 반환합니다.
+    """
+    with _lock:
+        _cache.pop((db_path, username), None)
+        conn = _connect(db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (username, name, email, password) VALUES (?, ?, ?, ?)",
+                    (username, name, email, password_hash)
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+def is_empty(db_path):
+    """저장된 사용자가 없는지 확인합니다."""
+    return not os.path.exists(db_path) or len(UserIndex(db_path)) == 0
+
+def migrate_yaml(config_path, db_path):
+    """
+    기존 config.yaml의 사용자 정보를 데이터베이스로 옮깁니다 (최초 한 번).
+    옮긴 뒤 원본 파일은 .migrated 확장자를 붙여 보관하며, 옮긴 사용자 수를 반환합니다.
+    """
+    if not os.path.exists(config_path):
+        return 0
+
+    import yaml
+    from yaml.loader import SafeLoader
+
+    with open(config_path) as file:
+        config = yaml.load(file, Loader=SafeLoader) or {}
+    users = (config.get('credentials') or {}).get('usernames') or {}
+
+    with _lock:
+        conn = _connect(db_path)
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, name, email, password) VALUES (?, ?, ?, ?)",
+                [
+                    (username, info.get('name', username), info.get('email', ''), info['password'])
+                    for username, info in users.items()
+                ]
+            )
+
+    os.replace(config_path, config_path + ".migrated")
+    return len(users)
+
+if __name__ == "__main__":
+    # 일회성 마이그레이션: python credential_store.py [config.yaml 경로] [credentials.db 경로]
+    import sys
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(data_dir, "config.yaml")
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, "credentials.db")
+    print(f"{migrate_yaml(source, target)}명의 사용자를 {target}(으)로 옮겼습니다.")
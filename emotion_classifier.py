@@ -0,0 +1,259 @@
+import os
+import re
+import json
+import zlib
+import threading
+from emotions import EMOTIONS
+
+# 로컬 감정 분류기
+#
+# 네트워크 호출 없이 텍스트를 emotions.EMOTIONS의 감정 중 하나로 분류합니다.
+# - LexiconClassifier: 감정별 키워드 사전 점수 (기본값)
+# - NgramClassifier: 문자 n-gram 해시 특징 위의 NumPy 선형 모델 (다항 나이브 베이즈)
+# 모든 분류기는 (감정, 확신도) 튜플을 반환하며, 확신도가 낮으면 호출한 쪽에서
+# LLM 분석으로 대체할 수 있습니다.
+# 부정된 키워드("안 불안해요", "불안하지 않아요", "걱정은 안 돼요")는 그 감정의 근거로 세지 않고
+# 확신도만 낮춥니다. NgramClassifier는 같은 규칙으로 부정된 부분을 지운 뒤 특징을 만듭니다.
+# NumPy는 NgramClassifier를 사용할 때만 가져옵니다.
+
+# 사용할 분류기 ("lexicon", "ngram", "llm" - llm은 로컬 분류기를 사용하지 않음)
+CLASSIFIER_BACKEND = os.getenv("EMOTION_CLASSIFIER", "lexicon")
+
+# 이 값 이상의 확신도일 때만 로컬 결과를 그대로 사용 (설정하지 않으면 분류기별 기본값)
+# n-gram 모델은 학습 데이터가 키워드 사전뿐이면 확률이 실제보다 높게 나오므로 기준을 높게 둡니다.
+DEFAULT_THRESHOLDS = {"lexicon": "0.5", "ngram": "0.9"}
+CONFIDENCE_THRESHOLD = float(os.getenv(
+    "EMOTION_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLDS.get(CLASSIFIER_BACKEND, "0.5")
+))
+
+# n-gram 모델 학습 데이터 경로 (JSONL, {"text": ..., "emotion": ...})
+TRAINING_DATA_PATH = os.getenv("EMOTION_TRAINING_DATA", "")
+
+# 감정 순서 (채팅 화면과 같은 목록)
+LABELS = list(EMOTIONS)
+
+# 감정별 키워드 (어간 위주로 활용형을 함께 잡도록 구성)
+LEXICON = {
+    "기쁨": ["기쁘", "기뻐", "기쁜", "행복", "좋아", "좋았", "신나", "신난", "즐거", "즐겁", "설레", "뿌듯", "웃었", "최고"],
+    "슬픔": ["슬프", "슬퍼", "슬픈", "우울", "눈물", "울었", "울고", "울어", "속상", "서글", "그립", "허전", "마음이 아파"],
+    "분노": ["화나", "화가", "화났", "짜증", "열받", "빡치", "분노", "분하", "억울", "어이없", "미워", "싫어"],
+    "불안": ["불안", "걱정", "초조", "무서", "무섭", "두려", "두렵", "긴장", "떨려", "겁나", "조마조마"],
+    "스트레스": ["스트레스", "압박", "지쳐", "지친", "지치", "피곤", "힘들", "벅차", "바빠", "과로", "마감", "부담"],
+    "외로움": ["외로", "외롭", "혼자", "쓸쓸", "고독", "아무도", "소외", "친구가 없"],
+    "후회": ["후회", "했어야", "할걸", "말걸", "아쉬", "잘못했", "되돌리", "그때 왜"],
+    "좌절": ["좌절", "실패", "포기", "떨어졌", "망했", "소용없", "무기력", "절망", "안 돼", "안돼"],
+    "혼란": ["혼란", "모르겠", "헷갈", "복잡", "갈피", "어떻게 해야", "뭘 해야", "멍하"],
+    "감사": ["감사", "고마", "고맙", "덕분", "다행"],
+}
+
+# 키워드 앞에서 부정하는 단어 ("안 불안해요", "전혀 안 슬퍼요")
+NEGATION_WORDS = ("안", "못")
+
+# 키워드 뒤에서 부정하는 표현 (키워드가 끝난 위치에서 검사)
+# - 같은 어절의 "-지 않/못/마/말" ("불안하지 않아요", "걱정하지 마세요")
+# - 조사만 붙은 키워드 뒤의 "안/못" 어절 ("걱정 안 해요", "걱정은 안 돼요")
+_NEGATION_AFTER = re.compile(r"\S*?지\s*(?:않|못|마|말)|(?:은|는|이|가|도|을|를)?\s+(?:안|못)(?=\s|$)")
+
+class LexiconClassifier:
+    """키워드 사전 기반 감정 분류기"""
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon or LEXICON
+        self.keyword_labels = {}
+        for label, keywords in self.lexicon.items():
+            for keyword in keywords:
+                self.keyword_labels[keyword] = label
+        # 긴 키워드가 먼저 매칭되도록 정렬하여 하나의 정규식으로 결합
+        keywords = sorted(self.keyword_labels, key=len, reverse=True)
+        self.pattern = re.compile("|".join(re.escape(k) for k in keywords))
+
+    def matches(self, text):
+        """
+        텍스트에서 찾은 키워드를 (감정, 시작, 끝, 부정 여부)로 반환합니다.
+        부정된 키워드의 시작과 끝에는 부정하는 단어까지 포함하며, 다른 키워드를 부정하는 데 쓰인
+        부분("걱정 안 돼요"의 "안 돼")은 키워드로 세지 않습니다.
+        """
+        text = text or ""
+        found = []
+        negation_end = 0
+        for match in self.pattern.finditer(text):
+            start, end = match.span()
+            if start < negation_end:
+                continue
+            before = text[:start]
+            stripped = before.rstrip()
+            word_start = max(stripped.rfind(" "), stripped.rfind("\n")) + 1
+            after = _NEGATION_AFTER.match(text, end)
+            if stripped != before and stripped[word_start:] in NEGATION_WORDS:
+                found.append((self.keyword_labels[match.group(0)], word_start, end, True))
+            elif after:
+                negation_end = after.end()
+                found.append((self.keyword_labels[match.group(0)], start, negation_end, True))
+            else:
+                found.append((self.keyword_labels[match.group(0)], start, end, False))
+        return found
+
+    def mask_negated(self, text):
+        """부정된 키워드와 부정하는 단어를 공백으로 바꾼 텍스트를 반환합니다."""
+        text = text or ""
+        negated = [(start, end) for _, start, end, is_negated in self.matches(text) if is_negated]
+        for start, end in negated:
+            text = text[:start] + " " * (end - start) + text[end:]
+        return text
+
+    def classify(self, text):
+        """텍스트 하나를 분류하여 (감정, 확신도)를 반환합니다."""
+        scores = {}
+        negated = 0
+        for label, start, end, is_negated in self.matches(text):
+            if is_negated:
+                negated += 1
+            else:
+                scores[label] = scores.get(label, 0) + end - start
+        if not scores:
+            return None, 0.0
+        best = max(scores, key=scores.get)
+        # 매칭된 키워드가 적을수록, 부정된 키워드가 많을수록 확신도를 낮게 (+1 평활화)
+        confidence = scores[best] / (sum(scores.values()) + 2 * negated + 1)
+        return best, confidence
+
+    def classify_batch(self, texts):
+        """여러 텍스트를 한 번에 분류합니다."""
+        return [self.classify(text) for text in texts]
+
+class NgramClassifier:
+    """문자 n-gram 해시 특징을 사용하는 다항 나이브 베이즈 (NumPy 선형 모델)"""
+
+    def __init__(self, n_features=2 ** 14, ngram_range=(1, 3), alpha=0.5):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self.weights = None  # (특징 수, 감정 수) 로그 확률 (학습 데이터에 없던 특징은 0)
+        self.bias = None     # (감정 수,) 로그 사전 확률
+        self.seen = None     # (특징 수,) 학습 데이터에 나온 특징 여부
+        self.negation = LexiconClassifier()
+
+    def _ngram_ids(self, texts):
+        """텍스트별 n-gram 해시 인덱스를 (행 번호, 특징 번호) 배열로 만듭니다."""
+        import numpy as np
+        rows, cols = [], []
+        low, high = self.ngram_range
+        for row, text in enumerate(texts):
+            text = " ".join(self.negation.mask_negated(text).split())
+            for n in range(low, high + 1):
+                for i in range(len(text) - n + 1):
+                    rows.append(row)
+                    cols.append(zlib.crc32(text[i:i + n].encode()) % self.n_features)
+        return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+    def fit(self, texts, labels):
+        """라벨이 있는 텍스트로 모델을 학습합니다."""
+        import numpy as np
+        label_ids = np.asarray([LABELS.index(label) for label in labels], dtype=np.int64)
+        rows, cols = self._ngram_ids(texts)
+        row_labels = label_ids[rows]
+
+        counts = np.zeros((self.n_features, len(LABELS)))
+        for j in range(len(LABELS)):
+            counts[:, j] = np.bincount(cols[row_labels == j], minlength=self.n_features)
+        self.seen = counts.sum(axis=1) > 0
+        counts += self.alpha
+        self.weights = np.log(counts / counts.sum(axis=0, keepdims=True))
+        # 학습 데이터에 없던 특징은 평활화 값만 남아 학습 데이터가 적은 감정 쪽으로 치우치므로 무시
+        self.weights[~self.seen] = 0.0
+
+        priors = np.bincount(label_ids, minlength=len(LABELS)) + 1.0
+        self.bias = np.log(priors / priors.sum())
+        return self
+
+    def classify_batch(self, texts):
+        """여러 텍스트를 한 번에 분류합니다 (희소 특징에 대한 벡터화 연산)."""
+        import numpy as np
+        if self.weights is None:
+            raise RuntimeError("학습되지 않은 분류기입니다.")
+        texts = list(texts)
+        rows, cols = self._ngram_ids(texts)
+        logits = np.tile(self.bias, (len(texts), 1))
+        contributions = self.weights[cols]
+        for j in range(len(LABELS)):
+            logits[:, j] += np.bincount(rows, weights=contributions[:, j], minlength=len(texts))
+
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+
+        # 학습 데이터에 나온 n-gram이 하나도 없는 텍스트는 분류하지 않음
+        has_features = np.bincount(rows, weights=self.seen[cols], minlength=len(texts)) > 0
+        return [
+            (LABELS[b], float(probs[i, b])) if has_features[i] else (None, 0.0)
+            for i, b in enumerate(best)
+        ]
+
+    def classify(self, text):
+        """텍스트 하나를 분류하여 (감정, 확신도)를 반환합니다."""
+        return self.classify_batch([text])[0]
+
+def load_training_data(path=None):
+    """
+    n-gram 모델 학습 데이터를 불러옵니다.
+    기본으로 키워드 사전을 시드 데이터로 사용하고, 경로가 있으면 JSONL 데이터를 추가합니다.
+    """
+    texts, labels = [], []
+    for label, keywords in LEXICON.items():
+        for keyword in keywords:
+            texts.append(keyword)
+            labels.append(label)
+
+    path = path or TRAINING_DATA_PATH
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("emotion") in LABELS:
+                    texts.append(record["text"])
+                    labels.append(record["emotion"])
+    return texts, labels
+
+def _build_ngram_classifier():
+    texts, labels = load_training_data()
+    return NgramClassifier().fit(texts, labels)
+
+# 사용 가능한 분류기 목록
+CLASSIFIERS = {
+    "lexicon": LexiconClassifier,
+    "ngram": _build_ngram_classifier,
+}
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """설정된 로컬 분류기를 반환합니다 (프로세스당 한 번 생성). llm이면 None을 반환합니다."""
+    global _classifier
+    if CLASSIFIER_BACKEND not in CLASSIFIERS:
+        return None
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = CLASSIFIERS[CLASSIFIER_BACKEND]()
+        return _classifier
+
+def classify(text):
+    """로컬 분류기로 텍스트를 분류합니다. 로컬 분류기가 없으면 (None, 0.0)을 반환합니다."""
+    classifier = get_classifier()
+    if classifier is None:
+        return None, 0.0
+    return classifier.classify(text)
+
+def classify_batch(texts):
+    """로컬 분류기로 여러 텍스트를 한 번에 분류합니다."""
+    classifier = get_classifier()
+    if classifier is None:
+        return [(None, 0.0) for _ in texts]
+    return classifier.classify_batch(texts)
+
+def is_confident(confidence):
+    """로컬 분류 결과를 그대로 사용할 수 있는지 확인합니다."""
+    return confidence >= CONFIDENCE_THRESHOLD
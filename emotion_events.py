@@ -0,0 +1,118 @@
+import os
+import struct
+import datetime
+from collections import Counter
+from emotions import EMOTIONS
+
+# 감정 이벤트 로그 (기록)
+#
+# 사용자별 <username>.events 파일에 (int64 UTC epoch 초, uint8 감정 코드) 레코드를
+# 덧붙이기만 합니다. 세션의 날짜나 감정이 바뀌면 이전 값을 취소하는 레코드
+# (코드에 RETRACT 비트 설정)와 새 값을 추가하는 레코드를 기록하므로 저장 비용이
+# 전체 기록 크기와 무관합니다. 파일을 NumPy 배열로 읽어 분석하는 부분은
+# emotion_timeline.py에 있으며, 이 모듈은 채팅 중에도 불리므로 NumPy를 가져오지 않습니다.
+#
+# 로그는 세션 헤더에서 다시 만들 수 있는 파생 데이터이므로, 채팅 중 덧붙일 때는 fsync하지 않습니다.
+# 프로세스가 죽어 로그와 저장된 세션이 어긋나면(쓰기 지연 중인 저장이 유실된 경우 등)
+# 로그인할 때 needs_rebuild가 감정별 횟수를 비교하여 다시 만듭니다.
+# 대화 중인 세션은 저장할 때마다 날짜가 바뀌어 취소/추가 레코드가 쌓이므로, 취소된 레코드가
+# COMPACT_RATIO를 넘어도 로그인할 때 세션 목록으로 다시 만들어 크기를 줄입니다.
+
+# 레코드 형식 (emotion_timeline.EVENT_DTYPE과 같은 9바이트 구조)
+RECORD = struct.Struct("<qB")
+
+# 취소 레코드 표시 비트
+RETRACT = 0x80
+
+# 감정 코드 (emotions.EMOTIONS 순서)
+LABELS = list(EMOTIONS.keys())
+EMOTION_CODES = {emotion: code for code, emotion in enumerate(LABELS)}
+
+# 취소된 레코드(취소 레코드와 취소된 레코드)가 로그에서 이 비율을 넘으면 로그인할 때 다시 만듦
+COMPACT_RATIO = float(os.getenv("EVENT_LOG_COMPACT_RATIO", "0.5"))
+
+# 한국 시간대 오프셋 (초)
+KST_OFFSET = 9 * 60 * 60
+
+def to_epoch(date_str):
+    """ISO 날짜 문자열을 UTC epoch 초로 변환합니다 (시간대가 없으면 UTC로 간주)."""
+    date = datetime.datetime.fromisoformat(date_str)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return int(date.timestamp())
+
+def local_date_to_epoch(date):
+    """한국 날짜(datetime.date)의 0시를 UTC epoch 초로 변환합니다."""
+    return (date - datetime.date(1970, 1, 1)).days * 86400 - KST_OFFSET
+
+def _is_counted(session):
+    return bool(session and session.get("date") and session.get("emotion") in EMOTION_CODES)
+
+def _session_event(session):
+    """세션의 (epoch, 감정 코드)를 반환합니다. 분석 대상이 아니면 None을 반환합니다."""
+    if not _is_counted(session):
+        return None
+    return to_epoch(session["date"]), EMOTION_CODES[session["emotion"]]
+
+def _write_records(path, records, mode, sync=False):
+    with open(path, mode) as f:
+        f.write(b"".join(RECORD.pack(ts, code) for ts, code in records))
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+def record_session_change(path, old_session, new_session):
+    """
+    세션 변경을 로그에 덧붙입니다.
+    old_session: 변경 전 세션 (새 세션이면 None), new_session: 변경 후 세션 (삭제면 None)
+    """
+    old_event = _session_event(old_session)
+    new_event = _session_event(new_session)
+    if old_event == new_event:
+        return
+
+    records = []
+    if old_event:
+        records.append((old_event[0], old_event[1] | RETRACT))
+    if new_event:
+        records.append(new_event)
+    _write_records(path, records, "ab")
+
+def rebuild(path, chat_sessions):
+    """세션 목록으로 로그 파일을 새로 만듭니다 (임시 파일에 쓴 뒤 교체)."""
+    records = [event for event in map(_session_event, chat_sessions) if event]
+    temp_path = f"{path}.tmp"
+    _write_records(temp_path, records, "wb", sync=True)
+    os.replace(temp_path, path)
+
+def _code_counts(path):
+    """로그의 감정 코드별 (추가 레코드 수 - 취소 레코드 수)와 취소 레코드 수를 반환합니다."""
+    with open(path, "rb") as f:
+        data = f.read()
+    # 기록 도중 중단된 마지막 레코드는 무시
+    data = data[:len(data) - len(data) % RECORD.size]
+    raw = Counter(data[RECORD.size - 1::RECORD.size])
+    retracted = sum(count for code, count in raw.items() if code & RETRACT)
+    counts = Counter()
+    for code, count in raw.items():
+        counts[code & ~RETRACT] += -count if code & RETRACT else count
+    return +counts, retracted
+
+def needs_rebuild(path, chat_sessions):
+    """
+    로그를 세션 목록으로 다시 만들어야 하는지 확인합니다 (로그인 시).
+    로그가 없거나, 감정별 횟수가 세션 목록과 다르거나, 취소된 레코드가 COMPACT_RATIO를 넘으면
+    True를 반환합니다.
+    """
+    if not exists(path):
+        return True
+    # 날짜는 해석하지 않고 감정별 횟수만 비교 (로그인 시 비용을 줄이기 위해)
+    expected = Counter(EMOTION_CODES[session["emotion"]] for session in chat_sessions if _is_counted(session))
+    counts, retracted = _code_counts(path)
+    if counts != expected:
+        return True
+    total = sum(counts.values()) + 2 * retracted
+    return total > 0 and 2 * retracted / total > COMPACT_RATIO
+
+def exists(path):
+    return os.path.exists(path)
\ No newline at end of file
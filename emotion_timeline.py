@@ -0,0 +1,112 @@
+import os
+import datetime
+import threading
+from collections import OrderedDict
+import numpy as np
+from emotion_events import RETRACT, LABELS, KST_OFFSET, local_date_to_epoch
+
+# 감정 이벤트 로그 (NumPy 열 기반 분석)
+#
+# emotion_events가 기록한 <username>.events 파일을 np.memmap으로 읽어 정렬된
+# timestamps/codes 배열로 정리하고(추가/취소 상쇄는 bincount), 날짜 범위 필터는
+# searchsorted로 계산합니다. 감정 분석 페이지의 "감정 변화 그래프" 탭에서 사용하고,
+# 주간/월간/시간대별 횟수는 analytics의 사전 집계를 사용합니다.
+
+EVENT_DTYPE = np.dtype([("ts", "<i8"), ("code", "u1")])
+
+# 파일별 로드 결과 캐시 (파일 크기가 같으면 재사용, 최근에 사용한 EVENT_CACHE_SIZE개까지 보관)
+EVENT_CACHE_SIZE = int(os.getenv("EVENT_CACHE_SIZE", "32"))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def forget(path):
+    """파일의 캐시를 지웁니다 (로그아웃 시)."""
+    with _cache_lock:
+        _cache.pop(path, None)
+
+class EmotionEvents:
+    """시간순으로 정렬된 감정 이벤트 (timestamps: int64 epoch 초, codes: uint8 감정 코드)"""
+
+    def __init__(self, timestamps, codes):
+        self.timestamps = timestamps
+        self.codes = codes
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8))
+
+    @classmethod
+    def from_log(cls, log):
+        """추가/취소 레코드를 상쇄하여 현재 이벤트만 남깁니다."""
+        if not len(log):
+            return cls.empty()
+        ts = log["ts"]
+        codes = log["code"]
+        signs = np.where(codes & RETRACT, -1, 1)
+        keys = ts * 128 + (codes & ~np.uint8(RETRACT))
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=signs, minlength=len(unique_keys)).astype(np.int64)
+        keys = np.repeat(unique_keys, np.maximum(counts, 0))
+        # np.unique 결과가 정렬되어 있으므로 timestamps도 정렬된 상태
+        return cls(keys // 128, (keys % 128).astype(np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        """로그 파일을 메모리 맵으로 읽어 이벤트를 만듭니다. 파일 크기가 같으면 캐시를 사용합니다."""
+        if not os.path.exists(path):
+            return cls.empty()
+        size = os.path.getsize(path)
+        with _cache_lock:
+            cached = _cache.get(path)
+            if cached and cached[0] == size:
+                _cache.move_to_end(path)
+                return cached[1]
+
+        # 기록 도중 중단된 마지막 레코드는 무시
+        count = size // EVENT_DTYPE.itemsize
+        if count:
+            log = np.memmap(path, dtype=EVENT_DTYPE, mode="r", shape=(count,))
+            events = cls.from_log(log)
+            del log
+        else:
+            events = cls.empty()
+
+        with _cache_lock:
+            _cache[path] = (size, events)
+            _cache.move_to_end(path)
+            while len(_cache) > EVENT_CACHE_SIZE:
+                _cache.popitem(last=False)
+        return events
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def between(self, start_date, end_date):
+        """한국 날짜 기준 [start_date, end_date] 범위의 이벤트를 반환합니다 (이분 탐색)."""
+        start = np.searchsorted(self.timestamps, local_date_to_epoch(start_date), side="left")
+        end = np.searchsorted(
+            self.timestamps, local_date_to_epoch(end_date + datetime.timedelta(days=1)), side="left"
+        )
+        return EmotionEvents(self.timestamps[start:end], self.codes[start:end])
+
+    def local_datetimes(self):
+        """한국 시간 기준 datetime64[s] 배열을 반환합니다."""
+        return (self.timestamps + KST_OFFSET).astype("datetime64[s]")
+
+    def first_date(self):
+        return self.local_datetimes()[0].astype("datetime64[D]").item()
+
+    def last_date(self):
+        return self.local_datetimes()[-1].astype("datetime64[D]").item()
+
+    def labels(self):
+        """감정 이름 배열을 반환합니다."""
+        return np.array(LABELS, dtype=object)[self.codes]
+
+    def format_dates(self):
+        """'YYYY-MM-DD HH:MM' 형식의 날짜 문자열 배열을 반환합니다."""
+        return np.char.replace(np.datetime_as_string(self.local_datetimes(), unit="m"), "T", " ")
+
+    def recent_labels(self, count):
+        """가장 최근 count개 이벤트의 감정 이름을 시간순으로 반환합니다."""
+        return [LABELS[code] for code in self.codes[-count:]]
\ No newline at end of file
@@ -0,0 +1,18 @@
+# 감정 목록
+#
+# 채팅 화면, 감정 분석, 로컬 감정 분류기가 함께 사용하는 감정 이름과 설명입니다.
+# 순서는 감정 이벤트 로그의 감정 코드로도 사용되므로 새 감정은 끝에만 추가해야 합니다.
+# chatbot은 streamlit을 가져오므로, 그 밖의 모듈(emotion_classifier 등)은 이 모듈에서 가져갑니다.
+
+EMOTIONS = {
+    "기쁨": "행복하고 즐거운 상태",
+    "슬픔": "마음이 아프고 우울한 상태",
+    "분노": "화가 나고 짜증이 나는 상태",
+    "불안": "걱정이 많고 초조한 상태",
+    "스트레스": "압박감과 중압감을 느끼는 상태",
+    "외로움": "혼자라고 느끼는 상태",
+    "후회": "과거의 선택이나 행동에 대해 아쉬움을 느끼는 상태",
+    "좌절": "목표 달성에 실패하고 실망한 상태",
+    "혼란": "명확한 방향이나 생각을 잡지 못하는 상태",
+    "감사": "고마움을 느끼는 상태"
+}
@@ -0,0 +1,117 @@
+import bisect
+import datetime
+import heapq
+import itertools
+
+# 채팅 기록 페이지용 세션 인덱스
+#
+# 세션을 날짜순으로 정렬된 (날짜, id) 목록과 감정별 정렬 목록(포스팅 리스트)으로
+# 보관합니다. 날짜 범위 필터는 이분 탐색, 감정 필터는 선택한 감정의 목록만
+# 병합하므로 필터를 바꿀 때마다 전체 세션을 순회하거나 다시 정렬하지 않습니다.
+
+def parse_date(date_str):
+    """세션 날짜 문자열을 datetime으로 변환합니다 (없거나 잘못된 값은 가장 오래된 날짜로 취급)."""
+    try:
+        return datetime.datetime.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return datetime.datetime.min
+
+def _newest_first(entries, low, high):
+    """정렬된 목록의 [low, high) 구간을 뒤에서부터 순회합니다 (복사 없이)."""
+    for index in range(high - 1, low - 1, -1):
+        yield entries[index]
+
+class HistoryIndex:
+    """날짜순 세션 목록과 감정별 포스팅 리스트"""
+
+    def __init__(self, chat_sessions=()):
+        self.sessions = {}      # id -> 세션
+        self.entries = []       # 전체 (날짜, id) 정렬 목록
+        self.by_emotion = {}    # 감정 -> (날짜, id) 정렬 목록
+        self._keys = {}         # id -> (날짜, 감정)
+
+        for session in chat_sessions:
+            self._register(session)
+            key = self._keys[session['id']]
+            self.entries.append((key[0], session['id']))
+            self.by_emotion.setdefault(key[1], []).append((key[0], session['id']))
+        self.entries.sort()
+        for postings in self.by_emotion.values():
+            postings.sort()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _register(self, session):
+        self.sessions[session['id']] = session
+        self._keys[session['id']] = (parse_date(session.get('date', '')), session.get('emotion'))
+
+    def _remove(self, session_id):
+        date, emotion = self._keys.pop(session_id)
+        del self.sessions[session_id]
+        entry = (date, session_id)
+        for entries in (self.entries, self.by_emotion[emotion]):
+            index = bisect.bisect_left(entries, entry)
+            if index < len(entries) and entries[index] == entry:
+                del entries[index]
+
+    def update(self, old_session, new_session):
+        """
+        세션 변경을 인덱스에 반영합니다.
+        old_session: 변경 전 세션 (새 세션이면 None), new_session: 변경 후 세션 (삭제면 None)
+        """
+        if old_session is not None and old_session['id'] in self._keys:
+            self._remove(old_session['id'])
+        if new_session is not None:
+            if new_session['id'] in self._keys:
+                self._remove(new_session['id'])
+            self._register(new_session)
+            date, emotion = self._keys[new_session['id']]
+            bisect.insort(self.entries, (date, new_session['id']))
+            bisect.insort(self.by_emotion.setdefault(emotion, []), (date, new_session['id']))
+
+    def refresh(self, session):
+        """날짜/감정 이외의 내용(미리보기, 메시지)이 바뀐 세션 객체를 교체합니다."""
+        if session['id'] in self.sessions:
+            self.sessions[session['id']] = session
+
+    def get(self, session_id):
+        """id로 세션을 찾습니다."""
+        return self.sessions.get(session_id)
+
+    def matches(self, session_id, emotions=None, start=None, end=None):
+        """세션이 감정/날짜 조건에 맞는지 확인합니다 (검색 결과 필터링용)."""
+        if session_id not in self._keys:
+            return False
+        date, emotion = self._keys[session_id]
+        if emotions and emotion not in emotions:
+            return False
+        return (start is None or date >= start) and (end is None or date <= end)
+
+    @staticmethod
+    def _range(entries, start, end):
+        """[start, end] 범위에 해당하는 인덱스 구간을 이분 탐색으로 찾습니다."""
+        low = 0 if start is None else bisect.bisect_left(entries, (start, ""))
+        high = len(entries) if end is None else bisect.bisect_right(entries, (end, "\U0010ffff"))
+        return low, max(low, high)
+
+    def query(self, emotions=None, start=None, end=None, offset=0, limit=None):
+        """
+        조건에 맞는 세션을 최신순으로 반환합니다.
+        emotions: 감정 목록 (비어 있으면 전체), start/end: 날짜 범위 (None이면 제한 없음)
+        반환값: (전체 개수, offset부터 limit개의 세션 목록)
+        """
+        if emotions:
+            lists = [self.by_emotion[emotion] for emotion in emotions if emotion in self.by_emotion]
+        else:
+            lists = [self.entries]
+
+        ranges = [(entries,) + self._range(entries, start, end) for entries in lists]
+        total = sum(high - low for _, low, high in ranges)
+
+        # 각 목록의 범위를 뒤에서부터(최신순) 병합
+        iterators = [_newest_first(entries, low, high) for entries, low, high in ranges]
+        merged = heapq.merge(*iterators, reverse=True) if len(iterators) > 1 else (iterators[0] if iterators else iter(()))
+        stop = None if limit is None else offset + limit
+        page = [self.sessions[session_id] for _, session_id in itertools.islice(merged, offset, stop)]
+        return total, page
@@ -0,0 +1,157 @@
+import os
+import time
+import random
+import asyncio
+import threading
+
+# OpenAI API 공용 클라이언트
+#
+# - 프로세스 전체에서 하나의 keep-alive 커넥션 풀(HTTP 어댑터)을 공유합니다.
+# - API 키는 요청마다 인자로 전달하며 openai.api_key 전역 값을 바꾸지 않습니다.
+# - 429/5xx/타임아웃 오류는 지터가 있는 지수 백오프로 재시도합니다.
+# - 여러 Streamlit 세션이 하나의 이벤트 루프를 공유하는 비동기 호출을 제공합니다.
+# - openai/requests는 첫 API 호출 때 가져옵니다 (openai가 numpy까지 로드하므로 로그인 화면을 가볍게 유지).
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+
+# 타임아웃 설정 (초)
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+# 재시도 설정
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "8"))
+
+# 커넥션 풀 크기
+POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+
+_openai_module = None
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+_loop = None
+_loop_lock = threading.Lock()
+_aiohttp_session = None
+
+def _get_adapter():
+    """프로세스 공용 HTTP 어댑터(커넥션 풀)를 반환합니다."""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            from requests.adapters import HTTPAdapter
+            _adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        return _adapter
+
+def _make_session():
+    """
+    openai 라이브러리가 스레드마다 만드는 requests 세션을 반환합니다.
+    세션 객체는 스레드별이지만 공용 어댑터를 사용하므로 커넥션 풀은 모든 스레드가 공유합니다.
+    openai는 세션 수명(MAX_SESSION_LIFETIME_SECS)이 지나면 close()를 호출하는데,
+    그때 공용 커넥션 풀이 닫히지 않도록 close()는 아무 일도 하지 않습니다.
+    """
+    import requests
+    session = requests.Session()
+    adapter = _get_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.close = lambda: None
+    return session
+
+def _openai():
+    """openai 모듈을 가져옵니다 (처음 호출할 때 공용 커넥션 풀 설정)."""
+    global _openai_module
+    if _openai_module is None:
+        import openai
+        # openai 라이브러리가 스레드마다 만드는 세션이 공용 커넥션 풀을 사용하도록 설정
+        openai.requestssession = _make_session
+        _openai_module = openai
+    return _openai_module
+
+def _is_retryable(error):
+    """재시도할 수 있는 오류인지 확인합니다 (429, 5xx, 타임아웃, 연결 오류)."""
+    openai = _openai()
+    if isinstance(error, (openai.error.RateLimitError,
+                          openai.error.ServiceUnavailableError,
+                          openai.error.Timeout,
+                          openai.error.APIConnectionError,
+                          openai.error.TryAgain)):
+        return True
+    if isinstance(error, openai.error.APIError):
+        return (error.http_status or 500) >= 500
+    return False
+
+def backoff_delay(attempt):
+    """재시도 대기 시간을 계산합니다 (full jitter 지수 백오프)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _request_params(api_key, model, params):
+    request = {
+        "model": model or DEFAULT_MODEL,
+        "api_key": api_key,
+        "request_timeout": (CONNECT_TIMEOUT, READ_TIMEOUT),
+    }
+    request.update(params)
+    return request
+
+def chat_completion(messages, api_key, model=None, **params):
+    """
+    ChatCompletion을 호출합니다.
+    재시도 가능한 오류는 MAX_RETRIES 만큼 백오프 후 다시 시도하고, 그 외 오류는 그대로 발생시킵니다.
+    stream=True를 전달하면 청크 제너레이터를 반환합니다.
+    """
+    request = _request_params(api_key, model, params)
+    attempt = 0
+    while True:
+        try:
+            return _openai().ChatCompletion.create(messages=messages, **request)
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+async def _get_aiohttp_session():
+    """이벤트 루프 공용 aiohttp 세션을 반환합니다."""
+    global _aiohttp_session
+    if _aiohttp_session is None or _aiohttp_session.closed:
+        import aiohttp
+        _aiohttp_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_SIZE)
+        )
+    return _aiohttp_session
+
+async def achat_completion(messages, api_key, model=None, **params):
+    """chat_completion의 asyncio 버전입니다."""
+    openai = _openai()
+    openai.aiosession.set(await _get_aiohttp_session())
+
+    request = _request_params(api_key, model, params)
+    attempt = 0
+    while True:
+        try:
+            return await openai.ChatCompletion.acreate(messages=messages, **request)
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+def get_event_loop():
+    """백그라운드 스레드에서 실행되는 공용 이벤트 루프를 반환합니다."""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="openai-client-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+def submit(coro):
+    """
+    코루틴을 공용 이벤트 루프에서 실행합니다.
+    concurrent.futures.Future를 반환하므로 Streamlit 스크립트 스레드에서 result()로 기다릴 수 있습니다.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
@@ -0,0 +1,189 @@
+import os
+import json
+import math
+import time
+import bisect
+import logging
+import functools
+import threading
+import contextlib
+from dotenv import load_dotenv
+
+# 환경 변수 로드 (앱보다 먼저 임포트되어도 .env 설정을 읽도록)
+load_dotenv()
+
+# 성능 프로파일링 (선택 사항)
+#
+# 페이지별 스크립트 재실행 시간, 사용자 데이터 로드/저장, OpenAI 호출 등의 측정값을
+# 프로세스 전체(모든 사용자 세션)에서 고정 구간 히스토그램으로 모읍니다.
+# - PROFILE_LOG_PATH: 측정값을 한 줄씩 JSON으로 추가하는 파일 (빈 값이면 기록하지 않음)
+# - PROFILE_METRICS_PATH: Prometheus 텍스트 형식 파일 (node_exporter textfile collector 등에서 수집)
+# - ADMIN_USERS에 등록된 사용자는 사이드바의 "성능 프로파일" 페이지에서 히스토그램을 볼 수 있습니다.
+# PROFILING 환경 변수가 설정되지 않으면 측정 함수는 아무 일도 하지 않습니다.
+
+PROFILING = os.getenv("PROFILING", "off").lower() in ("1", "on", "true")
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PROFILE_LOG_PATH = os.getenv("PROFILE_LOG_PATH", os.path.join(_DATA_DIR, "profile.jsonl"))
+PROFILE_METRICS_PATH = os.getenv("PROFILE_METRICS_PATH", os.path.join(_DATA_DIR, "metrics.prom"))
+
+# Prometheus 텍스트 파일 갱신 최소 간격 (초)
+PROFILE_EXPORT_INTERVAL = float(os.getenv("PROFILE_EXPORT_INTERVAL", "10"))
+
+# 프로파일 페이지를 볼 수 있는 사용자 (쉼표로 구분)
+ADMIN_USERS = {name.strip() for name in os.getenv("ADMIN_USERS", "").split(",") if name.strip()}
+
+# 측정값 이름의 접미사별 히스토그램 구간 상한
+BUCKETS = {
+    "_seconds": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    "_bytes": (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    "_tokens": (10, 25, 50, 100, 250, 500, 1000, 2000, 4000),
+}
+
+logger = logging.getLogger(__name__)
+
+_series = {}    # (이름, 레이블) -> 히스토그램
+_pending = []   # 아직 파일에 기록하지 않은 측정값
+_lock = threading.Lock()
+_last_export = 0.0
+
+def _buckets_for(name):
+    for suffix, buckets in BUCKETS.items():
+        if name.endswith(suffix):
+            return buckets
+    return BUCKETS["_seconds"]
+
+def observe(name, value, **labels):
+    """측정값 하나를 히스토그램에 추가합니다 (이름의 접미사로 단위를 구분: _seconds, _bytes, _tokens)."""
+    if not PROFILING:
+        return
+    key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            buckets = _buckets_for(name)
+            series = _series[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+        series["counts"][bisect.bisect_left(series["buckets"], value)] += 1
+        series["sum"] += value
+        series["count"] += 1
+        if PROFILE_LOG_PATH:
+            _pending.append({"ts": round(time.time(), 3), "metric": name, "value": value, "labels": dict(key[1])})
+
+@contextlib.contextmanager
+def timer(name, **labels):
+    """with 블록의 실행 시간을 기록합니다 (st.rerun/st.stop으로 빠져나가는 경우 포함)."""
+    if not PROFILING:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def timed(name, **labels):
+    """함수의 실행 시간을 기록하는 데코레이터 (프로파일링이 꺼져 있으면 함수를 그대로 반환)."""
+    def decorator(func):
+        if not PROFILING:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def snapshot():
+    """현재까지 모은 히스토그램의 복사본을 반환합니다."""
+    with _lock:
+        return [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "buckets": series["buckets"],
+                "counts": list(series["counts"]),
+                "sum": series["sum"],
+                "count": series["count"],
+            }
+            for (name, labels), series in sorted(_series.items())
+        ]
+
+def quantile(series, q):
+    """히스토그램 구간 안에서 선형 보간하여 분위수를 추정합니다 (Prometheus histogram_quantile과 같은 방식)."""
+    if not series["count"]:
+        return None
+    rank = q * series["count"]
+    cumulative = 0
+    lower = 0.0
+    for bound, count in zip(series["buckets"], series["counts"]):
+        if count and cumulative + count >= rank:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    # 가장 큰 구간(+Inf)에 속하면 마지막 유한 상한을 반환
+    return lower
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels.items()) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        f'{label}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for label, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def _format_number(value):
+    return "+Inf" if value == math.inf else repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_prometheus():
+    """히스토그램을 Prometheus 텍스트 형식으로 반환합니다."""
+    lines = []
+    typed = set()
+    for series in snapshot():
+        name, labels = series["name"], series["labels"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(series["buckets"] + (math.inf,), series["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_number(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {series['sum']!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+def flush():
+    """
+    쌓인 측정값을 JSONL 파일에 추가하고, PROFILE_EXPORT_INTERVAL마다 Prometheus 텍스트 파일을 갱신합니다.
+    스크립트 재실행이 끝날 때 호출되므로 측정할 때마다 파일을 열지 않습니다.
+    """
+    global _last_export
+    if not PROFILING:
+        return
+    with _lock:
+        pending = _pending[:]
+        del _pending[:]
+        export = bool(PROFILE_METRICS_PATH) and time.monotonic() - _last_export >= PROFILE_EXPORT_INTERVAL
+        if export:
+            _last_export = time.monotonic()
+
+    try:
+        if pending:
+            os.makedirs(os.path.dirname(os.path.abspath(PROFILE_LOG_PATH)), exist_ok=True)
+            with open(PROFILE_LOG_PATH, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in pending)
+        if export:
+            # 수집기가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+            os.makedirs(os.path.dirname(os.path.abspath(PROFILE_METRICS_PATH)), exist_ok=True)
+            temp_path = f"{PROFILE_METRICS_PATH}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(render_prometheus())
+            os.replace(temp_path, PROFILE_METRICS_PATH)
+    except OSError as e:
+        logger.warning("프로파일 기록 오류: %s", e)
+
+def is_admin(username):
+    """프로파일 페이지를 볼 수 있는 사용자인지 확인합니다."""
+    return PROFILING and username in ADMIN_USERS
@@ -0,0 +1,166 @@
+import os
+import time
+import sqlite3
+import logging
+import hashlib
+import threading
+from collections import OrderedDict
+
+# AI 응답 캐시 (선택 사항)
+#
+# 시스템 프롬프트와 정규화한 대화 전체를 해시한 키로 응답을 저장합니다.
+# 채팅 응답은 사용자별 범위(scope)로 나누어 다른 사용자와 공유하지 않습니다.
+# - memory: 프로세스 내 LRU + TTL 캐시
+# - disk: memory 캐시에 더해 SQLite 파일 캐시를 함께 사용 (프로세스 재시작 후에도 유지)
+# RESPONSE_CACHE 환경 변수가 설정되지 않으면 캐시를 사용하지 않습니다.
+
+CACHE_MODE = os.getenv("RESPONSE_CACHE", "off")
+
+# 최대 항목 수와 유효 시간 (초)
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 60 * 60)))
+
+# 키에 포함할 최근 메시지 수 (시스템 메시지 제외, 0이면 대화 전체)
+# 일부만 포함하면 앞부분이 다른 대화끼리 같은 응답을 받을 수 있습니다.
+CONTEXT_MESSAGES = int(os.getenv("RESPONSE_CACHE_CONTEXT_MESSAGES", "0"))
+
+CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "response_cache.db")
+)
+
+logger = logging.getLogger(__name__)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0}
+
+def is_enabled():
+    """캐시 사용 여부를 반환합니다."""
+    return CACHE_MODE in ("memory", "disk")
+
+def normalize(text):
+    """
+    공백과 대소문자 차이를 무시하도록 텍스트를 정규화합니다.
+    문장부호는 의미를 바꾸므로 ("그래요?"와 "그래요.") 그대로 둡니다.
+    """
+    return " ".join((text or "").split()).lower()
+
+def make_key(namespace, system_prompt, messages=(), scope=None):
+    """
+    캐시 키를 만듭니다.
+    namespace: 캐시 용도 ("chat", "emotion" 등)
+    messages: 정규화하여 키에 포함할 메시지 (CONTEXT_MESSAGES가 0보다 크면 마지막 그 수만큼만 사용)
+    scope: 캐시를 나누는 범위 (사용자 이름 등, 범위가 다르면 같은 대화라도 키가 다름)
+    """
+    messages = list(messages)
+    if CONTEXT_MESSAGES > 0:
+        messages = messages[-CONTEXT_MESSAGES:]
+    hasher = hashlib.sha256()
+    hasher.update(namespace.encode())
+    hasher.update(b"\0" + (scope or "").encode())
+    hasher.update(b"\0" + (system_prompt or "").encode())
+    for message in messages:
+        hasher.update(f"\0{message['role']}:{normalize(message.get('content', ''))}".encode())
+    return hasher.hexdigest()
+
+def chat_key(messages, scope=None):
+    """채팅 API 요청 메시지로 캐시 키를 만듭니다 (시스템 메시지는 모두 포함, scope는 사용자 이름)."""
+    system_prompt = "\n".join(msg["content"] for msg in messages if msg["role"] == "system")
+    return make_key("chat", system_prompt, [msg for msg in messages if msg["role"] != "system"], scope)
+
+def _connect():
+    conn = sqlite3.connect(CACHE_PATH, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+    )
+    return conn
+
+def _disk_get(key):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+    finally:
+        conn.close()
+    if row and time.time() - row[1] <= TTL_SECONDS:
+        return row[0], row[1]
+    return None
+
+def _disk_put(key, value, created):
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)", (key, value, created))
+            # 만료되었거나 최대 개수를 넘는 오래된 항목 정리
+            conn.execute("DELETE FROM cache WHERE created < ?", (time.time() - TTL_SECONDS,))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (MAX_ENTRIES,)
+            )
+    finally:
+        conn.close()
+
+def _memory_put(key, value, created):
+    with _lock:
+        _memory[key] = (value, created)
+        _memory.move_to_end(key)
+        while len(_memory) > MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+def get(key):
+    """캐시된 값을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+    if not is_enabled():
+        return None
+
+    with _lock:
+        entry = _memory.get(key)
+        if entry and time.time() - entry[1] <= TTL_SECONDS:
+            _memory.move_to_end(key)
+            _stats["hits"] += 1
+            _stats["memory_hits"] += 1
+            return entry[0]
+        if entry:
+            del _memory[key]
+
+    if CACHE_MODE == "disk":
+        try:
+            entry = _disk_get(key)
+        except sqlite3.Error as e:
+            logger.warning("응답 캐시 읽기 오류: %s", e)
+            entry = None
+        if entry:
+            _memory_put(key, *entry)
+            with _lock:
+                _stats["hits"] += 1
+                _stats["disk_hits"] += 1
+            return entry[0]
+
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+def put(key, value):
+    """값을 캐시에 저장합니다."""
+    if not is_enabled() or value is None:
+        return
+    created = time.time()
+    _memory_put(key, value, created)
+    if CACHE_MODE == "disk":
+        try:
+            _disk_put(key, value, created)
+        except sqlite3.Error as e:
+            logger.warning("응답 캐시 저장 오류: %s", e)
+
+def stats():
+    """캐시 적중/실패 횟수를 반환합니다."""
+    with _lock:
+        result = dict(_stats)
+        result["memory_entries"] = len(_memory)
+    return result
+
+def clear():
+    """프로세스 내 캐시와 통계를 초기화합니다."""
+    with _lock:
+        _memory.clear()
+        for name in _stats:
+            _stats[name] = 0
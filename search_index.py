@@ -0,0 +1,223 @@
+import re
+import math
+import unicodedata
+from collections import Counter
+
+# 대화 내용 전문 검색 (문자 바이그램 역색인)
+#
+# 형태소 분석기 없이 한국어를 검색할 수 있도록, 단어마다 연속한 두 글자(바이그램)를
+# 색인어로 사용합니다 ("오늘 기분" -> "오늘", "기분"; "우울했어요" -> "우울", "울했", ...).
+# 한 글자 단어는 그 글자 자체를 색인어로 사용합니다.
+#
+# 색인은 사용자 데이터베이스의 postings 테이블에 (색인어, 세션 번호, 메시지 순번, 빈도)로
+# 저장되며, storage.save_user가 새로 기록하는 메시지만 같은 트랜잭션 안에서 추가하므로
+# 대화를 저장할 때마다 색인도 증분 갱신됩니다. 세션 번호로 찾는 보조 인덱스는 색인만큼
+# 커지므로 두지 않고, 세션의 색인을 지울 때는 저장된 메시지 내용으로 색인어를 다시 계산합니다.
+# 메시지 본문은 storage가 압축된 묶음으로 보관하므로 읽는 함수는 storage가 넘겨줍니다.
+#
+# terms 테이블에는 색인어마다 그 색인어가 들어 있는 메시지 수(df)를 함께 갱신합니다.
+# 검색할 때는 df가 작은(드문) 색인어부터 후보 메시지를 모으고, 흔한 색인어는 후보 메시지에
+# 대해서만 찾아보므로 검색 비용이 "회사", "기분" 같은 흔한 바이그램의 게시 목록 길이가 아니라
+# 후보 수(MAX_CANDIDATES 이하)에 비례합니다.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    session_no INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, session_no, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# 검색 결과로 인정할 최소 색인어 일치 비율
+MIN_MATCH_RATIO = 0.5
+
+# 점수를 계산할 최대 후보 메시지 수
+# 드문 색인어의 게시 목록이 이보다 길면 최근 메시지부터 이 수만큼만 후보로 삼습니다.
+MAX_CANDIDATES = 2000
+
+# 후보 메시지를 한 번의 쿼리로 찾아볼 개수 (SQL 변수 수 제한)
+_CANDIDATE_BATCH = 400
+
+# 미리보기 문장 앞뒤 글자 수
+SNIPPET_CHARS = 40
+
+_WORD = re.compile(r"\w+")
+
+def normalize(text):
+    """검색용으로 텍스트를 정규화합니다 (유니코드 NFC, 소문자)."""
+    return unicodedata.normalize("NFC", text or "").lower()
+
+def tokenize(text):
+    """텍스트를 바이그램 색인어 목록으로 나눕니다 (중복 포함)."""
+    terms = []
+    for word in _WORD.findall(normalize(text)):
+        if len(word) == 1:
+            terms.append(word)
+        else:
+            terms.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return terms
+
+def index_messages(conn, session_no, messages, start=0):
+    """
+    메시지를 색인에 추가합니다 (session_no: sessions.no, start: 첫 메시지의 순번).
+    이미 색인된 (색인어, 메시지)는 빈도만 바꾸고, terms의 메시지 수는 새로 추가된 행만 셉니다.
+    """
+    frequency = Counter()
+    for offset, message in enumerate(messages):
+        seq = start + offset
+        for term, tf in Counter(tokenize(message.get("content"))).items():
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO postings (term, session_no, seq, tf) VALUES (?, ?, ?, ?)",
+                (term, session_no, seq, tf)
+            ).rowcount
+            if inserted:
+                frequency[term] += 1
+            else:
+                conn.execute(
+                    "UPDATE postings SET tf = ? WHERE term = ? AND session_no = ? AND seq = ?",
+                    (tf, term, session_no, seq)
+                )
+    if frequency:
+        conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+            frequency.items()
+        )
+
+def remove_session(conn, session_no, contents):
+    """세션의 색인을 삭제합니다 (contents: 세션에 저장된 메시지 내용 목록, 순번 순서)."""
+    rows = [
+        (term, session_no, seq)
+        for seq, content in enumerate(contents)
+        for term in set(tokenize(content))
+    ]
+    if rows:
+        conn.executemany("DELETE FROM postings WHERE term = ? AND session_no = ? AND seq = ?", rows)
+        frequency = Counter(term for term, _, _ in rows)
+        conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(df, term) for term, df in frequency.items()])
+        conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0", [(term,) for term in frequency])
+
+def count_terms(conn):
+    """저장된 색인으로 색인어별 메시지 수(terms)를 다시 계산합니다 (스키마 업그레이드 시 한 번)."""
+    conn.execute("DELETE FROM terms")
+    conn.execute("INSERT INTO terms (term, df) SELECT term, COUNT(*) FROM postings GROUP BY term")
+
+def rebuild(conn, messages):
+    """
+    전체 메시지로 색인을 새로 만듭니다 (스키마 업그레이드 시 한 번).
+    messages: (세션 번호, 순번, 내용) 목록
+    """
+    conn.execute("DELETE FROM postings")
+    conn.execute("DELETE FROM terms")
+    for session_no, seq, content in messages:
+        index_messages(conn, session_no, [{"content": content}], seq)
+
+def make_snippet(content, query):
+    """메시지에서 검색어가 처음 나타나는 부분을 중심으로 미리보기 문장을 만듭니다."""
+    content = content or ""
+    lowered = normalize(content)
+    position = -1
+    for word in _WORD.findall(normalize(query)):
+        position = lowered.find(word)
+        if position < 0:
+            # 단어 전체가 없으면 첫 번째로 일치하는 바이그램 위치 사용
+            for term in tokenize(word):
+                position = lowered.find(term)
+                if position >= 0:
+                    break
+        if position >= 0:
+            break
+    position = max(position, 0)
+    start = max(position - SNIPPET_CHARS, 0)
+    end = min(position + SNIPPET_CHARS, len(content))
+    snippet = " ".join(content[start:end].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
+
+def search(conn, query, load_message, limit=50):
+    """
+    검색어와 관련된 세션을 점수 순으로 반환합니다.
+    load_message(conn, 세션 번호, 순번)는 메시지의 (세션 id, 내용)을 반환합니다 (없으면 None).
+    반환값: [{"session_id", "score", "seq", "snippet"}, ...]
+    점수는 일치한 색인어의 IDF 합이며, 세션 점수는 가장 잘 일치한 메시지의 점수입니다.
+
+    검색어의 색인어 중 required개 이상이 들어 있는 메시지는 드문 색인어 (색인어 수 - required + 1)개 중
+    적어도 하나를 포함하므로, 그 색인어들의 게시 목록으로 후보를 모으고 나머지 색인어는 후보에서만
+    찾아봅니다. 드문 색인어의 게시 목록이 모두 MAX_CANDIDATES 이하이면 결과는 전체를 계산한 것과 같고,
+    더 길면 (기본 키 순서로 바로 읽을 수 있는) 최근 메시지부터 잘라 그 안에서만 순위를 매깁니다.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    placeholders = ",".join("?" * len(terms))
+    document_frequency = dict(conn.execute(
+        f"SELECT term, df FROM terms WHERE term IN ({placeholders}) AND df > 0", tuple(terms)
+    ))
+    required = math.ceil(len(terms) * MIN_MATCH_RATIO)
+    if len(document_frequency) < required:
+        return []
+
+    total_messages = conn.execute("SELECT SUM(message_count) FROM sessions").fetchone()[0] or 1
+    idf = {term: math.log(1 + total_messages / df) for term, df in document_frequency.items()}
+    ordered = sorted(document_frequency, key=lambda term: (document_frequency[term], term))
+    rare_count = len(ordered) - required + 1
+
+    scores = {}
+    matched = Counter()
+    def add(term, session_no, seq, tf):
+        key = (session_no, seq)
+        scores[key] = scores.get(key, 0.0) + idf[term] * (1 + math.log(tf))
+        matched[key] += 1
+
+    for term in ordered[:rare_count]:
+        for session_no, seq, tf in conn.execute(
+            "SELECT session_no, seq, tf FROM postings WHERE term = ? ORDER BY session_no DESC, seq DESC LIMIT ?",
+            (term, MAX_CANDIDATES)
+        ):
+            add(term, session_no, seq, tf)
+    if len(scores) > MAX_CANDIDATES:
+        kept = sorted(scores, key=scores.get, reverse=True)[:MAX_CANDIDATES]
+        scores = {key: scores[key] for key in kept}
+
+    # 흔한 색인어는 후보 메시지마다 기본 키로 찾아봄
+    common = ordered[rare_count:]
+    candidates = list(scores) if common else []
+    for start in range(0, len(candidates), _CANDIDATE_BATCH):
+        batch = candidates[start:start + _CANDIDATE_BATCH]
+        rows = conn.execute(
+            f"WITH candidates (session_no, seq) AS (VALUES {','.join(['(?, ?)'] * len(batch))}) "
+            "SELECT p.term, p.session_no, p.seq, p.tf FROM candidates c JOIN postings p "
+            f"ON p.term IN ({','.join('?' * len(common))}) AND p.session_no = c.session_no AND p.seq = c.seq",
+            tuple(value for key in batch for value in key) + tuple(common)
+        )
+        for term, session_no, seq, tf in rows:
+            add(term, session_no, seq, tf)
+
+    best = {}
+    # 세션 안에서 점수가 같으면 앞선 메시지 먼저
+    for key, score in sorted(scores.items()):
+        if matched[key] < required:
+            continue
+        session_no = key[0]
+        if session_no not in best or score > best[session_no][0]:
+            best[session_no] = (score, key[1])
+
+    # 점수가 같으면 최근 세션 먼저
+    ranked = sorted(best.items(), key=lambda item: (item[1][0], item[0]), reverse=True)[:limit]
+    results = []
+    for session_no, (score, seq) in ranked:
+        row = load_message(conn, session_no, seq)
+        if row is None:
+            continue
+        results.append({
+            "session_id": row[0],
+            "score": score,
+            "seq": seq,
+            "snippet": make_snippet(row[1], query),
+        })
+    return results
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextlib
+
+# 공유 세션 저장소 (선택 사항)
+#
+# 한 호스트에서 로드 밸런서 뒤의 여러 Streamlit 프로세스가 같은 사용자를 처리할 수 있도록
+# 진행 중인 대화 상태(SHARED_KEYS)를 프로세스 밖에 키(사용자와 브라우저 탭)별로 보관합니다.
+# 다른 프로세스로 연결이 옮겨져도 같은 탭에서 로그인하면 진행 중이던 대화를 이어갈 수 있습니다.
+# 사용자 데이터(채팅 기록)는 이 저장소가 아닌 storage의 SQLite 파일(data/user_data)에 있으므로
+# 모든 프로세스가 같은 호스트의 로컬 디스크에서 같은 data/user_data 디렉터리를 사용해야 합니다.
+# SQLite(WAL)는 네트워크 파일 시스템에서 잠금이 보장되지 않으므로 여러 호스트에 나누어 실행할 수는 없습니다.
+# - local: 공유하지 않음 (기본값)
+# - file: SESSION_STORE_DIR 아래 JSON 파일과 fcntl 파일 잠금
+# - redis: Redis 호환 서버 (REDIS_URL, redis 패키지 필요)
+#          REDIS_URL=memory:// 이면 프로세스 내 대체 구현(MemoryRedis)을 사용하므로 서버 없이 시험할 수 있습니다.
+
+SESSION_STORE = os.getenv("SESSION_STORE", "local")
+SESSION_STORE_DIR = os.getenv(
+    "SESSION_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sessions")
+)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_PREFIX = os.getenv("REDIS_PREFIX", "therapychat")
+
+# 진행 중인 대화 상태 보관 기간 (초)
+SESSION_STATE_TTL = int(os.getenv("SESSION_STATE_TTL", str(7 * 24 * 60 * 60)))
+
+# 사용자별 잠금 대기 시간과 (redis) 잠금 만료 시간 (초)
+LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "10"))
+LOCK_EXPIRE = float(os.getenv("SESSION_LOCK_EXPIRE", "30"))
+
+# (file) 만료된 상태 파일을 정리하는 간격 (초)
+PRUNE_INTERVAL = 60 * 60
+
+# 프로세스 사이에 공유하는 세션 상태 키
+SHARED_KEYS = ("messages", "current_chat_id", "selected_emotion", "chat_started")
+
+# 잠금 키의 값이 자신의 토큰일 때만 지우는 스크립트 (확인과 삭제를 한 번에 실행)
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+def _wait(acquire, timeout, name):
+    """acquire()가 성공할 때까지 재시도합니다 (timeout초가 지나면 TimeoutError)."""
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while not acquire():
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"잠금 대기 시간 초과: {name}")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+class FileSessionStore:
+    """JSON 파일과 fcntl 잠금을 사용하는 저장소 (같은 디스크를 공유하는 프로세스용)"""
+
+    def __init__(self, root):
+        self.root = root
+        self._pruned_at = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, username, suffix):
+        return os.path.join(self.root, f"{username}{suffix}")
+
+    @contextlib.contextmanager
+    def lock(self, username, timeout=LOCK_TIMEOUT):
+        """사용자별 배타 잠금 (프로세스와 스레드 모두 직렬화)"""
+        import fcntl
+        path = self._path(username, ".lock")
+        f = None
+
+        def acquire():
+            nonlocal f
+            if f is None:
+                f = open(path, "a+")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            # 기다리는 동안 clear()가 잠금 파일을 지웠으면 새 파일을 열어 다시 시도
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(f.fileno()).st_ino:
+                f.close()
+                f = None
+                return False
+            return True
+
+        try:
+            _wait(acquire, timeout, username)
+            yield
+        finally:
+            if f is not None:
+                f.close()
+
+    def _read(self, username):
+        try:
+            with open(self._path(username, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def load(self, username):
+        """저장된 상태를 {"version", "state"}로 반환합니다 (없거나 만료되었으면 None)."""
+        record = self._read(username)
+        if record is None or time.time() - record.get("updated_at", 0) > SESSION_STATE_TTL:
+            return None
+        return record
+
+    def save(self, username, state):
+        """상태를 저장하고 새 버전 번호를 반환합니다."""
+        with self.lock(username):
+            # 버전은 만료된 기록에서도 이어감 (삭제되거나 정리된 뒤에는 1부터 다시 시작)
+            current = self._read(username)
+            record = {
+                "version": (current.get("version", 0) if current else 0) + 1,
+                "updated_at": time.time(),
+                "state": state,
+            }
+            # 읽는 쪽이 쓰는 도중의 파일을 보지 않도록 임시 파일에 쓴 뒤 교체
+            path = self._path(username, ".json")
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        if time.time() - self._pruned_at > PRUNE_INTERVAL:
+            self.prune()
+        return record["version"]
+
+    def _remove(self, username):
+        """상태 파일과 잠금 파일을 지웁니다 (잠금을 가진 상태에서 호출)."""
+        for suffix in (".json", ".lock"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._path(username, suffix))
+
+    def clear(self, username):
+        """저장된 상태를 삭제합니다 (로그아웃 시)."""
+        with self.lock(username):
+            self._remove(username)
+
+    def prune(self):
+        """
+        SESSION_STATE_TTL이 지난 상태 파일과 잠금 파일을 지웁니다 (로그아웃하지 않고 닫은 탭).
+        다른 프로세스가 사용 중인 잠금은 기다리지 않고 건너뜁니다.
+        """
+        self._pruned_at = time.time()
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            username = name[:-len(".json")]
+            try:
+                with self.lock(username, timeout=0):
+                    record = self._read(username)
+                    if record is None or time.time() - record.get("updated_at", 0) > SESSION_STATE_TTL:
+                        self._remove(username)
+            except TimeoutError:
+                continue
+
+class MemoryRedis:
+    """
+    RedisSessionStore가 사용하는 명령(get, set, delete, incr, expire, RELEASE_SCRIPT의 eval)만 구현한 프로세스 내 대체 구현
+    Redis 서버 없이 redis 백엔드를 시험할 때 사용합니다.
+    """
+
+    def __init__(self):
+        self._data = {}     # 키 -> (값, 만료 시각)
+        self._lock = threading.Lock()
+
+    def _get(self, name):
+        item = self._data.get(name)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._data[name]
+            return None
+        return item
+
+    def get(self, name):
+        with self._lock:
+            item = self._get(name)
+            return None if item is None else item[0]
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._get(name) is not None:
+                return None
+            expire = ex if ex is not None else (px / 1000 if px is not None else None)
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            self._data[name] = (value, None if expire is None else time.monotonic() + expire)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def incr(self, name):
+        with self._lock:
+            item = self._get(name)
+            value = int(item[0]) + 1 if item is not None else 1
+            self._data[name] = (str(value).encode("utf-8"), item[1] if item is not None else None)
+            return value
+
+    def expire(self, name, seconds):
+        with self._lock:
+            item = self._get(name)
+            if item is None:
+                return False
+            self._data[name] = (item[0], time.monotonic() + seconds)
+            return True
+
+    def eval(self, script, numkeys, *args):
+        """RELEASE_SCRIPT만 지원합니다 (값 확인과 삭제를 같은 잠금 안에서 실행)."""
+        if script != RELEASE_SCRIPT or numkeys != 1:
+            raise NotImplementedError("MemoryRedis는 RELEASE_SCRIPT만 실행할 수 있습니다")
+        name, token = args
+        if isinstance(token, str):
+            token = token.encode("utf-8")
+        with self._lock:
+            item = self._get(name)
+            if item is None or item[0] != token:
+                return 0
+            del self._data[name]
+            return 1
+
+class RedisSessionStore:
+    """Redis 호환 서버를 사용하는 저장소 (같은 호스트의 여러 프로세스용, 세션 디렉터리 대신 서버에 보관)"""
+
+    def __init__(self, client, prefix=REDIS_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, kind, username):
+        return f"{self.prefix}:{kind}:{username}"
+
+    @contextlib.contextmanager
+    def lock(self, username, timeout=LOCK_TIMEOUT):
+        """
+        사용자별 배타 잠금 (SET NX PX)
+        잠금을 가진 프로세스가 죽어도 LOCK_EXPIRE초 뒤에는 풀립니다.
+        """
+        key = self._key("lock", username)
+        token = uuid.uuid4().hex.encode("utf-8")
+        _wait(lambda: self.client.set(key, token, px=int(LOCK_EXPIRE * 1000), nx=True), timeout, username)
+        try:
+            yield
+        finally:
+            # 만료된 뒤 다른 프로세스가 얻은 잠금은 지우지 않음 (GET과 DEL 사이에 잠금이 바뀌지 않도록 스크립트로 실행)
+            self.client.eval(RELEASE_SCRIPT, 1, key, token)
+
+    def load(self, username):
+        """저장된 상태를 {"version", "state"}로 반환합니다 (없거나 만료되었으면 None)."""
+        value = self.client.get(self._key("state", username))
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def save(self, username, state):
+        """상태를 저장하고 새 버전 번호를 반환합니다."""
+        with self.lock(username):
+            # 버전은 별도 카운터로 관리하고 상태와 같은 기간 뒤에 만료 (로그아웃하지 않고 닫은 탭의 키가 남지 않도록)
+            version_key = self._key("version", username)
+            version = self.client.incr(version_key)
+            self.client.expire(version_key, SESSION_STATE_TTL)
+            record = {"version": version, "updated_at": time.time(), "state": state}
+            self.client.set(
+                self._key("state", username),
+                json.dumps(record, ensure_ascii=False).encode("utf-8"),
+                ex=SESSION_STATE_TTL
+            )
+            return version
+
+    def clear(self, username):
+        """저장된 상태와 버전 카운터를 삭제합니다 (로그아웃 시)."""
+        with self.lock(username):
+            self.client.delete(self._key("state", username), self._key("version", username))
+
+def _create_store():
+    if SESSION_STORE == "file":
+        return FileSessionStore(SESSION_STORE_DIR)
+    if SESSION_STORE == "redis":
+        if REDIS_URL.startswith("memory://"):
+            return RedisSessionStore(MemoryRedis())
+        import redis
+        return RedisSessionStore(redis.Redis.from_url(REDIS_URL))
+    return None
+
+def get_store():
+    """설정된 공유 세션 저장소를 반환합니다 (local이면 None)."""
+    global _store
+    with _store_lock:
+        if _store is None and SESSION_STORE != "local":
+            _store = _create_store()
+        return _store
+
+def is_enabled():
+    """공유 세션 저장소 사용 여부를 반환합니다."""
+    return SESSION_STORE in ("file", "redis")
@@ -0,0 +1,976 @@
+import os
+import copy
+import time
+import uuid
+import zlib
+import pickle
+import sqlite3
+import logging
+import hashlib
+import datetime
+import itertools
+import threading
+import msgpack
+import search_index
+
+# 사용자 데이터 저장소 (SQLite)
+#
+# 사용자별로 하나의 SQLite 파일(<username>.db)을 사용합니다.
+# - meta: chat_sessions를 제외한 최상위 키 (profile, emotion_goals 등)
+# - sessions: 채팅 세션 헤더 (id, 날짜, 감정, 미리보기, 메시지 수)
+# - messages: 세션의 메시지를 MESSAGE_CHUNK개씩 묶어 한 행에 저장 ((세션 번호, 묶음의 첫 순번) 순서)
+#   묶음은 메시지 딕셔너리 목록을 msgpack으로 직렬화한 뒤 zlib으로 압축합니다.
+#   행마다 붙는 키와 B-tree 오버헤드가 메시지 수가 아닌 묶음 수에 비례하고, 같은 대화의
+#   메시지끼리(반복되는 키 이름 포함) 압축되므로 메시지 한 건당 한 행보다 파일이 작고
+#   로드할 때 행과 컬럼을 딕셔너리로 다시 조립하지 않아도 됩니다.
+#   세션은 문자열 id 대신 정수 번호(sessions.no)로 참조하므로 메시지와 검색 색인의
+#   행마다 id가 반복 저장되지 않습니다.
+# - summaries: 끝난 대화의 요약 (summarizer가 백그라운드에서 계산, 세션 하나당 한 행)
+#   세션 헤더와 따로 보관하므로 저장/버전 비교에 영향을 주지 않으며, 메시지가 다시
+#   기록되거나 세션이 삭제되면 함께 지워집니다.
+#
+# meta 값과 컬럼에 없는 추가 필드는 msgpack으로 직렬화합니다. pickle과 달리 로드할 때
+# 임의의 코드가 실행되지 않습니다. pickle은 이전 형식을 옮길 때(import_pickle,
+# 스키마 4 이전 데이터베이스) 한 번만 읽습니다. 스키마 버전은 PRAGMA user_version에
+# 기록하며, 이전 버전의 데이터베이스는 처음 열 때 _migrate로 한 번 옮깁니다.
+#
+# 저장 시에는 마지막으로 저장된 상태와 비교하여 변경된 세션 헤더와
+# 새로 추가된 메시지만 기록하므로, 쓰기 비용이 전체 대화 기록이 아닌
+# 새 메시지 크기에 비례합니다 (덜 찬 마지막 묶음은 새 메시지를 붙여 다시 기록). load_user로 로드한 데이터는 mark_dirty로 표시한
+# 세션만 비교하므로, 변경이 없는 저장은 세션 수와 관계없이 meta 키만 확인합니다.
+# (VERSIONS_KEY가 없는 데이터는 모든 세션을 비교합니다.)
+#
+# include_messages=False로 로드하면 세션 헤더(message_count 포함)만 읽고,
+# 메시지 본문은 load_session_messages로 필요할 때 가져옵니다. "messages" 키가
+# 없는 세션을 저장하면 헤더만 갱신하고 기존 메시지는 그대로 둡니다.
+#
+# postings 테이블에는 메시지 내용의 검색 색인(search_index)을 함께 보관하며,
+# 메시지를 기록하거나 지울 때 같은 트랜잭션에서 갱신합니다.
+#
+# 동시 저장 (같은 사용자의 여러 탭/프로세스):
+# - 모든 기록은 하나의 SQLite 트랜잭션이며 synchronous=FULL로 커밋마다 fsync하므로,
+#   기록 중 프로세스가 죽어도 마지막으로 완료된 상태가 남습니다.
+# - meta 키와 세션마다 버전을 두고, 로드한 데이터의 "_versions" 키에 이 데이터가 기준으로 삼은
+#   버전을 보관합니다 (낙관적 버전 관리). 세션 딕셔너리의 "version"은 로드할 때의 버전입니다.
+#   다른 탭이 그 사이에 바꾼 항목은 덮어쓰지 않고 다음과 같이 합칩니다.
+#   - 메시지가 저장된 메시지 뒤에 이어지는 세션: 새 메시지만 추가
+#   - 메시지가 서로 달라진 세션: 이 탭의 내용을 "<id>_conflict_..." 사본 세션으로 저장
+#   - 헤더만 로드된 세션: 저장된 값을 유지
+#   - meta 키: 저장된 값과 이 탭의 값을 merge_values로 합침. register_derived로 등록된 키
+#     (emotion_stats 등 세션에서 계산하는 값)는 저장된 세션 헤더로 다시 계산합니다.
+#     합친 값은 VERSIONS_KEY에 남겨 두었다가 다음 저장 때 apply_merged로 이 탭의 데이터에 반영합니다.
+# - 저장할 데이터에 없는 세션은 지우지 않습니다. 세션 삭제는 delete_session으로 하며,
+#   삭제 기록(deleted_sessions)이 남아 다른 탭이 같은 세션을 다시 저장하지 않습니다.
+
+SCHEMA_VERSION = 7
+
+# 세션 딕셔너리에서 별도 컬럼으로 저장되는 키
+SESSION_COLUMNS = ("id", "date", "emotion", "preview", "messages", "message_count", "version")
+
+# 사용자 데이터에서 저장하지 않는 키 (이 데이터가 기준으로 삼은 버전)
+VERSIONS_KEY = "_versions"
+
+# freeze로 복사한 데이터에서 복사할 때의 변경 표시를 담는 키 (저장하지 않음)
+DIRTY_KEY = "_dirty"
+
+# messages 테이블의 행 하나에 묶어 저장하는 메시지 수 (순번 0부터 이 크기로 나눔)
+MESSAGE_CHUNK = 16
+
+# 스키마 4, 5에서 정수 코드로 저장하던 역할 (목록의 위치가 코드, 이전할 때만 사용)
+ROLES = ("user", "assistant", "system")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# 충돌할 때 세션 헤더로 다시 계산하는 meta 키 -> 함수(세션 헤더 목록) (register_derived 참고)
+DERIVED_KEYS = {}
+
+logger = logging.getLogger(__name__)
+
+# 변경된 세션 표시 (세션 id -> 표시한 순번, 저장 중에 다시 바뀐 세션을 구분)
+_dirty_counter = itertools.count(1)
+_dirty_lock = threading.Lock()
+
+# 데이터베이스 경로별 마지막 저장 상태 (프로세스 내 캐시)
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    no INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    date TEXT,
+    emotion TEXT,
+    preview TEXT,
+    message_count INTEGER NOT NULL,
+    last_hash TEXT,
+    extra BLOB,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_no INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (session_no, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summaries (
+    session_no INTEGER PRIMARY KEY,
+    message_count INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deleted_sessions (
+    id TEXT PRIMARY KEY,
+    deleted_at REAL NOT NULL
+);
+"""
+
+# 스키마 6 이전의 메시지 테이블 (메시지 한 건당 한 행, _migrate_to_v6에서 묶음으로 옮김)
+_MESSAGES_V5 = """
+CREATE TABLE messages (
+    session_no INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    role,
+    content TEXT,
+    extra BLOB,
+    PRIMARY KEY (session_no, seq)
+) WITHOUT ROWID
+"""
+
+def _connect(db_path):
+    """데이터베이스 연결을 열고 스키마를 준비합니다."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # 커밋마다 WAL 파일을 fsync (전원이 나가도 커밋된 저장은 유지)
+    conn.execute("PRAGMA synchronous=FULL")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        conn.executescript(_SCHEMA + search_index.SCHEMA)
+        conn.execute("INSERT OR IGNORE INTO state (id, revision) VALUES (0, 0)")
+        # 여러 프로세스가 동시에 열어도 이전은 한 번만 수행
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if 0 < version < SCHEMA_VERSION:
+                _migrate(conn, version)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            conn.close()
+            raise
+        if 0 < version < 6:
+            # 옮기면서 비워진 페이지를 정리하여 파일 크기를 줄임 (다른 연결이 사용 중이면 다음 기회에)
+            try:
+                conn.execute("VACUUM")
+            except sqlite3.OperationalError:
+                pass
+    return conn
+
+def _execute_script(conn, script):
+    """여러 SQL 문을 현재 트랜잭션 안에서 실행합니다 (executescript는 트랜잭션을 먼저 커밋함)."""
+    for statement in script.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+def _migrate(conn, version):
+    """이전 스키마 버전의 데이터베이스를 현재 형식으로 옮깁니다 (트랜잭션 안에서 호출)."""
+    if version < 3:
+        # 버전 컬럼이 없던 데이터베이스는 모든 항목을 버전 0으로 시작
+        conn.execute("ALTER TABLE meta ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if version < 4:
+        _migrate_to_v4(conn)
+    if version < 6:
+        _migrate_to_v6(conn)
+    if version < 4:
+        # 검색 색인과 세션 변환은 메시지를 묶음 형식으로 옮긴 뒤에 수행
+        search_index.rebuild(conn, _stored_contents(conn))
+        _migrate_chat_history(conn)
+    elif version < 7:
+        # 색인어별 메시지 수는 저장된 색인으로 계산
+        search_index.count_terms(conn)
+    conn.execute("UPDATE state SET revision = revision + 1 WHERE id = 0")
+
+def _migrate_to_v4(conn):
+    """
+    세션 번호로 메시지를 참조하는 테이블 구조로 다시 만들고, pickle로 직렬화된 값을
+    msgpack으로 바꿉니다. 메시지는 스키마 5의 형식(한 건당 한 행)으로 옮기며,
+    검색 색인은 _migrate에서 묶음 형식으로 옮긴 뒤에 다시 만듭니다.
+    """
+    conn.execute("DROP INDEX IF EXISTS postings_session")
+    conn.execute("DROP TABLE IF EXISTS postings")
+    conn.execute("ALTER TABLE sessions RENAME TO sessions_v3")
+    conn.execute("ALTER TABLE messages RENAME TO messages_v3")
+    conn.execute(_MESSAGES_V5)
+    _execute_script(conn, _SCHEMA + search_index.SCHEMA)
+    conn.execute(
+        "INSERT INTO sessions (id, position, date, emotion, preview, message_count, last_hash, extra, version) "
+        "SELECT id, position, date, emotion, preview, message_count, last_hash, extra, version "
+        "FROM sessions_v3 ORDER BY position"
+    )
+    role_codes = " ".join(f"WHEN '{role}' THEN {code}" for role, code in _ROLE_CODES.items())
+    conn.execute(
+        "INSERT INTO messages (session_no, seq, role, content, extra) "
+        f"SELECT s.no, m.seq, CASE m.role {role_codes} ELSE m.role END, m.content, m.extra "
+        "FROM messages_v3 m JOIN sessions s ON s.id = m.session_id"
+    )
+    conn.execute("DROP TABLE sessions_v3")
+    conn.execute("DROP TABLE messages_v3")
+
+    conn.executemany("UPDATE messages SET extra = ? WHERE session_no = ? AND seq = ?", [
+        (_pack(pickle.loads(extra)), session_no, seq)
+        for session_no, seq, extra in conn.execute(
+            "SELECT session_no, seq, extra FROM messages WHERE extra IS NOT NULL"
+        ).fetchall()
+    ])
+    conn.executemany("UPDATE meta SET value = ? WHERE key = ?", [
+        (_pack(pickle.loads(value)), key)
+        for key, value in conn.execute("SELECT key, value FROM meta").fetchall()
+    ])
+    conn.executemany("UPDATE sessions SET extra = ? WHERE id = ?", [
+        (_pack(pickle.loads(extra)), session_id)
+        for session_id, extra in conn.execute("SELECT id, extra FROM sessions WHERE extra IS NOT NULL").fetchall()
+    ])
+    # 마지막 메시지 해시도 새 직렬화 형식으로 다시 계산
+    conn.executemany("UPDATE sessions SET last_hash = ? WHERE id = ?", [
+        (_message_hash(_row_message(role, content, extra)), session_id)
+        for session_id, role, content, extra in conn.execute(
+            "SELECT s.id, m.role, m.content, m.extra FROM sessions s "
+            "JOIN messages m ON m.session_no = s.no AND m.seq = s.message_count - 1"
+        ).fetchall()
+    ])
+
+def _migrate_to_v6(conn):
+    """
+    메시지 한 건당 한 행이던 테이블을 MESSAGE_CHUNK개씩 압축한 묶음으로 다시 만들고,
+    세션 번호로 검색 색인을 찾던 보조 인덱스(postings_session)를 지웁니다.
+    색인의 (세션 번호, 순번)은 그대로이므로 다시 만들지 않습니다.
+    """
+    conn.execute("DROP INDEX IF EXISTS postings_session")
+    conn.execute("ALTER TABLE messages RENAME TO messages_v5")
+    _execute_script(conn, _SCHEMA)
+    rows = conn.execute("SELECT session_no, role, content, extra FROM messages_v5 ORDER BY session_no, seq")
+    for session_no, group in itertools.groupby(rows.fetchall(), key=lambda row: row[0]):
+        messages = [_row_message(role, content, extra) for _, role, content, extra in group]
+        _insert_messages(conn, session_no, messages, 0)
+    conn.execute("DROP TABLE messages_v5")
+
+def _legacy_chat_session(data, date):
+    """chat_sessions가 없던 형식의 chat_history를 세션 하나로 만듭니다."""
+    history = data["chat_history"]
+    emotions = data.get("emotions")
+    return {
+        "id": f"chat_legacy_{date}",
+        "date": date,
+        "emotion": emotions[-1] if emotions else None,
+        "preview": history[0]["content"] if history else "이전 대화",
+        "messages": history,
+    }
+
+def _migrate_chat_history(conn):
+    """세션이 하나도 없고 chat_history만 있는 데이터베이스는 이를 세션으로 한 번 옮깁니다."""
+    if conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone():
+        return
+    meta = {
+        key: _unpack(value)
+        for key, value in conn.execute("SELECT key, value FROM meta WHERE key IN ('chat_history', 'emotions')")
+    }
+    if not meta.get("chat_history"):
+        return
+    session = _legacy_chat_session(meta, datetime.datetime.now().isoformat())
+    _write_session(conn, session, _session_signature(session), None, 0, 1)
+
+def _digest(blob):
+    """바이트열의 짧은 해시값을 계산합니다."""
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+def _pack_default(value):
+    """msgpack이 직접 지원하지 않는 값을 변환합니다."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"저장할 수 없는 값입니다: {type(value).__name__}")
+
+def _pack(value):
+    """값을 msgpack 바이트열로 직렬화합니다."""
+    return msgpack.packb(value, use_bin_type=True, default=_pack_default)
+
+def _unpack(blob):
+    """msgpack 바이트열을 값으로 되돌립니다."""
+    return msgpack.unpackb(blob, raw=False, strict_map_key=False)
+
+def _message_hash(message):
+    """메시지 내용의 해시값을 계산합니다."""
+    return _digest(_pack(message))
+
+def _extra(source, columns):
+    """컬럼으로 저장되지 않는 나머지 키를 직렬화합니다."""
+    extra = {k: v for k, v in source.items() if k not in columns}
+    if not extra:
+        return None
+    return _pack(extra)
+
+def _session_signature(session, old_signature=None):
+    """세션의 변경 여부를 판단하기 위한 요약값을 만듭니다."""
+    extra = _extra(session, SESSION_COLUMNS)
+    if "messages" in session:
+        messages = session["messages"]
+        message_count = len(messages)
+        last_hash = _message_hash(messages[-1]) if messages else None
+    elif old_signature is not None:
+        # 메시지 본문이 로드되지 않은 세션은 저장된 메시지를 그대로 유지
+        message_count, last_hash = old_signature[3], old_signature[4]
+    else:
+        message_count, last_hash = 0, None
+    return (
+        session.get("date"),
+        session.get("emotion"),
+        session.get("preview"),
+        message_count,
+        last_hash,
+        _digest(extra) if extra else None,
+    )
+
+def _extends(session, old_signature):
+    """세션의 메시지가 저장된 메시지를 그대로 포함하고 뒤에 이어지는지 확인합니다."""
+    if "messages" not in session:
+        return False
+    messages = session["messages"]
+    old_count = old_signature[3]
+    return old_count <= len(messages) and (
+        old_count == 0 or _message_hash(messages[old_count - 1]) == old_signature[4]
+    )
+
+def _read_revision(conn):
+    return conn.execute("SELECT revision FROM state WHERE id = 0").fetchone()[0]
+
+def _read_snapshot(conn):
+    """데이터베이스에서 세션 헤더와 meta 해시를 읽어 스냅샷을 만듭니다."""
+    snapshot = {
+        "revision": _read_revision(conn),
+        "meta": {},
+        "meta_versions": {},
+        "sessions": {},
+        "session_versions": {},
+        "deleted": set(),
+        "next_position": 0,
+    }
+    for key, value, version in conn.execute("SELECT key, value, version FROM meta"):
+        snapshot["meta"][key] = _digest(value)
+        snapshot["meta_versions"][key] = version
+    for row in conn.execute(
+        "SELECT id, position, date, emotion, preview, message_count, last_hash, extra, version FROM sessions"
+    ):
+        session_id, position, date, emotion, preview, count, last_hash, extra, version = row
+        snapshot["sessions"][session_id] = (date, emotion, preview, count, last_hash, _digest(extra) if extra else None)
+        snapshot["session_versions"][session_id] = version
+        snapshot["next_position"] = max(snapshot["next_position"], position + 1)
+    for (session_id,) in conn.execute("SELECT id FROM deleted_sessions"):
+        snapshot["deleted"].add(session_id)
+    return snapshot
+
+def _get_snapshot(conn, db_path):
+    """캐시된 스냅샷이 최신이면 재사용하고, 아니면 다시 읽습니다."""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(db_path)
+    if snapshot is None or snapshot["revision"] != _read_revision(conn):
+        snapshot = _read_snapshot(conn)
+    return snapshot
+
+def exists(db_path):
+    """사용자 데이터베이스가 존재하는지 확인합니다."""
+    return os.path.exists(db_path)
+
+def _row_message(role, content, extra):
+    """스키마 6 이전 형식의 메시지 행을 딕셔너리로 만듭니다 (이전할 때만 사용)."""
+    if isinstance(role, int):
+        role = ROLES[role]
+    message = {"role": role, "content": content}
+    if extra:
+        message.update(_unpack(extra))
+    return message
+
+def _pack_chunk(messages):
+    """메시지 묶음을 압축된 바이트열로 직렬화합니다."""
+    return zlib.compress(_pack(messages))
+
+def _unpack_chunk(blob):
+    """압축된 메시지 묶음을 메시지 딕셔너리 목록으로 되돌립니다."""
+    return _unpack(zlib.decompress(blob))
+
+def _read_contents(conn, session_no):
+    """세션에 저장된 메시지 내용을 순번 순서의 목록으로 반환합니다."""
+    return [
+        message.get("content")
+        for (data,) in conn.execute("SELECT data FROM messages WHERE session_no = ? ORDER BY seq", (session_no,))
+        for message in _unpack_chunk(data)
+    ]
+
+def _stored_contents(conn):
+    """저장된 모든 메시지의 (세션 번호, 순번, 내용) 목록을 반환합니다."""
+    return [
+        (session_no, seq + offset, message.get("content"))
+        for session_no, seq, data in conn.execute("SELECT session_no, seq, data FROM messages").fetchall()
+        for offset, message in enumerate(_unpack_chunk(data))
+    ]
+
+def _load_message(conn, session_no, seq):
+    """메시지 하나의 (세션 id, 내용)을 반환합니다 (없으면 None, 검색 결과의 미리보기에 사용)."""
+    row = conn.execute(
+        "SELECT s.id, m.data FROM sessions s JOIN messages m ON m.session_no = s.no "
+        "WHERE s.no = ? AND m.seq = ?", (session_no, seq - seq % MESSAGE_CHUNK)
+    ).fetchone()
+    if row is None:
+        return None
+    messages = _unpack_chunk(row[1])
+    if seq % MESSAGE_CHUNK >= len(messages):
+        return None
+    return row[0], messages[seq % MESSAGE_CHUNK].get("content")
+
+def load_user(db_path, include_messages=True):
+    """
+    사용자 데이터를 딕셔너리로 로드합니다.
+    include_messages가 False이면 세션에 messages 대신 message_count만 포함합니다.
+    각 세션의 "version"과 VERSIONS_KEY에 로드한 시점의 버전을 담습니다.
+    데이터베이스가 없으면 FileNotFoundError를 발생시킵니다.
+    """
+    if not exists(db_path):
+        raise FileNotFoundError(db_path)
+
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN")
+        data = {}
+        for key, value in conn.execute("SELECT key, value FROM meta"):
+            data[key] = _unpack(value)
+
+        messages_by_session = {}
+        if include_messages:
+            for session_no, chunk in conn.execute("SELECT session_no, data FROM messages ORDER BY session_no, seq"):
+                messages_by_session.setdefault(session_no, []).extend(_unpack_chunk(chunk))
+
+        chat_sessions = []
+        for session_no, session_id, date, emotion, preview, message_count, extra, version in conn.execute(
+            "SELECT no, id, date, emotion, preview, message_count, extra, version FROM sessions ORDER BY position"
+        ):
+            session = {
+                "id": session_id,
+                "date": date,
+                "emotion": emotion,
+                "preview": preview,
+                "version": version,
+            }
+            if include_messages:
+                session["messages"] = messages_by_session.get(session_no, [])
+            else:
+                session["message_count"] = message_count
+            if extra:
+                session.update(_unpack(extra))
+            chat_sessions.append(session)
+        data["chat_sessions"] = chat_sessions
+
+        snapshot = _read_snapshot(conn)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    data[VERSIONS_KEY] = {"meta": dict(snapshot["meta_versions"]), "sessions": {}, "copies": {}, "dirty": {}}
+    with _snapshots_lock:
+        _snapshots[db_path] = snapshot
+    return data
+
+def load_session_messages(db_path, session_id):
+    """세션 하나의 메시지 본문을 로드합니다."""
+    if not exists(db_path):
+        return []
+    conn = _connect(db_path)
+    try:
+        return [
+            message
+            for (data,) in conn.execute(
+                "SELECT m.data FROM sessions s JOIN messages m ON m.session_no = s.no "
+                "WHERE s.id = ? ORDER BY m.seq", (session_id,)
+            )
+            for message in _unpack_chunk(data)
+        ]
+    finally:
+        conn.close()
+
+def save_summary(db_path, session_id, summary):
+    """
+    세션의 요약을 저장합니다 (summary["message_count"]: 요약한 메시지 수).
+    그 사이 세션이 삭제되었으면 저장하지 않습니다.
+    """
+    if not exists(db_path):
+        return
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT OR REPLACE INTO summaries (session_no, message_count, data) "
+            "SELECT no, ?, ? FROM sessions WHERE id = ?",
+            (summary["message_count"], _pack(summary), session_id),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def load_summaries(db_path, session_ids=None, limit=None):
+    """
+    세션 요약을 최근에 수정된 세션부터 [(세션 id, 요약), ...]로 반환합니다.
+    session_ids가 있으면 해당 세션만, limit이 있으면 최대 limit개를 반환합니다.
+    """
+    if not exists(db_path):
+        return []
+    query = "SELECT s.id, m.data FROM summaries m JOIN sessions s ON s.no = m.session_no"
+    params = []
+    if session_ids is not None:
+        session_ids = list(session_ids)
+        if not session_ids:
+            return []
+        query += f" WHERE s.id IN ({','.join('?' * len(session_ids))})"
+        params.extend(session_ids)
+    query += " ORDER BY s.date DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = _connect(db_path)
+    try:
+        return [(session_id, _unpack(data)) for session_id, data in conn.execute(query, params)]
+    finally:
+        conn.close()
+
+def load_summary_counts(db_path):
+    """세션별로 요약된 메시지 수와 요약 형식 버전을 {세션 id: (메시지 수, 버전)}으로 반환합니다."""
+    if not exists(db_path):
+        return {}
+    conn = _connect(db_path)
+    try:
+        return {
+            session_id: (message_count, _unpack(data).get("version"))
+            for session_id, message_count, data in conn.execute(
+                "SELECT s.id, m.message_count, m.data FROM summaries m JOIN sessions s ON s.no = m.session_no"
+            )
+        }
+    finally:
+        conn.close()
+
+def search_messages(db_path, query, limit=50):
+    """메시지 내용으로 세션을 검색합니다 (search_index.search 참고)."""
+    if not exists(db_path):
+        return []
+    conn = _connect(db_path)
+    try:
+        return search_index.search(conn, query, _load_message, limit)
+    finally:
+        conn.close()
+
+def _insert_messages(conn, session_no, messages, start):
+    """
+    순번 start부터의 메시지를 묶음으로 기록하고 기록한 묶음의 바이트 수를 반환합니다.
+    start가 묶음 중간이면 저장된 마지막 묶음의 앞부분에 이어 붙여 그 묶음을 다시 기록합니다.
+    """
+    first = start - start % MESSAGE_CHUNK
+    if first < start:
+        row = conn.execute(
+            "SELECT data FROM messages WHERE session_no = ? AND seq = ?", (session_no, first)
+        ).fetchone()
+        messages = _unpack_chunk(row[0])[:start - first] + list(messages)
+    rows = [
+        (session_no, first + i, _pack_chunk(messages[i:i + MESSAGE_CHUNK]))
+        for i in range(0, len(messages), MESSAGE_CHUNK)
+    ]
+    conn.executemany("INSERT OR REPLACE INTO messages (session_no, seq, data) VALUES (?, ?, ?)", rows)
+    return sum(len(row[2]) for row in rows)
+
+def _write_session(conn, session, signature, old_signature, position, version):
+    """변경된 세션 헤더와 새 메시지만 기록하고 기록한 메시지 바이트 수를 반환합니다."""
+    session_id = session["id"]
+    messages = session.get("messages", [])
+
+    conn.execute(
+        "INSERT INTO sessions (id, position, date, emotion, preview, message_count, last_hash, extra, version) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET date = excluded.date, emotion = excluded.emotion, "
+        "preview = excluded.preview, message_count = excluded.message_count, "
+        "last_hash = excluded.last_hash, extra = excluded.extra, version = excluded.version",
+        (
+            session_id, position, session.get("date"), session.get("emotion"), session.get("preview"),
+            signature[3], signature[4], _extra(session, SESSION_COLUMNS), version,
+        ),
+    )
+    session_no = conn.execute("SELECT no FROM sessions WHERE id = ?", (session_id,)).fetchone()[0]
+
+    if "messages" not in session:
+        # 메시지 본문이 로드되지 않은 세션은 헤더만 갱신
+        start = len(messages)
+    elif old_signature is None:
+        start = 0
+    else:
+        # 기존 메시지가 그대로 유지된 경우에만 뒤에 추가된 메시지만 기록
+        if _extends(session, old_signature):
+            start = old_signature[3]
+        else:
+            search_index.remove_session(conn, session_no, _read_contents(conn, session_no))
+            conn.execute("DELETE FROM messages WHERE session_no = ?", (session_no,))
+            conn.execute("DELETE FROM summaries WHERE session_no = ?", (session_no,))
+            start = 0
+
+    written = 0
+    if start < len(messages):
+        written = _insert_messages(conn, session_no, messages[start:], start)
+        search_index.index_messages(conn, session_no, messages[start:], start)
+    return written
+
+def _store_snapshot(db_path, snapshot):
+    with _snapshots_lock:
+        _snapshots[db_path] = snapshot
+
+def mark_dirty(data, session_id):
+    """
+    다음 저장에서 기록할 세션으로 표시합니다 (세션을 추가하거나 바꾼 뒤 호출).
+    load_user로 로드하지 않은 데이터는 모든 세션을 비교하므로 아무 일도 하지 않습니다.
+    """
+    versions = data.get(VERSIONS_KEY)
+    if versions is None or versions.get("dirty") is None:
+        return
+    with _dirty_lock:
+        versions["dirty"][session_id] = next(_dirty_counter)
+
+def freeze(data):
+    """
+    다른 스레드에서 기록할 수 있도록 저장할 데이터를 복사합니다 (호출한 스레드에서 실행).
+    meta 값은 깊은 복사하고, 세션은 기록 대상(mark_dirty로 표시된 세션, 표시가 없는 데이터는 모두)만
+    메시지까지 복사합니다. 나머지 세션은 기록할 때 읽지 않으므로 그대로 공유합니다.
+    VERSIONS_KEY는 저장 결과(버전)가 이 탭의 데이터에 반영되도록 복사하지 않습니다.
+    """
+    versions = data.get(VERSIONS_KEY)
+    dirty = versions.get("dirty") if versions else None
+    if dirty is not None:
+        with _dirty_lock:
+            dirty = dict(dirty)
+
+    frozen = {}
+    for key, value in data.items():
+        if key == VERSIONS_KEY:
+            frozen[key] = value
+        elif key == "chat_sessions":
+            frozen[key] = [
+                _copy_session(session) if dirty is None or session["id"] in dirty else session
+                for session in value
+            ]
+        else:
+            frozen[key] = copy.deepcopy(value)
+    if dirty is not None:
+        frozen[DIRTY_KEY] = dirty
+    return frozen
+
+def _copy_session(session):
+    session = copy.copy(session)
+    if "messages" in session:
+        session["messages"] = [dict(message) for message in session["messages"]]
+    return session
+
+def _clear_dirty(versions, saved):
+    """저장한 세션의 표시를 지웁니다 (저장하는 동안 다시 표시된 세션은 남김)."""
+    with _dirty_lock:
+        dirty = versions.get("dirty")
+        for session_id, mark in saved.items():
+            if dirty.get(session_id) == mark:
+                del dirty[session_id]
+
+def register_derived(key, build):
+    """
+    세션에서 계산하는 meta 키를 등록합니다.
+    다른 탭이 먼저 바꾼 값과 충돌하면 build(세션 헤더 목록)으로 다시 계산하여 저장합니다
+    (세션 헤더: id, date, emotion, preview, message_count).
+    """
+    DERIVED_KEYS[key] = build
+
+def merge_values(stored, ours):
+    """
+    다른 탭이 저장한 meta 값과 이 탭의 값을 합칩니다.
+    딕셔너리는 키마다 재귀적으로 합치고, 목록은 저장된 항목 뒤에 이 탭에만 있는 항목을 붙이며,
+    그 밖의 값은 이 탭의 값을 사용합니다.
+    """
+    if isinstance(stored, dict) and isinstance(ours, dict):
+        merged = dict(stored)
+        for key, value in ours.items():
+            merged[key] = merge_values(stored[key], value) if key in stored else value
+        return merged
+    if isinstance(stored, list) and isinstance(ours, list):
+        return stored + [item for item in ours if item not in stored]
+    return ours
+
+def apply_merged(data):
+    """
+    이전 저장에서 다른 탭의 값과 합친 meta 값을 data에 반영합니다 (저장을 예약하기 전에 호출).
+    그 뒤 이 탭에서 다시 바뀐 값은 그대로 두며, 다음 저장에서 다시 합쳐집니다.
+    """
+    versions = data.get(VERSIONS_KEY)
+    merged = versions.pop("merged", None) if versions else None
+    for key, (digest, value, version) in (merged or {}).items():
+        if key in data and _digest(_pack(data[key])) == digest:
+            data[key] = value
+            versions.setdefault("meta", {})[key] = version
+
+def _read_headers(conn):
+    return [
+        {"id": session_id, "date": date, "emotion": emotion, "preview": preview, "message_count": message_count}
+        for session_id, date, emotion, preview, message_count in conn.execute(
+            "SELECT id, date, emotion, preview, message_count FROM sessions ORDER BY position"
+        )
+    ]
+
+def save_user(db_path, data):
+    """
+    사용자 데이터를 저장합니다.
+    마지막 저장 상태와 달라진 부분만 데이터베이스에 기록하며, 기록한 데이터의 바이트 수를 반환합니다.
+    data의 VERSIONS_KEY 기준 버전보다 데이터베이스의 항목이 새로우면 덮어쓰지 않고 합칩니다 (모듈 설명 참고).
+    기록한 항목의 새 버전은 VERSIONS_KEY에 반영되므로 같은 데이터를 이어서 저장할 수 있습니다.
+    """
+    versions = data.get(VERSIONS_KEY)
+    if versions is None:
+        versions = {}
+    known_meta = versions.setdefault("meta", {})
+    known_sessions = versions.setdefault("sessions", {})
+    copies = versions.setdefault("copies", {})
+    # 표시된 세션만 비교 (표시가 없는 데이터는 모든 세션, freeze한 데이터는 복사할 때의 표시)
+    dirty = data.get(DIRTY_KEY)
+    if dirty is None and versions.get("dirty") is not None:
+        with _dirty_lock:
+            dirty = dict(versions["dirty"])
+    learned_meta = {}
+    learned_sessions = {}
+    merged = {}         # 다른 탭의 값과 합친 meta 키 -> (이 탭의 값 digest, 합친 값, 버전)
+    derived = {}        # 세션 헤더로 다시 계산할 meta 키 -> 이 탭의 값 digest
+    copies_made = []
+    kept = []
+
+    conn = _connect(db_path)
+    written = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        snapshot = _get_snapshot(conn, db_path)
+        meta = dict(snapshot["meta"])
+        meta_versions = dict(snapshot["meta_versions"])
+        sessions = dict(snapshot["sessions"])
+        session_versions = dict(snapshot["session_versions"])
+        deleted = snapshot["deleted"]
+        next_position = snapshot["next_position"]
+
+        # 최상위 키 저장 (변경된 값만)
+        for key, value in data.items():
+            if key in ("chat_sessions", VERSIONS_KEY, DIRTY_KEY):
+                continue
+            blob = _pack(value)
+            digest = _digest(blob)
+            current = meta_versions.get(key)
+            if meta.get(key) == digest:
+                if known_meta.get(key) != current:
+                    learned_meta[key] = current
+                continue
+            ours = digest
+            if current is not None and known_meta.get(key) != current:
+                # 다른 탭이 먼저 바꾼 값은 이 탭의 값과 합침 (세션에서 계산하는 값은 세션 기록 후 다시 계산)
+                if key in DERIVED_KEYS:
+                    derived[key] = ours
+                    continue
+                row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                value = merge_values(_unpack(row[0]), value)
+                blob = _pack(value)
+                digest = _digest(blob)
+                if meta.get(key) == digest:
+                    merged[key] = (ours, value, current)
+                    continue
+            version = (current or 0) + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value, version) VALUES (?, ?, ?)", (key, blob, version)
+            )
+            written += len(blob)
+            meta[key] = digest
+            meta_versions[key] = version
+            if ours != digest:
+                merged[key] = (ours, value, version)
+            else:
+                learned_meta[key] = version
+
+        # 채팅 세션 저장 (변경된 세션만, 충돌한 세션의 사본은 목록 끝에 추가되어 함께 처리됨)
+        pending = [
+            session for session in data.get("chat_sessions", [])
+            if dirty is None or session["id"] in dirty
+        ]
+        for session in pending:
+            session_id = session["id"]
+            if session_id in deleted:
+                continue
+            old_signature = sessions.get(session_id)
+            signature = _session_signature(session, old_signature)
+            current = session_versions.get(session_id)
+            if signature == old_signature:
+                if session.get("version") != current:
+                    learned_sessions[session_id] = current
+                continue
+            if old_signature is not None:
+                base = max(session.get("version") or 0, known_sessions.get(session_id, 0))
+                if base != current and not _extends(session, old_signature):
+                    if "messages" in session:
+                        copy_id = copies.setdefault(session_id, f"{session_id}_conflict_{uuid.uuid4().hex[:8]}")
+                        pending.append(dict(session, id=copy_id, version=None, conflict_of=session_id))
+                        copies_made.append(session_id)
+                    else:
+                        kept.append(session_id)
+                    continue
+            position = next_position
+            if old_signature is None:
+                next_position += 1
+            version = (current or 0) + 1
+            written += _write_session(conn, session, signature, old_signature, position, version)
+            sessions[session_id] = signature
+            session_versions[session_id] = learned_sessions[session_id] = version
+
+        if derived:
+            headers = _read_headers(conn)
+            for key, ours in derived.items():
+                value = DERIVED_KEYS[key](headers)
+                blob = _pack(value)
+                digest = _digest(blob)
+                version = meta_versions[key]
+                if meta.get(key) != digest:
+                    version += 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value, version) VALUES (?, ?, ?)", (key, blob, version)
+                    )
+                    written += len(blob)
+                    meta[key] = digest
+                    meta_versions[key] = version
+                merged[key] = (ours, value, version)
+
+        conn.execute("UPDATE state SET revision = revision + 1 WHERE id = 0")
+        revision = _read_revision(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    known_meta.update(learned_meta)
+    known_sessions.update(learned_sessions)
+    if dirty:
+        _clear_dirty(versions, dirty)
+    if merged:
+        versions.setdefault("merged", {}).update(merged)
+        logger.info("저장 충돌 (%s): 다른 곳에서 먼저 바뀐 값과 합쳤습니다: %s",
+                    os.path.basename(db_path), sorted(merged))
+    if copies_made:
+        logger.warning("저장 충돌 (%s): 다른 곳에서 먼저 바뀐 세션 %d개를 사본으로 저장했습니다: %s",
+                       os.path.basename(db_path), len(copies_made), copies_made[:5])
+    if kept:
+        logger.warning("저장 충돌 (%s): 다른 곳에서 먼저 바뀐 세션 %d개는 저장된 헤더를 유지했습니다: %s",
+                       os.path.basename(db_path), len(kept), kept[:5])
+    _store_snapshot(db_path, {
+        "revision": revision,
+        "meta": meta,
+        "meta_versions": meta_versions,
+        "sessions": sessions,
+        "session_versions": session_versions,
+        "deleted": deleted,
+        "next_position": next_position,
+    })
+    return written
+
+def delete_session(db_path, session_id):
+    """
+    채팅 세션과 메시지를 삭제합니다.
+    삭제 기록을 남겨, 이 세션을 아직 가지고 있는 다른 탭이 저장해도 다시 생기지 않게 합니다.
+    """
+    if not exists(db_path):
+        return
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        snapshot = _get_snapshot(conn, db_path)
+        row = conn.execute("SELECT no FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is not None:
+            search_index.remove_session(conn, row[0], _read_contents(conn, row[0]))
+            conn.execute("DELETE FROM messages WHERE session_no = ?", (row[0],))
+            conn.execute("DELETE FROM sessions WHERE no = ?", (row[0],))
+            conn.execute("DELETE FROM summaries WHERE session_no = ?", (row[0],))
+        conn.execute(
+            "INSERT OR REPLACE INTO deleted_sessions (id, deleted_at) VALUES (?, ?)", (session_id, time.time())
+        )
+        conn.execute("UPDATE state SET revision = revision + 1 WHERE id = 0")
+        revision = _read_revision(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    snapshot = dict(snapshot, revision=revision, deleted=snapshot["deleted"] | {session_id})
+    snapshot["sessions"] = {k: v for k, v in snapshot["sessions"].items() if k != session_id}
+    snapshot["session_versions"] = {k: v for k, v in snapshot["session_versions"].items() if k != session_id}
+    _store_snapshot(db_path, snapshot)
+
+def import_pickle(db_path, pickle_path):
+    """
+    기존 pickle 형식의 사용자 데이터를 데이터베이스로 옮깁니다.
+    chat_sessions가 없던 형식이면 chat_history를 세션 하나로 옮깁니다 (날짜는 파일 수정 시각).
+    임시 데이터베이스에 모두 기록한 뒤 한 번에 제자리로 옮기므로, 도중에 중단되어도
+    빈 데이터베이스가 남지 않고 다음 로드에서 다시 옮깁니다.
+    다른 프로세스가 먼저 옮겼으면 그 데이터베이스를 그대로 사용합니다.
+    옮긴 뒤 원본 파일은 .migrated 확장자를 붙여 보관합니다.
+    """
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    data.pop(VERSIONS_KEY, None)
+    if not data.get("chat_sessions"):
+        date = datetime.datetime.fromtimestamp(os.path.getmtime(pickle_path)).isoformat()
+        data["chat_sessions"] = [_legacy_chat_session(data, date)] if data.get("chat_history") else []
+
+    temp_path = f"{db_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # 마지막 연결이 닫힐 때 WAL 내용이 본 파일로 합쳐지므로 임시 파일 하나만 옮기면 됨
+        save_user(temp_path, data)
+        with open(temp_path, "rb") as f:
+            os.fsync(f.fileno())
+        try:
+            # 대상이 이미 있으면 실패하는 원자적 생성
+            os.link(temp_path, db_path)
+        except FileExistsError:
+            pass
+    finally:
+        with _snapshots_lock:
+            _snapshots.pop(temp_path, None)
+        for path in (temp_path, temp_path + "-wal", temp_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+    _fsync_dir(os.path.dirname(os.path.abspath(db_path)))
+    if os.path.exists(pickle_path):
+        os.replace(pickle_path, pickle_path + ".migrated")
+    return data
+
+def _fsync_dir(path):
+    """디렉터리 항목 변경(파일 생성, 이름 변경)을 디스크에 기록합니다."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
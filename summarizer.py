@@ -0,0 +1,205 @@
+import os
+import re
+import math
+import logging
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import profiling
+import search_index
+import emotion_classifier
+
+# 끝난 대화 요약 (백그라운드)
+#
+# 대화가 끝나면(다른 감정 선택, 다른 대화로 이동, 로그아웃, 로그인 시 밀린 세션) 세션마다
+# 짧은 요약과 감정 정보를 계산하여 storage의 summaries 테이블에 저장합니다.
+# 요약은 요청을 처리하는 스크립트가 아닌 작업 스레드 풀(SUMMARY_WORKERS개)에서 계산됩니다.
+# - 지난 대화를 이어갈 때: 전체 대화 대신 요약과 마지막 몇 개의 메시지만 API에 보냅니다.
+# - 새 대화를 시작할 때: 최근 몇 개 대화의 요약을 "지난 대화 기억"으로 함께 보냅니다.
+# 요약기는 SUMMARIZERS에 등록된 함수 중 SUMMARIZER 환경 변수로 선택합니다.
+# - extractive: 사용자 메시지에서 대화 전체와 많이 겹치고 감정이 드러나는 문장을 골라냄 (기본값, 로컬)
+# 요약기는 (메시지 목록, 세션 감정)을 받아 핵심 문장 목록을 반환합니다.
+
+SUMMARIZER = os.getenv("SUMMARIZER", "extractive")
+
+# 요약을 계산하는 작업 스레드 수
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+
+# 요약에 포함할 핵심 문장 수와 문장 하나의 최대 길이
+SUMMARY_SENTENCES = int(os.getenv("SUMMARY_SENTENCES", "4"))
+SUMMARY_SENTENCE_CHARS = int(os.getenv("SUMMARY_SENTENCE_CHARS", "80"))
+
+# 새 대화에 "지난 대화 기억"으로 보낼 최근 대화 수 (0이면 보내지 않음)
+MEMORY_SESSIONS = int(os.getenv("MEMORY_SESSIONS", "3"))
+
+# 로그인할 때 요약이 없거나 오래된 세션을 최근 것부터 최대 몇 개까지 요약할지
+SUMMARY_BACKFILL = int(os.getenv("SUMMARY_BACKFILL", "20"))
+
+# 요약 형식 버전 (바뀌면 저장된 요약을 다시 계산)
+SUMMARY_VERSION = 1
+
+_SENTENCE = re.compile(r"[^.?!\n]+[.?!]*")
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_futures = {}       # 작업 키 -> 아직 시작되지 않았거나 실행 중인 Future
+_lock = threading.Lock()
+
+def fingerprint(message):
+    """메시지 하나의 지문을 반환합니다 (요약이 현재 대화와 맞는지 확인할 때 사용)."""
+    return hashlib.md5(f"{message['role']}:{message.get('content', '')}".encode()).hexdigest()
+
+def _sentences(text):
+    """텍스트를 문장 단위로 나눕니다 (공백 정리)."""
+    sentences = []
+    for match in _SENTENCE.finditer(text or ""):
+        sentence = " ".join(match.group(0).split())
+        if len(sentence) > 1:
+            sentences.append(sentence)
+    return sentences
+
+def _clip(sentence):
+    if len(sentence) > SUMMARY_SENTENCE_CHARS:
+        return sentence[:SUMMARY_SENTENCE_CHARS] + "..."
+    return sentence
+
+def extractive_summary(messages, emotion=None):
+    """
+    사용자 메시지의 문장 중 핵심 문장을 골라 대화 순서대로 반환합니다.
+    문장 점수는 대화 전체에서 자주 나온 바이그램을 얼마나 포함하는지(중심성)와
+    로컬 감정 분류기의 확신도(감정이 드러나는 정도)를 더한 값입니다.
+    이미 고른 문장과 색인어가 절반 이상 겹치는 문장은 건너뜁니다.
+    사용자 메시지가 없으면 상담사 메시지에서 고릅니다.
+    """
+    sources = [msg for msg in messages if msg.get("role") == "user"]
+    if not sources:
+        sources = [msg for msg in messages if msg.get("role") == "assistant"]
+    sentences = [sentence for msg in sources for sentence in _sentences(msg.get("content"))]
+    if not sentences:
+        return []
+
+    terms = [search_index.tokenize(sentence) for sentence in sentences]
+    frequency = Counter(term for sentence_terms in terms for term in set(sentence_terms))
+    emotions = emotion_classifier.classify_batch(sentences)
+
+    scores = []
+    for index, sentence_terms in enumerate(terms):
+        unique = set(sentence_terms)
+        # 긴 문장이 유리하지 않도록 색인어 수의 제곱근으로 나눔
+        centrality = sum(frequency[term] - 1 for term in unique) / math.sqrt(len(unique) + 1)
+        label, confidence = emotions[index]
+        bonus = confidence * (2 if emotion and label == emotion else 1)
+        scores.append(centrality + bonus * 2)
+
+    selected = []
+    for index in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        unique = set(terms[index])
+        if any(len(unique & set(terms[other])) * 2 >= len(unique | set(terms[other])) for other in selected):
+            continue
+        selected.append(index)
+        if len(selected) >= SUMMARY_SENTENCES:
+            break
+    return [_clip(sentences[i]) for i in sorted(selected)]
+
+# 사용 가능한 요약기 목록
+SUMMARIZERS = {
+    "extractive": extractive_summary,
+}
+
+def register(name, func):
+    """요약기를 등록합니다 (func(메시지 목록, 세션 감정) -> 핵심 문장 목록)."""
+    SUMMARIZERS[name] = func
+
+def get_summarizer():
+    """설정된 요약기 이름과 함수를 반환합니다 (없는 이름이면 extractive)."""
+    name = SUMMARIZER if SUMMARIZER in SUMMARIZERS else "extractive"
+    return name, SUMMARIZERS[name]
+
+def emotion_facts(messages, emotion=None):
+    """
+    대화의 감정 정보를 반환합니다.
+    사용자 메시지에 기록된 감정(없으면 로컬 분류 결과)의 횟수, 가장 많은 감정, 처음과 마지막 감정
+    """
+    user_messages = [msg for msg in messages if msg.get("role") == "user"]
+    untagged = [msg.get("content", "") for msg in user_messages if not msg.get("emotion")]
+    classified = iter(emotion_classifier.classify_batch(untagged) if untagged else [])
+    labels = []
+    for msg in user_messages:
+        label = msg.get("emotion") or next(classified)[0]
+        if label:
+            labels.append(label)
+
+    counts = Counter(labels)
+    facts = {
+        "emotion": emotion,
+        "user_messages": len(user_messages),
+        "emotions": dict(counts.most_common()),
+        "dominant": counts.most_common(1)[0][0] if counts else emotion,
+    }
+    if labels and labels[0] != labels[-1]:
+        facts["arc"] = [labels[0], labels[-1]]
+    return facts
+
+def summarize(messages, emotion=None):
+    """
+    세션 하나의 요약을 계산합니다.
+    message_count와 fingerprint는 요약한 메시지 수와 마지막 메시지의 지문입니다.
+    """
+    with profiling.timer("session_summary_seconds"):
+        name, func = get_summarizer()
+        return {
+            "version": SUMMARY_VERSION,
+            "summarizer": name,
+            "message_count": len(messages),
+            "fingerprint": fingerprint(messages[-1]) if messages else None,
+            "highlights": list(func(messages, emotion)),
+            "facts": emotion_facts(messages, emotion),
+        }
+
+def is_current(summary, messages):
+    """저장된 요약이 주어진 대화의 앞부분(요약한 메시지까지)과 일치하는지 확인합니다."""
+    if not summary or summary.get("version") != SUMMARY_VERSION:
+        return False
+    count = summary.get("message_count", 0)
+    if not 0 < count <= len(messages):
+        return False
+    return summary.get("fingerprint") == fingerprint(messages[count - 1])
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=max(SUMMARY_WORKERS, 1), thread_name_prefix="summarizer")
+    return _executor
+
+def _run(key, func, args):
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception("대화 요약 오류 (%s)", key)
+        return None
+
+def _forget(key, future):
+    with _lock:
+        if _futures.get(key) is future:
+            del _futures[key]
+
+def submit(key, func, *args):
+    """
+    func(*args)를 작업 스레드 풀에서 실행하고 Future를 반환합니다.
+    같은 키의 작업이 아직 시작되지 않았으면 새로 예약하지 않고 그 작업을 반환합니다.
+    """
+    with _lock:
+        future = _futures.get(key)
+        if future is not None and not future.running() and not future.done():
+            return future
+        future = _get_executor().submit(_run, key, func, args)
+        _futures[key] = future
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+def pending_count():
+    """아직 끝나지 않은 요약 작업 수를 반환합니다."""
+    with _lock:
+        return len(_futures)
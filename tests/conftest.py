@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# 저장소 최상위 모듈과 benchmarks의 가짜 OpenAI 서버를 가져올 수 있도록 경로 추가
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_openai
+
+@pytest.fixture(scope="session")
+def fake_openai_server():
+    """테스트 전체에서 함께 사용하는 가짜 OpenAI 서버 (서버, API 주소)"""
+    server, api_base = fake_openai.start()
+    yield server, api_base
+    server.shutdown()
+
+@pytest.fixture
+def fake_api(fake_openai_server, monkeypatch):
+    """openai 요청을 가짜 서버로 보내고 서버를 반환합니다 (테스트마다 fail_after 초기화)."""
+    import openai
+    server, api_base = fake_openai_server
+    monkeypatch.setattr(openai, "api_base", api_base)
+    server.fail_after = None
+    yield server
+    server.fail_after = None
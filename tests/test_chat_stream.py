@@ -0,0 +1,55 @@
+import os
+import pytest
+import fake_openai
+import auth
+import chatbot
+
+# 가짜 OpenAI 서버를 통한 스트리밍 응답 (스트리밍 도중 연결이 끊기는 경우 포함)
+
+MESSAGES = [{"role": "user", "content": "요즘 잠이 잘 안 와요"}]
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+def test_stream_yields_reply_tokens(fake_api):
+    parts = list(chatbot.get_ai_response_stream(MESSAGES, api_key="test"))
+    assert len(parts) > 1
+    assert "".join(parts) == fake_openai.REPLY
+
+def test_stream_error_before_first_token_yields_apology(fake_api):
+    fake_api.fail_after = 0
+    assert list(chatbot.get_ai_response_stream(MESSAGES, api_key="test")) == [chatbot.ERROR_REPLY]
+
+def test_stream_error_after_tokens_raises_with_partial_reply(fake_api):
+    fake_api.fail_after = 5
+    parts = []
+    with pytest.raises(chatbot.ResponseInterrupted) as info:
+        for delta in chatbot.get_ai_response_stream(MESSAGES, api_key="test"):
+            parts.append(delta)
+    assert "".join(parts) == fake_openai.REPLY[:5]
+    assert info.value.args[0] == fake_openai.REPLY[:5]
+
+@pytest.mark.parametrize("fail_after, reply", [
+    (None, fake_openai.REPLY),
+    (5, chatbot.ERROR_REPLY),
+])
+def test_chat_page_saves_only_complete_reply(fake_api, tmp_path, monkeypatch, fail_after, reply):
+    from streamlit.testing.v1 import AppTest
+    monkeypatch.setattr(auth, "USER_DATA_DIR", str(tmp_path))
+    fake_api.fail_after = fail_after
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state.logged_in = True
+    at.session_state.username = "tester"
+    at.session_state.user_data = {"chat_sessions": []}
+    at.session_state.api_key = "test"
+    at.session_state.active_page = "chat"
+    at.session_state.selected_emotion = "불안"
+    at.session_state.chat_started = True
+    at.run()
+    at.chat_input[0].set_value("요즘 잠이 잘 안 와요").run()
+
+    assert not at.exception
+    assert [message["content"] for message in at.session_state.messages][-2:] == ["요즘 잠이 잘 안 와요", reply]
+    auth.flush_user_data("tester")
+    saved = auth.load_user_data("tester")["chat_sessions"]
+    assert [message["content"] for message in saved[0]["messages"]][-1] == reply
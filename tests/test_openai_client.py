@@ -0,0 +1,48 @@
+import threading
+import openai.api_requestor
+import fake_openai
+import openai_client
+
+# 공용 커넥션 풀 재사용 (스레드 간 공유, openai의 세션 교체 후에도 유지)
+
+MESSAGES = [{"role": "user", "content": "안녕하세요"}]
+
+def _call(count):
+    for _ in range(count):
+        response = openai_client.chat_completion(MESSAGES, api_key="test")
+        assert response.choices[0].message.content == fake_openai.REPLY
+
+def test_thread_sessions_share_one_adapter():
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(openai_client._make_session())) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    adapters = {id(session.get_adapter("https://api.openai.com")) for session in sessions}
+    assert adapters == {id(openai_client._get_adapter())}
+
+def test_session_close_keeps_shared_pool(fake_api):
+    _call(1)
+    pool_manager = openai_client._get_adapter().poolmanager
+    openai_client._make_session().close()
+    assert len(pool_manager.pools) > 0
+
+def test_connections_reused_across_threads_and_session_recycling(fake_api, monkeypatch):
+    # openai가 요청마다 스레드 세션을 닫고 새로 만들게 해도 연결은 스레드 수만큼만 열림
+    monkeypatch.setattr(openai.api_requestor, "MAX_SESSION_LIFETIME_SECS", 0)
+    _call(1)
+    before = fake_api.connections
+    threads = [threading.Thread(target=_call, args=(5,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake_api.connections - before <= 3
+
+def test_async_calls_share_one_aiohttp_session(fake_api):
+    first = openai_client.submit(openai_client.achat_completion(MESSAGES, api_key="test")).result(timeout=30)
+    session = openai_client._aiohttp_session
+    second = openai_client.submit(openai_client.achat_completion(MESSAGES, api_key="test")).result(timeout=30)
+    assert first.choices[0].message.content == second.choices[0].message.content == fake_openai.REPLY
+    assert openai_client._aiohttp_session is session
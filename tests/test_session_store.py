@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import pytest
+import session_store
+from session_store import FileSessionStore, MemoryRedis, RedisSessionStore
+
+# 공유 세션 저장소의 잠금과 해제 (file 백엔드, redis 백엔드의 MemoryRedis 대체 구현)
+
+def _counter_is_serialized(store, key, threads=6, rounds=30):
+    """잠금 안에서 읽고 잠시 쉰 뒤 쓰는 카운터가 하나도 빠지지 않는지 확인합니다."""
+    state = {"value": 0}
+
+    def work():
+        for _ in range(rounds):
+            with store.lock(key):
+                value = state["value"]
+                time.sleep(0.0005)
+                state["value"] = value + 1
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return state["value"] == threads * rounds
+
+# file 백엔드
+
+def test_file_save_load_and_versions(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    assert store.load("u.tab.1") is None
+    assert store.save("u.tab.1", {"messages": []}) == 1
+    assert store.save("u.tab.1", {"messages": [{"role": "user", "content": "hi"}]}) == 2
+    record = store.load("u.tab.1")
+    assert record["version"] == 2
+    assert record["state"]["messages"][0]["content"] == "hi"
+
+def test_file_clear_removes_record_and_lock(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    store.save("u.tab.1", {})
+    assert sorted(os.listdir(tmp_path)) == ["u.tab.1.json", "u.tab.1.lock"]
+    store.clear("u.tab.1")
+    assert os.listdir(tmp_path) == []
+    assert store.load("u.tab.1") is None
+
+def test_file_lock_serializes_threads(tmp_path):
+    assert _counter_is_serialized(FileSessionStore(str(tmp_path)), "u")
+
+def test_file_lock_is_exclusive_across_processes(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    code = (
+        "import sys, session_store\n"
+        "store = session_store.FileSessionStore(sys.argv[1])\n"
+        "try:\n"
+        "    with store.lock('u', timeout=0):\n"
+        "        print('acquired')\n"
+        "except TimeoutError:\n"
+        "    print('timeout')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+
+    def try_lock():
+        return subprocess.run(
+            [sys.executable, "-c", code, str(tmp_path)], env=env, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    with store.lock("u"):
+        assert try_lock() == "timeout"
+    assert try_lock() == "acquired"
+
+def test_file_lock_released_on_error(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with store.lock("u"):
+            raise RuntimeError
+    with store.lock("u", timeout=0):
+        pass
+
+def test_file_waiter_retries_after_clear(tmp_path):
+    # 잠금을 기다리던 쪽이 clear()로 지워진 잠금 파일이 아닌 새 파일에서 잠금을 얻어야 함
+    store = FileSessionStore(str(tmp_path))
+    acquired = threading.Event()
+
+    def wait_for_lock():
+        with store.lock("u"):
+            acquired.set()
+            time.sleep(0.2)
+
+    with store.lock("u"):
+        waiter = threading.Thread(target=wait_for_lock)
+        waiter.start()
+        time.sleep(0.05)
+        store._remove("u")
+    assert acquired.wait(5)
+    with pytest.raises(TimeoutError):
+        with store.lock("u", timeout=0):
+            pass
+    waiter.join()
+    with store.lock("u", timeout=0):
+        pass
+
+def test_file_prune_removes_expired_records(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    store.save("old", {})
+    store.save("new", {})
+    path = tmp_path / "old.json"
+    record = json.loads(path.read_text(encoding="utf-8"))
+    record["updated_at"] = time.time() - session_store.SESSION_STATE_TTL - 1
+    path.write_text(json.dumps(record), encoding="utf-8")
+    store.prune()
+    assert sorted(os.listdir(tmp_path)) == ["new.json", "new.lock"]
+
+# redis 백엔드 (MemoryRedis)
+
+def test_redis_lock_is_exclusive_and_released():
+    client = MemoryRedis()
+    store = RedisSessionStore(client, prefix="test")
+    with store.lock("u"):
+        assert client.get("test:lock:u") is not None
+        with pytest.raises(TimeoutError):
+            with store.lock("u", timeout=0):
+                pass
+    assert client.get("test:lock:u") is None
+    with store.lock("u", timeout=0):
+        pass
+
+def test_redis_lock_serializes_threads():
+    assert _counter_is_serialized(RedisSessionStore(MemoryRedis(), prefix="test"), "u")
+
+def test_redis_expired_lock_is_not_released_by_old_holder(monkeypatch):
+    # 잠금이 만료되어 다른 쪽이 얻었으면, 늦게 끝난 이전 소유자가 그 잠금을 지우지 않아야 함
+    monkeypatch.setattr(session_store, "LOCK_EXPIRE", 0.05)
+    client = MemoryRedis()
+    store = RedisSessionStore(client, prefix="test")
+    with store.lock("u"):
+        time.sleep(0.1)
+        client.set("test:lock:u", b"other", nx=True)
+    assert client.get("test:lock:u") == b"other"
+
+def test_redis_save_expires_state_and_version(monkeypatch):
+    monkeypatch.setattr(session_store, "SESSION_STATE_TTL", 0.05)
+    client = MemoryRedis()
+    store = RedisSessionStore(client, prefix="test")
+    assert store.save("u.tab.1", {"messages": []}) == 1
+    assert store.save("u.tab.1", {"messages": []}) == 2
+    assert store.load("u.tab.1")["version"] == 2
+    time.sleep(0.1)
+    assert client.get("test:state:u.tab.1") is None
+    assert client.get("test:version:u.tab.1") is None
+
+def test_redis_clear_deletes_state_and_version():
+    client = MemoryRedis()
+    store = RedisSessionStore(client, prefix="test")
+    store.save("u.tab.1", {"messages": []})
+    store.clear("u.tab.1")
+    assert client._data == {}
+    assert store.load("u.tab.1") is None
+
+def test_memory_redis_eval_only_runs_release_script():
+    client = MemoryRedis()
+    client.set("key", "token")
+    assert client.eval(session_store.RELEASE_SCRIPT, 1, "key", "wrong") == 0
+    assert client.eval(session_store.RELEASE_SCRIPT, 1, "key", "token") == 1
+    assert client.get("key") is None
+    with pytest.raises(NotImplementedError):
+        client.eval("return 1", 0)
@@ -0,0 +1,12 @@
+# 페이지 모듈
+#
+# 각 페이지(chat, history, analysis, profiling)는 render() 함수를 가진 모듈이며, app.py가 현재 페이지의
+# 모듈만 가져와 실행합니다. 모듈은 처음 열 때 한 번만 로드되므로 로그인 화면이나 채팅 화면에서는
+# 분석 페이지용 라이브러리(pandas, numpy)를 불러오지 않습니다.
+
+PAGES = {
+    "chat": "views.chat",
+    "history": "views.history",
+    "analysis": "views.analysis",
+    "profiling": "views.profiling",
+}
@@ -0,0 +1,388 @@
+from collections import Counter
+import pandas as pd
+import streamlit as st
+from auth import emotion_events_path
+from chatbot import EMOTIONS
+import analytics
+import emotion_timeline
+import profiling
+from views.common import EMOTION_ICONS, get_current_page, display_pagination_controls
+
+# 감정 분석 페이지 (pandas/numpy는 이 페이지를 처음 열 때만 로드됩니다)
+
+
+def display_dataframe_with_pagination(df, page_size=10, key="pagination"):
+    """
+    DataFrame을 페이지네이션과 함께 표시하는 함수
+    """
+    # 현재 페이지 데이터 가져오기
+    start_idx = get_current_page(len(df), page_size, key) * page_size
+    end_idx = min(start_idx + page_size, len(df))
+    page_df = df.iloc[start_idx:end_idx]
+    
+    # 하단 컨트롤
+    display_pagination_controls(len(df), page_size, key)
+    
+    # 현재 페이지 데이터 표시
+    st.dataframe(page_df, use_container_width=True)
+
+
+def render():
+    """
+    감정 분석 페이지를 표시하는 함수
+    """
+    st.markdown("<h2 class='sub-header'>감정 분석</h2>", unsafe_allow_html=True)
+
+    # 채팅 기록이 없는 경우
+    if 'user_data' not in st.session_state or 'chat_sessions' not in st.session_state.user_data or not st.session_state.user_data['chat_sessions']:
+        st.info("분석할 채팅 기록이 없습니다. 먼저 대화를 진행해주세요.")
+    else:
+        # 탭 설정
+        tab1, tab2, tab3 = st.tabs(["감정 변화 그래프", "주간/월간 리포트", "감정 패턴 분석"])
+    
+        # 감정 이벤트 로그 로드 (시간순으로 정렬된 NumPy 배열)
+        with profiling.timer("analysis_events_load_seconds"):
+            events = emotion_timeline.EmotionEvents.load(emotion_events_path(st.session_state.username))
+    
+        if not len(events):
+            st.warning("감정 데이터가 충분하지 않습니다. 더 많은 대화를 진행해주세요.")
+        else:
+            # 사전 계산된 감정 집계 (주간/월간 리포트와 패턴 분석에 사용)
+            emotion_stats = analytics.get_stats(st.session_state.user_data)
+        
+            # 탭별 DataFrame 생성/표시 시간 측정
+            with tab1, profiling.timer("analysis_tab_seconds", tab="timeline"):
+                st.subheader("시간에 따른 감정 변화")
+            
+                # 날짜 범위 선택
+                col1, col2 = st.columns(2)
+                with col1:
+                    start_date = st.date_input(
+                        "시작 날짜", 
+                        value=events.first_date(),
+                        key="emotion_start_date"
+                    )
+                with col2:
+                    end_date = st.date_input(
+                        "종료 날짜", 
+                        value=events.last_date(),
+                        key="emotion_end_date"
+                    )
+            
+                # 필터링 (정렬된 시간 배열에서 이분 탐색)
+                filtered_events = events.between(start_date, end_date)
+            
+                if not len(filtered_events):
+                    st.warning("선택한 날짜 범위에 데이터가 없습니다.")
+                else:
+                    # 그래프 대신 테이블 표시
+                    st.markdown("#### 감정 변화 추이 (시간순)")
+                
+                    # 표시할 데이터 준비
+                    display_df = pd.DataFrame({
+                        '날짜': filtered_events.format_dates(),
+                        '감정': filtered_events.labels()
+                    })
+                
+                    # 테이블로 표시
+                    display_dataframe_with_pagination(display_df, key="emotion_change")
+        
+            with tab2, profiling.timer("analysis_tab_seconds", tab="report"):
+                st.subheader("주간/월간 감정 리포트")
+            
+                # 분석 기간 선택
+                report_type = st.radio(
+                    "리포트 유형 선택",
+                    ["주간", "월간"],
+                    horizontal=True,
+                    key="report_type"
+                )
+            
+                if report_type == "주간":
+                    # 주간 집계 구간
+                    weekly_periods = analytics.period_labels(emotion_stats, "weekly")
+                
+                    # 기간 선택 (최근 4주 기본)
+                    weeks = list(weekly_periods)
+                    selected_week = st.selectbox(
+                        "분석할 주 선택",
+                        weeks,
+                        index=min(len(weeks)-1, 0),
+                        key="selected_week"
+                    )
+                
+                    if selected_week:
+                        # 선택한 주의 감정별 횟수
+                        emotion_counts = Counter(analytics.period_counts(emotion_stats, "weekly", weekly_periods[selected_week]))
+                    
+                        if emotion_counts:
+                        
+                            # 차트 대신 테이블로 표현
+                            st.markdown(f"#### {selected_week} 감정 분포")
+                        
+                            # 데이터프레임으로 변환
+                            emotion_dist_df = pd.DataFrame({
+                                '감정': list(emotion_counts.keys()),
+                                '횟수': list(emotion_counts.values()),
+                                '비율(%)': [(count / sum(emotion_counts.values()) * 100) for count in emotion_counts.values()]
+                            })
+                        
+                            # 비율 소수점 한 자리로 포맷팅
+                            emotion_dist_df['비율(%)'] = emotion_dist_df['비율(%)'].round(1)
+                        
+                            # 빈도 내림차순으로 정렬
+                            emotion_dist_df = emotion_dist_df.sort_values('횟수', ascending=False)
+                        
+                            # 테이블 표시
+                            display_dataframe_with_pagination(emotion_dist_df, key="weekly_emotion")
+                        
+                            # 요약 통계
+                            st.markdown("### 주간 감정 요약")
+                        
+                            # 요약 데이터 준비
+                            summary_data = {
+                                '지표': ['총 대화 수', '가장 많이 느낀 감정', '감정 다양성'],
+                                '값': [
+                                    f"{sum(emotion_counts.values())}회",
+                                    f"{max(emotion_counts, key=emotion_counts.get)} ({emotion_counts[max(emotion_counts, key=emotion_counts.get)]}회)",
+                                    f"{len(emotion_counts)}개 감정 경험"
+                                ]
+                            }
+                        
+                            # 요약 테이블 표시
+                            st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
+                        else:
+                            st.warning("선택한 주에 데이터가 없습니다.")
+                else:  # 월간 리포트
+                    # 월간 집계 구간
+                    monthly_periods = analytics.period_labels(emotion_stats, "monthly")
+                
+                    # 기간 선택
+                    months = list(monthly_periods)
+                    selected_month = st.selectbox(
+                        "분석할 월 선택",
+                        months,
+                        index=min(len(months)-1, 0),
+                        key="selected_month"
+                    )
+                
+                    if selected_month:
+                        # 선택한 월의 감정별 횟수
+                        emotion_counts = Counter(analytics.period_counts(emotion_stats, "monthly", monthly_periods[selected_month]))
+                    
+                        if emotion_counts:
+                        
+                            # 차트 대신 테이블로 표현
+                            st.markdown(f"#### {selected_month} 감정 분포")
+                        
+                            # 감정 순서대로 정렬
+                            ordered_emotions = [e for e in EMOTIONS.keys() if e in emotion_counts]
+                            ordered_counts = [emotion_counts[e] for e in ordered_emotions]
+                        
+                            # 데이터프레임으로 변환
+                            emotion_monthly_df = pd.DataFrame({
+                                '감정': ordered_emotions,
+                                '횟수': ordered_counts,
+                                '비율(%)': [(count / sum(ordered_counts) * 100) for count in ordered_counts]
+                            })
+                        
+                            # 비율 소수점 한 자리로 포맷팅
+                            emotion_monthly_df['비율(%)'] = emotion_monthly_df['비율(%)'].round(1)
+                        
+                            # 빈도 내림차순으로 정렬
+                            emotion_monthly_df = emotion_monthly_df.sort_values('횟수', ascending=False)
+                        
+                            # 테이블 표시
+                            display_dataframe_with_pagination(emotion_monthly_df, key="monthly_emotion")
+                        
+                            # 요약 통계
+                            st.markdown("### 월간 감정 요약")
+                        
+                            # 요약 데이터 준비
+                            summary_data = {
+                                '지표': ['총 대화 수', '가장 많이 느낀 감정', '감정 다양성'],
+                                '값': [
+                                    f"{sum(emotion_counts.values())}회",
+                                    f"{max(emotion_counts, key=emotion_counts.get)} ({emotion_counts[max(emotion_counts, key=emotion_counts.get)]}회)",
+                                    f"{len(emotion_counts)}개 감정 / 전체 {len(EMOTIONS)}개 감정 중 ({(len(emotion_counts) / len(EMOTIONS) * 100):.1f}%)"
+                                ]
+                            }
+                        
+                            # 요약 테이블 표시
+                            st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
+                        else:
+                            st.warning("선택한 월에 데이터가 없습니다.")
+        
+            with tab3, profiling.timer("analysis_tab_seconds", tab="pattern"):
+                st.subheader("감정 패턴 분석")
+            
+                # 전체 감정 분포 (파이 차트 대신 테이블로)
+                emotion_overall = pd.Series(analytics.overall_counts(emotion_stats), dtype="int64").sort_values(ascending=False)
+            
+                # 테이블로 표시
+                st.markdown("#### 전체 감정 분포")
+            
+                # 데이터프레임으로 변환
+                emotion_overall_df = pd.DataFrame({
+                    '감정': emotion_overall.index,
+                    '횟수': emotion_overall.values,
+                    '비율(%)': (emotion_overall.values / emotion_overall.sum() * 100).round(1)
+                })
+            
+                # 테이블 표시
+                display_dataframe_with_pagination(emotion_overall_df, key="overall_emotion")
+            
+                # 시간대별 감정 분석
+                st.markdown("### 시간대별 감정 패턴")
+            
+                # 시간대별 감정 분포 (히트맵 대신 테이블로, 사전 계산된 집계 사용)
+                time_emotion = pd.DataFrame.from_dict(
+                    analytics.time_of_day_counts(emotion_stats), orient='index'
+                ).fillna(0).astype(int)
+                time_emotion = time_emotion[sorted(time_emotion.columns)]
+            
+                # 시간대별 합계 추가
+                time_emotion['합계'] = time_emotion.sum(axis=1)
+            
+                # 각 행의 합계를 정렬 기준으로 활용 (내림차순)
+                time_emotion_sorted = time_emotion.sort_values('합계', ascending=False)
+            
+                # 비율 계산을 위한 복사본 생성
+                time_emotion_pct = time_emotion_sorted.copy()
+            
+                # '합계' 열 제외하고 각 행을 합계로 나누어 비율 계산
+                for col in time_emotion_pct.columns[:-1]:  # 마지막 '합계' 열 제외
+                    time_emotion_pct[col] = (time_emotion_pct[col] / time_emotion_pct['합계'] * 100).round(1)
+            
+                # 절대값 테이블 표시
+                st.markdown("#### 시간대별 감정 빈도 (절대값)")
+                st.dataframe(time_emotion_sorted, use_container_width=True)
+            
+                # 비율 테이블 표시
+                st.markdown("#### 시간대별 감정 분포 (비율 %)")
+                # '합계' 열 제거 후 비율 테이블 표시
+                st.dataframe(time_emotion_pct.drop(columns=['합계']), use_container_width=True)
+            
+                # 패턴 분석 문장 생성
+                try:
+                    most_common_time = time_emotion.sum(axis=1).idxmax()
+                    most_common_emotion_overall = emotion_overall.idxmax()
+                
+                    # 시간대별 가장 많은 감정
+                    time_most_emotions = {}
+                    for time_cat in time_emotion.index:
+                        if not time_emotion.loc[time_cat].sum() == 0:
+                            time_most_emotions[time_cat] = time_emotion.loc[time_cat].idxmax()
+                
+                    # 분석 결과 텍스트 표시 - 더 간결하게
+                    st.markdown("### 감정 패턴 인사이트")
+                
+                    # 통계 요약을 컴팩트하게 표시
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown(f"**주요 대화 시간대:** {most_common_time}")
+                        st.markdown(f"**주요 감정:** {most_common_emotion_overall}")
+                
+                    with col2:
+                        if len(events) > 3:
+                            recent_emotions = events.recent_labels(3)
+                            if len(set(recent_emotions)) == 1:
+                                st.markdown(f"**최근 감정:** {recent_emotions[0]}")
+                            else:
+                                st.markdown(f"**최근 감정 변화:** {', '.join(recent_emotions)}")
+                
+                    # 시간대별 주요 감정을 표 형태로 표시
+                    st.markdown("#### 시간대별 주요 감정")
+                    time_emotion_data = {"시간대": [], "주요 감정": []}
+                    for time_cat, emotion in time_most_emotions.items():
+                        time_emotion_data["시간대"].append(time_cat)
+                        time_emotion_data["주요 감정"].append(emotion)
+                
+                    time_emotion_df = pd.DataFrame(time_emotion_data)
+                    st.dataframe(time_emotion_df, hide_index=True, use_container_width=True)
+                    
+                except:
+                    st.markdown("데이터가 충분하지 않아 상세 분석을 생성할 수 없습니다.")
+            
+                # 팁 제공
+                with st.expander("감정 관리 팁"):
+                    emotion_tips = {
+                        "기쁨": "긍정적인 감정을 유지하고 다른 사람과 나누세요. 감사 일기를 작성하면 기쁨을 오래 간직할 수 있습니다.",
+                        "슬픔": "감정을 억누르지 말고 표현하세요. 가까운 사람과 대화하거나 글로 감정을 표현해보세요.",
+                        "분노": "깊게 호흡하고 10까지 세어보세요. 분노를 느끼는 상황에서 잠시 벗어나 진정할 시간을 가지세요.",
+                        "불안": "마음챙김 명상을 통해 현재에 집중하세요. 불안한 생각을 종이에 적어보면 객관화하는 데 도움이 됩니다.",
+                        "스트레스": "가벼운 운동이나 취미 활동으로 기분 전환하세요. 충분한 휴식과 수면도 중요합니다.",
+                        "외로움": "온라인 커뮤니티나 모임에 참여해보세요. 자원봉사 활동도 사회적 연결감을 높이는 데 도움이 됩니다.",
+                        "후회": "과거에서 배울 점을 찾고 미래에 적용하세요. 자기 용서도 중요한 과정입니다.",
+                        "좌절": "작은 목표부터 설정하고 성취해보세요. 성공 경험이 쌓이면 자신감이 생깁니다.",
+                        "혼란": "생각을 정리하기 위해 마인드맵이나 일기를 작성해보세요. 필요하다면 전문가의 조언을 구하세요.",
+                        "감사": "감사한 일들을 매일 기록하는 습관을 들이세요. 감사함이 더 많은 긍정적인 경험을 끌어당깁니다."
+                    }
+                
+                    if not emotion_overall.empty:
+                        most_common = emotion_overall.idxmax()
+                        st.markdown(f"### {EMOTION_ICONS.get(most_common, '')} {most_common} 감정을 위한 팁")
+                        st.markdown(emotion_tips.get(most_common, "감정을 관리하기 위해 규칙적인 생활과 자기 돌봄을 실천하세요."))
+                
+                    st.markdown("### 일반적인 감정 관리 전략")
+                    st.markdown("""
+                    1. **규칙적인 운동**: 신체 활동은 좋은 기분을 촉진하는 호르몬을 분비합니다.
+                    2. **충분한 수면**: 수면 부족은 감정 조절 능력을 저하시킵니다.
+                    3. **균형 잡힌 식사**: 영양소가 풍부한 식단은 뇌 기능과 기분에 영향을 줍니다.
+                    4. **명상과 호흡법**: 스트레스 감소와 현재 순간에 집중하는 데 도움이 됩니다.
+                    5. **사회적 연결**: 친구, 가족과의 소통은 정서적 지원을 제공합니다.
+                    """)
+                
+                    st.markdown(f"감정 관련 도움이 필요하시면 언제든지 AI 챗봇과 대화하거나 전문가와 상담하세요.")
+            
+                # 추천 사항
+                st.markdown("### 개인 맞춤 추천")
+            
+                if not emotion_overall.empty:
+                    dominant_emotions = emotion_overall.nlargest(2).index.tolist()
+                
+                    # 추천 활동을 한 행에 복수 열로 표시
+                    st.markdown("##### 추천 활동")
+                    activities = {
+                        "기쁨": ["긍정적인 경험 일기 쓰기", "다른 사람과 기쁨 나누기", "감사 명상"],
+                        "슬픔": ["감정 일기 쓰기", "자연 속 산책", "슬픔을 표현하는 예술 활동"],
+                        "분노": ["운동하기", "심호흡 연습", "감정 정리 글쓰기"],
+                        "불안": ["마음챙김 명상", "점진적 근육 이완법", "걱정 목록 작성하기"],
+                        "스트레스": ["요가", "충분한 휴식", "자연 속에서 시간 보내기"],
+                        "외로움": ["온라인 모임 참여", "자원봉사", "새로운 취미 배우기"],
+                        "후회": ["자기 용서 명상", "교훈 찾기 연습", "미래 계획 세우기"],
+                        "좌절": ["작은 성취 목표 설정", "멘토 찾기", "역경 극복 사례 읽기"],
+                        "혼란": ["생각 정리를 위한 글쓰기", "전문가 상담", "명상"],
+                        "감사": ["감사 일기 쓰기", "타인에게 감사 표현하기", "봉사활동"]
+                    }
+                
+                    # 추천 활동을 표로 표시
+                    activity_data = {"감정": [], "추천 활동": []}
+                    for emotion in dominant_emotions:
+                        if emotion in activities:
+                            activity_data["감정"].append(emotion)
+                            activity_data["추천 활동"].append(", ".join(activities[emotion]))
+                
+                    activity_df = pd.DataFrame(activity_data)
+                    st.dataframe(activity_df, hide_index=True, use_container_width=True)
+                    
+                    # 시간대별 추천을 표로 변경
+                    st.markdown("##### 시간대별 추천")
+                    time_recommendations = {
+                        "새벽 (0-6시)": "충분한 수면을 취하고, 명상이나 가벼운 스트레칭으로 하루를 시작해보세요.",
+                        "오전 (6-12시)": "가장 에너지가 높은 시간대입니다. 중요한 의사결정이나 창의적인 활동에 집중해보세요.",
+                        "오후 (12-18시)": "가벼운 산책이나 동료와의 대화로 에너지를 유지하세요.",
+                        "저녁 (18-24시)": "하루를 돌아보고 감사한 일들을 기록하세요. 편안한 활동으로 수면 준비를 시작하세요."
+                    }
+                
+                    # 사용자가 가장 많이 대화한 시간대 확인
+                    if len(events):
+                        user_peak_time = analytics.peak_time_category(emotion_stats)
+                    
+                        # 시간대별 추천을 표로 표시
+                        rec_data = {"시간대": [], "추천 활동": []}
+                        rec_data["시간대"].append(user_peak_time)
+                        rec_data["추천 활동"].append(time_recommendations.get(user_peak_time, "규칙적인 생활 패턴을 유지하세요."))
+                    
+                        rec_df = pd.DataFrame(rec_data)
+                        st.dataframe(rec_df, hide_index=True, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import streamlit as st
+from chatbot import EMOTIONS, initialize_chat_history, display_chat_history, display_new_messages, mark_rendered, reset_chat_rendering, add_message, get_ai_response_stream, ResponseInterrupted, ERROR_REPLY, start_emotion_analysis, collect_emotion, MESSAGE_EMOTION_TAGGING
+from context_builder import build_context, format_memory
+from auth import load_chat_memory, submit_chat_summary
+from views.common import EMOTION_ICONS, handle_emotion_selection, save_current_chat, update_emotion_goal
+
+# 채팅 페이지
+
+def render():
+    """
+    채팅 페이지를 표시하는 함수
+    """
+    st.markdown("<h2 class='sub-header'>AI 챗봇과 대화하기</h2>", unsafe_allow_html=True)
+
+    # 프로필 정보 가져오기 (로그인 한 경우)
+    if st.session_state.logged_in:
+        user_data = st.session_state.user_data
+        profile = user_data.get("profile", {})
+    
+        # 활성화된 감정 목표 확인
+        emotion_goals = user_data.get("emotion_goals", {"active_goal": None, "history": []})
+        active_goal = emotion_goals.get("active_goal", None)
+    
+        # 감정 목표가 있는 경우 표시
+        if active_goal:
+            with st.expander("현재 감정 목표", expanded=False):
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.markdown(f"""
+                    **목표 감정:** {active_goal['target_emotion']}  
+                    **목표 기간:** {active_goal['start_date']} ~ {active_goal['end_date']}  
+                    **설명:** {active_goal['description']}
+                    """)
+                with col2:
+                    # 진행도 표시
+                    st.markdown(f"**진행도:** {active_goal['progress']}%")
+                    st.progress(active_goal['progress'] / 100)
+
+    # 감정 선택 페이지 또는 채팅 페이지 표시
+    if not st.session_state.selected_emotion:
+        # 감정 선택 컨테이너
+        st.markdown("<div class='emotion-container'>", unsafe_allow_html=True)
+        st.markdown("### 현재 감정을 선택해주세요")
+    
+        # 감정 버튼 배치 (4열 그리드)
+        cols = st.columns(4)
+    
+        # 감정 목록 순회하며 버튼 배치
+        for index, (emotion, value) in enumerate(EMOTIONS.items()):
+            col = cols[index % 4]
+            emotion_icon = EMOTION_ICONS.get(emotion, "")
+            with col:
+                if st.button(f"{emotion_icon} {emotion}", key=f"emo_{emotion}", 
+                           help=f"{value}",
+                           use_container_width=True,
+                           type="primary" if st.session_state.selected_emotion == emotion else "secondary"):
+                    handle_emotion_selection(emotion)
+                
+        st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        # 감정이 선택된 경우
+        initialize_chat_history()
+        display_chat_history()
+    
+        # 사용자 입력
+        user_input = st.chat_input("메시지를 입력하세요...")
+        if user_input:
+            # API 키 확인
+            if not st.session_state.api_key:
+                st.warning("OpenAI API 키를 입력해주세요. 왼쪽 사이드바의 'OpenAI API 키 설정'에서 설정할 수 있습니다.")
+                st.stop()
+            
+            # 사용자 메시지 추가
+            user_message = st.session_state.messages[add_message("user", user_input)]
+            display_new_messages()
+        
+            # 응답 생성과 동시에 사용자 메시지 감정 분석 시작
+            emotion_future = start_emotion_analysis(
+                user_input, use_llm=MESSAGE_EMOTION_TAGGING == "llm"
+            ) if MESSAGE_EMOTION_TAGGING in ("local", "llm") else None
+        
+            # 토큰 예산 안에서 최근 대화와 이전 대화 요약으로 컨텍스트 생성
+            if 'context_summary' not in st.session_state:
+                st.session_state.context_summary = {}
+            # 새 대화에는 최근 대화들의 요약을 지난 대화 기억으로 함께 보냄 (대화마다 한 번 로드)
+            if 'chat_memory' not in st.session_state:
+                st.session_state.chat_memory = format_memory(
+                    load_chat_memory(st.session_state.username, st.session_state.get('current_chat_id'))
+                ) if st.session_state.logged_in else ""
+            messages_for_api = build_context(
+                st.session_state.messages,
+                emotion=st.session_state.selected_emotion,
+                summary_cache=st.session_state.context_summary,
+                stored_summary=st.session_state.get('chat_summary'),
+                memory=st.session_state.chat_memory
+            )
+        
+            # AI 응답 생성 (토큰 단위로 스트리밍 표시)
+            with st.chat_message("assistant"):
+                try:
+                    ai_response = st.write_stream(get_ai_response_stream(messages_for_api))
+                except ResponseInterrupted:
+                    # 중간에 끊긴 응답은 저장하지 않고 사과 문구만 답변으로 기록
+                    ai_response = ERROR_REPLY
+                    st.write(ai_response)
+        
+            # AI 메시지 추가 (스트리밍 완료 후, 이미 표시되었으므로 표시 완료로 기록)
+            mark_rendered(add_message("assistant", ai_response))
+        
+            # 감정 분석 결과를 메시지에 기록
+            message_emotion = collect_emotion(emotion_future) if emotion_future else None
+            if message_emotion:
+                user_message["emotion"] = message_emotion
+        
+            # 채팅 자동 저장
+            save_current_chat()
+        
+            # 감정 목표 진행도 업데이트
+            if message_emotion:
+                update_emotion_goal(message_emotion)
+    
+        # 새 감정 선택 버튼
+        if st.button("다른 감정 선택하기"):
+            # 현재 채팅 저장 (감정 상태가 변경되기 전에 저장)
+            save_current_chat()
+        
+            # 끝난 대화의 요약을 백그라운드에서 계산
+            if st.session_state.logged_in:
+                submit_chat_summary(st.session_state.username, st.session_state.get('current_chat_id'), st.session_state.selected_emotion)
+        
+            # 현재 채팅 ID 제거
+            if 'current_chat_id' in st.session_state:
+                del st.session_state.current_chat_id
+        
+            # 메시지 표시 범위 초기화
+            reset_chat_rendering()
+        
+            # 상태 초기화 (저장 후에 초기화)
+            st.session_state.selected_emotion = None
+            st.session_state.chat_started = False
+        
+            st.rerun()
\ No newline at end of file
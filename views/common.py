@@ -0,0 +1,359 @@
+import uuid
+import logging
+import datetime
+import streamlit as st
+from auth import save_user_data, emotion_events_path
+from chatbot import start_new_chat, reset_chat_rendering
+import analytics
+import storage
+import emotion_events
+from history_index import HistoryIndex
+import session_store
+
+# 여러 페이지와 사이드바에서 함께 사용하는 상태 관리 함수와 화면 구성 요소
+
+logger = logging.getLogger(__name__)
+
+# 감정 아이콘 매핑
+EMOTION_ICONS = {
+    "기쁨": "😊",
+    "슬픔": "😢",
+    "분노": "😠",
+    "불안": "😰",
+    "스트레스": "😫",
+    "외로움": "😔",
+    "후회": "😞",
+    "좌절": "😩",
+    "혼란": "😕",
+    "감사": "🙏"
+}
+
+# 감정 목표 업데이트 함수
+def update_emotion_goal(emotion):
+    """
+    감정에 따라 사용자의 감정 목표 진행도를 업데이트하는 함수
+    """
+    if not st.session_state.logged_in:
+        return
+    
+    username = st.session_state.username
+    user_data = st.session_state.user_data
+    
+    # 활성화된 감정 목표 확인
+    emotion_goals = user_data.get("emotion_goals", {"active_goal": None, "history": []})
+    active_goal = emotion_goals.get("active_goal", None)
+    
+    if not active_goal:
+        return
+    
+    # 목표 감정과 현재 감정 비교
+    target_emotion = active_goal.get("target_emotion")
+    if emotion == target_emotion:
+        # 목표 감정과 일치하는 경우 진행도 증가
+        progress = active_goal.get("progress", 0)
+        # 5% 증가, 최대 100%
+        progress = min(progress + 5, 100)
+        active_goal["progress"] = progress
+        
+        # 성과 기록
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        active_goal.setdefault("achievements", []).append({
+            "date": today,
+            "description": f"목표 감정 '{target_emotion}'을(를) 경험했습니다."
+        })
+        
+        # 목표 달성 시 자동 완료
+        if progress >= 100:
+            active_goal["completed"] = True
+            active_goal["completion_date"] = today
+            emotion_goals["history"].append(active_goal)
+            emotion_goals["active_goal"] = None
+    
+    # 사용자 데이터 업데이트
+    user_data["emotion_goals"] = emotion_goals
+    st.session_state.user_data = user_data
+    
+    # 데이터 저장
+    save_user_data(username, user_data)
+
+# 채팅 기록 인덱스
+def get_history_index():
+    """
+    채팅 기록 페이지용 세션 인덱스를 반환하는 함수 (세션 상태에 없으면 새로 생성)
+    """
+    if 'history_index' not in st.session_state:
+        st.session_state.history_index = HistoryIndex(st.session_state.user_data.get('chat_sessions', []))
+    return st.session_state.history_index
+
+# 감정 분석 데이터 및 채팅 기록 인덱스 갱신
+def track_session_change(old_session, new_session):
+    """
+    채팅 세션의 변경을 감정 집계, 감정 이벤트 로그, 채팅 기록 인덱스에 반영하고
+    다음 저장에서 기록할 세션으로 표시하는 함수
+    old_session: 변경 전 세션 (새 세션이면 None), new_session: 변경 후 세션 (삭제면 None)
+    """
+    if new_session is not None:
+        storage.mark_dirty(st.session_state.user_data, new_session['id'])
+    analytics.update_session(analytics.get_stats(st.session_state.user_data), old_session, new_session)
+    emotion_events.record_session_change(emotion_events_path(st.session_state.username), old_session, new_session)
+    if 'history_index' in st.session_state:
+        st.session_state.history_index.update(old_session, new_session)
+
+# 공유 세션 상태 동기화 (SESSION_STORE가 local이면 아무 일도 하지 않음)
+# 상태는 사용자와 브라우저 탭별로 따로 보관합니다. 탭 식별자는 주소의 tab 쿼리 매개변수에 두어
+# 다른 프로세스로 다시 연결되어도 같은 탭의 대화만 이어받고, 같은 사용자의 다른 탭 대화를 덮어쓰지 않습니다.
+def _shared_state_key():
+    """
+    공유 저장소에서 이 탭의 상태를 찾는 키를 반환하는 함수
+    (주소에 탭 식별자가 없으면 새로 만들어 주소에 추가)
+    """
+    tab = st.query_params.get('tab')
+    if not tab:
+        tab = st.session_state.get('shared_state_tab') or uuid.uuid4().hex
+        st.query_params['tab'] = tab
+    st.session_state.shared_state_tab = tab
+    return f"{st.session_state.username}.tab.{tab}"
+
+def _shared_state_fingerprint():
+    """
+    진행 중인 대화 상태가 바뀌었는지 확인하기 위한 요약값을 만드는 함수
+    (메시지는 추가되거나 마지막 두 개의 감정 태그만 바뀌므로 전체를 비교하지 않음)
+    """
+    messages = st.session_state.get('messages') or []
+    return (
+        len(messages),
+        repr(messages[-2:]),
+        st.session_state.get('current_chat_id'),
+        st.session_state.get('selected_emotion'),
+        st.session_state.get('chat_started'),
+    )
+
+def restore_shared_state():
+    """
+    이 탭의 연결이 다른 프로세스로 옮겨졌을 때 그 프로세스에서 더 최근에 저장한 진행 중인 대화 상태를 가져오는 함수
+    """
+    store = session_store.get_store()
+    if store is None or not st.session_state.get('logged_in'):
+        return
+    try:
+        record = store.load(_shared_state_key())
+    except Exception:
+        logger.exception("공유 세션 상태 로드 오류")
+        return
+    if record is None or record['version'] <= st.session_state.get('shared_state_version', 0):
+        return
+    
+    st.session_state.shared_state_version = record['version']
+    if record['state'] is None:
+        return
+    for key in session_store.SHARED_KEYS:
+        if key in record['state']:
+            st.session_state[key] = record['state'][key]
+    if record['state'].get('current_chat_id') is None:
+        st.session_state.pop('current_chat_id', None)
+    reset_chat_rendering()
+    st.session_state.shared_state_fingerprint = _shared_state_fingerprint()
+
+def publish_shared_state():
+    """
+    진행 중인 대화 상태가 바뀌었으면 공유 저장소에 저장하는 함수
+    """
+    store = session_store.get_store()
+    if store is None or not st.session_state.get('logged_in') or 'messages' not in st.session_state:
+        return
+    fingerprint = _shared_state_fingerprint()
+    if fingerprint == st.session_state.get('shared_state_fingerprint'):
+        return
+    
+    state = {key: st.session_state.get(key) for key in session_store.SHARED_KEYS}
+    try:
+        st.session_state.shared_state_version = store.save(_shared_state_key(), state)
+        st.session_state.shared_state_fingerprint = fingerprint
+    except Exception:
+        logger.exception("공유 세션 상태 저장 오류")
+
+def clear_shared_state():
+    """
+    로그아웃할 때 공유 저장소에서 이 탭의 진행 중인 대화 상태를 지우는 함수
+    """
+    store = session_store.get_store()
+    if store is None or 'username' not in st.session_state:
+        return
+    try:
+        store.clear(_shared_state_key())
+    except Exception:
+        logger.exception("공유 세션 상태 삭제 오류")
+
+# 감정 선택 저장 처리
+def handle_emotion_selection(emotion):
+    """
+    선택된 감정 처리 및 저장 함수
+    """
+    # 감정 설정
+    st.session_state.selected_emotion = emotion
+    
+    # 현재 채팅 세션에 감정 저장
+    if 'chat_id' not in st.session_state:
+        timestamp = datetime.datetime.now().isoformat()
+        st.session_state.chat_id = f"chat_{timestamp}"
+    
+    chat_id = st.session_state.chat_id
+    
+    # 채팅 세션 업데이트
+    if 'user_data' in st.session_state and 'chat_sessions' in st.session_state.user_data:
+        chat_sessions = st.session_state.user_data['chat_sessions']
+        found = False
+        for i, chat in enumerate(chat_sessions):
+            if chat['id'] == chat_id:
+                # 감정 집계 갱신 (이전 감정 제외 후 새 감정 추가)
+                track_session_change(dict(chat), dict(chat, emotion=emotion))
+                chat['emotion'] = emotion
+                found = True
+                break
+                
+        if not found:
+            # 새 채팅 세션 생성
+            chat_session = {
+                "id": chat_id,
+                "date": datetime.datetime.now().isoformat(),
+                "emotion": emotion,
+                "preview": "새로운 대화",
+                "messages": []
+            }
+            chat_sessions.append(chat_session)
+            track_session_change(None, chat_session)
+        
+        # 채팅 기록 업데이트
+        st.session_state.user_data['chat_sessions'] = chat_sessions
+        
+        # 사용자 데이터 저장
+        save_user_data(st.session_state.username, st.session_state.user_data)
+        
+        # 감정 목표 업데이트
+        update_emotion_goal(emotion)
+    
+    # 새 채팅 시작
+    st.session_state.chat_started = True
+    start_new_chat(emotion)
+    
+    # 화면 갱신
+    st.rerun()
+
+# 페이지네이션
+def get_current_page(total_items, page_size, key="pagination"):
+    """
+    현재 페이지 번호를 반환하는 함수 (항목 수가 줄어든 경우 마지막 페이지로 조정)
+    """
+    # 세션 상태 초기화
+    if f'{key}_page' not in st.session_state:
+        st.session_state[f'{key}_page'] = 0
+    
+    # 전체 페이지 수 계산 (마지막 페이지가 가득 차지 않아도 포함)
+    total_pages = max((total_items + page_size - 1) // page_size, 1)
+    st.session_state[f'{key}_page'] = min(st.session_state[f'{key}_page'], total_pages - 1)
+    return st.session_state[f'{key}_page']
+
+def display_pagination_controls(total_items, page_size, key="pagination"):
+    """
+    이전/다음 버튼과 페이지 정보를 표시하는 함수
+    """
+    total_pages = max((total_items + page_size - 1) // page_size, 1)
+    cols = st.columns([1, 3, 1])
+    
+    # 이전 페이지 버튼
+    with cols[0]:
+        if st.button("← 이전", key=f"{key}_prev", disabled=st.session_state[f'{key}_page'] == 0):
+            st.session_state[f'{key}_page'] = max(0, st.session_state[f'{key}_page'] - 1)
+            st.rerun()
+    
+    # 페이지 정보
+    with cols[1]:
+        st.markdown(f"**{st.session_state[f'{key}_page'] + 1}/{total_pages} 페이지** (총 {total_items}개)")
+    
+    # 다음 페이지 버튼
+    with cols[2]:
+        if st.button("다음 →", key=f"{key}_next", disabled=st.session_state[f'{key}_page'] >= total_pages - 1):
+            st.session_state[f'{key}_page'] = min(total_pages - 1, st.session_state[f'{key}_page'] + 1)
+            st.rerun()
+
+# 현재 채팅 저장 함수
+def save_current_chat():
+    if 'messages' in st.session_state and len(st.session_state.messages) > 1:
+        chat_messages = [msg for msg in st.session_state.messages if msg["role"] != "system"]
+        if not chat_messages:
+            return False
+            
+        # 사용자가 입력한 메시지가 있는지 확인 (어시스턴트의 인사말만 있는 경우는 제외)
+        has_user_message = False
+        for msg in chat_messages:
+            if msg["role"] == "user":
+                has_user_message = True
+                break
+                
+        # 사용자 메시지가 없으면 저장하지 않음
+        if not has_user_message:
+            return False
+            
+        # 감정 값이 없으면 저장하지 않음
+        if not st.session_state.selected_emotion:
+            return False
+            
+        # 기존 채팅 세션 리스트 확인
+        if 'chat_sessions' not in st.session_state.user_data:
+            st.session_state.user_data['chat_sessions'] = []
+            
+        # 현재 채팅의 ID 확인 또는 생성
+        if 'current_chat_id' not in st.session_state:
+            # 채팅 세션 정보 생성
+            timestamp = datetime.datetime.now().isoformat()
+            st.session_state.current_chat_id = f"chat_{timestamp}"
+            
+        chat_id = st.session_state.current_chat_id
+        
+        # 미리보기 텍스트로 사용자 메시지 사용 (없으면 어시스턴트 메시지)
+        chat_preview = "새로운 대화"
+        for msg in chat_messages:
+            if msg["role"] == "user":
+                chat_preview = msg["content"]
+                break
+                
+        # 채팅 세션 정보 구성
+        chat_session = {
+            "id": chat_id,
+            "date": datetime.datetime.now().isoformat(),  # 마지막 수정 시간으로 업데이트
+            "emotion": st.session_state.selected_emotion,
+            "preview": chat_preview,
+            "messages": chat_messages
+        }
+        
+        # 기존 채팅이 있는지 확인하고 업데이트하거나 새로 추가
+        existing_chat_index = None
+        for i, chat in enumerate(st.session_state.user_data['chat_sessions']):
+            if chat['id'] == chat_id:
+                existing_chat_index = i
+                break
+                
+        if existing_chat_index is not None:
+            # 기존 채팅 업데이트
+            old_session = st.session_state.user_data['chat_sessions'][existing_chat_index]
+            st.session_state.user_data['chat_sessions'][existing_chat_index] = chat_session
+            track_session_change(old_session, chat_session)
+        else:
+            # 새 채팅 추가
+            st.session_state.user_data['chat_sessions'].append(chat_session)
+            track_session_change(None, chat_session)
+        
+        # 사용자 데이터 저장
+        save_user_data(st.session_state.username, st.session_state.user_data)
+        return True
+    return False
+
+# 자동 저장 함수
+def auto_save():
+    if (st.session_state.logged_in and 
+        'user_data' in st.session_state and 
+        'username' in st.session_state and
+        'selected_emotion' in st.session_state and 
+        st.session_state.selected_emotion):
+        if 'messages' in st.session_state and len(st.session_state.messages) > 1:
+            save_current_chat()
\ No newline at end of file
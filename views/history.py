@@ -0,0 +1,344 @@
+import os
+import html
+import datetime
+import streamlit as st
+from auth import save_user_data, delete_chat_session, load_chat_messages, search_chat_history, load_chat_summary, submit_chat_summary
+from context_builder import format_summary
+from chatbot import EMOTIONS, get_system_prompt, reset_chat_rendering
+from views.common import EMOTION_ICONS, get_history_index, track_session_change, get_current_page, display_pagination_controls
+
+# 채팅 기록 페이지
+
+
+# 채팅 기록 페이지에 한 번에 표시할 대화 수
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
+# 대화 검색 시 가져올 최대 결과 수
+SEARCH_RESULT_LIMIT = int(os.getenv("SEARCH_RESULT_LIMIT", "200"))
+
+
+def render():
+    """
+    채팅 기록 페이지를 표시하는 함수
+    """
+    st.markdown("<h2 class='sub-header'>채팅 기록</h2>", unsafe_allow_html=True)
+
+    # 채팅 기록이 없는 경우
+    if 'user_data' not in st.session_state or 'chat_sessions' not in st.session_state.user_data or not st.session_state.user_data['chat_sessions']:
+        st.info("저장된 채팅 기록이 없습니다.")
+    else:
+        # 채팅 기록이 있는 경우
+        if st.session_state.selected_chat_id:
+            # 선택된 채팅 세션 표시
+            selected_chat = None
+            selected_chat_index = None
+            for i, chat in enumerate(st.session_state.user_data['chat_sessions']):
+                if chat['id'] == st.session_state.selected_chat_id:
+                    selected_chat = chat
+                    selected_chat_index = i
+                    break
+        
+            if selected_chat:
+                # 뒤로가기 버튼과 삭제 버튼을 나란히 배치
+                col1, col2 = st.columns([1, 1])
+            
+                with col1:
+                    if st.button("← 기록 목록으로 돌아가기"):
+                        st.session_state.selected_chat_id = None
+                        st.rerun()
+            
+                with col2:
+                    # 삭제 확인 상태 확인
+                    if 'confirm_delete_dialog' not in st.session_state:
+                        st.session_state.confirm_delete_dialog = False
+                    
+                    if not st.session_state.confirm_delete_dialog:
+                        if st.button("🗑️ 이 대화 삭제하기", type="primary", use_container_width=True):
+                            st.session_state.confirm_delete_dialog = True
+                            st.rerun()
+                    else:
+                        st.warning("정말 이 대화를 삭제하시겠습니까?")
+                        conf_col1, conf_col2 = st.columns(2)
+                    
+                        with conf_col1:
+                            if st.button("예, 삭제합니다", key="confirm_delete_yes"):
+                                # 선택된 채팅 삭제
+                                deleted_chat = st.session_state.user_data['chat_sessions'].pop(selected_chat_index)
+                                track_session_change(deleted_chat, None)
+                                delete_chat_session(st.session_state.username, deleted_chat['id'])
+                                save_user_data(st.session_state.username, st.session_state.user_data)
+                                st.session_state.selected_chat_id = None
+                                st.session_state.confirm_delete_dialog = False
+                                st.success("대화가 삭제되었습니다.")
+                                st.rerun()
+                    
+                        with conf_col2:
+                            if st.button("아니오", key="confirm_delete_no"):
+                                st.session_state.confirm_delete_dialog = False
+                                st.rerun()
+            
+                # 채팅 세션 정보 표시
+                chat_date = datetime.datetime.fromisoformat(selected_chat['date']).strftime("%Y년 %m월 %d일 %H:%M")
+                emotion = selected_chat.get('emotion', '알 수 없음')
+                emotion_icon = EMOTION_ICONS.get(emotion, "")
+            
+                st.markdown(f"**날짜:** {chat_date}")
+                st.markdown(f"**감정:** {emotion_icon} {emotion}")
+                st.markdown("---")
+            
+                # 메시지 본문은 필요할 때만 로드 (현재 방문 중 저장된 대화는 이미 메모리에 있음)
+                if 'messages' in selected_chat:
+                    chat_messages = selected_chat['messages']
+                else:
+                    chat_messages = load_chat_messages(st.session_state.username, selected_chat['id'])
+            
+                # 백그라운드에서 계산된 대화 요약 표시
+                chat_summary = load_chat_summary(st.session_state.username, selected_chat['id'])
+                if chat_summary:
+                    with st.expander("대화 요약"):
+                        st.markdown(format_summary(chat_summary))
+            
+                # 채팅 내용 표시
+                for msg in chat_messages:
+                    role = msg.get('role', '')
+                    content = msg.get('content', '')
+                
+                    if role == 'user':
+                        st.chat_message("user").write(content)
+                    elif role == 'assistant':
+                        st.chat_message("assistant").write(content)
+            
+                # 채팅 계속하기 버튼
+                if st.button("이 대화 계속하기"):
+                    # 진행 중이던 다른 대화는 끝난 것으로 보고 요약 예약
+                    previous_chat_id = st.session_state.get('current_chat_id')
+                    if previous_chat_id and previous_chat_id != selected_chat['id']:
+                        submit_chat_summary(st.session_state.username, previous_chat_id, st.session_state.get('selected_emotion'))
+                    
+                    st.session_state.active_page = "chat"
+                    st.session_state.selected_emotion = selected_chat.get('emotion', None)
+                    st.session_state.chat_started = True
+                
+                    # 기존 채팅 ID 사용
+                    st.session_state.current_chat_id = selected_chat['id']
+                
+                    # 메시지 표시 범위 초기화
+                    reset_chat_rendering()
+                
+                    # 채팅 메시지 복원
+                    st.session_state.messages = []
+                
+                    # 시스템 메시지 추가
+                    system_prompt = get_system_prompt(selected_chat.get('emotion', None))
+                    st.session_state.messages.append({"role": "system", "content": system_prompt})
+                
+                    # 대화 메시지 추가
+                    for msg in chat_messages:
+                        st.session_state.messages.append(msg)
+                
+                    # 저장된 요약이 있으면 전체 대화 대신 요약과 최근 메시지만 API에 보냄 (지난 대화 기억은 보내지 않음)
+                    st.session_state.chat_summary = chat_summary
+                    st.session_state.chat_memory = ""
+                
+                    st.rerun()
+            else:
+                st.error("선택한 채팅을 찾을 수 없습니다.")
+                st.session_state.selected_chat_id = None
+        else:
+            # 필터링 옵션 초기화
+            if 'filter_emotion' not in st.session_state:
+                st.session_state.filter_emotion = []
+            if 'filter_date_start' not in st.session_state:
+                st.session_state.filter_date_start = None
+            if 'filter_date_end' not in st.session_state:
+                st.session_state.filter_date_end = None
+        
+            # 대화 내용 검색
+            search_query = st.text_input(
+                "대화 검색",
+                placeholder="지난 대화에서 찾을 내용을 입력하세요",
+                key="history_search_query"
+            ).strip()
+        
+            # 필터링 옵션 UI
+            with st.expander("필터 옵션", expanded=False):
+                st.markdown("<div class='filter-section'>", unsafe_allow_html=True)
+                st.markdown("<div class='filter-title'>채팅 기록 필터링</div>", unsafe_allow_html=True)
+            
+                # 감정 필터
+                st.markdown("<div class='filter-item'><strong>감정 선택</strong></div>", unsafe_allow_html=True)
+                emotions_list = list(EMOTIONS.keys())
+            
+                # 감정 필터 UI를 더 효율적으로 표시
+                cols = st.columns(5)  # 한 행에 5개씩 표시
+                selected_emotions = []
+            
+                for i, emotion in enumerate(emotions_list):
+                    col_idx = i % 5
+                    emotion_icon = EMOTION_ICONS.get(emotion, "")
+                    emotion_selected = cols[col_idx].checkbox(
+                        f"{emotion_icon} {emotion}", 
+                        value=emotion in st.session_state.filter_emotion,
+                        key=f"filter_{emotion}"
+                    )
+                    if emotion_selected:
+                        selected_emotions.append(emotion)
+            
+                st.session_state.filter_emotion = selected_emotions
+            
+                # 날짜 필터 (시작 및 종료 날짜)
+                st.markdown("<div class='filter-item'><strong>날짜 범위 선택</strong></div>", unsafe_allow_html=True)
+            
+                date_col1, date_col2 = st.columns(2)
+            
+                with date_col1:
+                    start_date = st.date_input(
+                        "시작 날짜", 
+                        value=st.session_state.filter_date_start if st.session_state.filter_date_start else None,
+                        format="YYYY-MM-DD"
+                    )
+                    if start_date:
+                        st.session_state.filter_date_start = datetime.datetime.combine(start_date, datetime.time.min)
+                
+                with date_col2:
+                    end_date = st.date_input(
+                        "종료 날짜", 
+                        value=st.session_state.filter_date_end if st.session_state.filter_date_end else None,
+                        format="YYYY-MM-DD"
+                    )
+                    if end_date:
+                        st.session_state.filter_date_end = datetime.datetime.combine(end_date, datetime.time.max)
+            
+                # 필터 초기화 버튼
+                if st.button("필터 초기화", type="secondary", use_container_width=True):
+                    st.session_state.filter_emotion = []
+                    st.session_state.filter_date_start = None
+                    st.session_state.filter_date_end = None
+                    st.rerun()
+            
+                st.markdown("</div>", unsafe_allow_html=True)
+        
+            # 필터가 바뀌면 첫 페이지부터 표시
+            filter_key = (
+                search_query,
+                tuple(st.session_state.filter_emotion),
+                st.session_state.filter_date_start,
+                st.session_state.filter_date_end
+            )
+            if st.session_state.get('history_filter_key') != filter_key:
+                st.session_state.history_filter_key = filter_key
+                st.session_state.history_page = 0
+        
+            history_index = get_history_index()
+            search_snippets = {}
+            if search_query:
+                # 검색어가 있으면 검색 색인에서 관련도 순으로 가져온 뒤 필터 적용
+                search_results = [
+                    result for result in search_chat_history(st.session_state.username, search_query, SEARCH_RESULT_LIMIT)
+                    if history_index.matches(
+                        result['session_id'],
+                        emotions=st.session_state.filter_emotion,
+                        start=st.session_state.filter_date_start,
+                        end=st.session_state.filter_date_end
+                    )
+                ]
+                total_sessions = len(search_results)
+                current_page = get_current_page(total_sessions, HISTORY_PAGE_SIZE, key="history")
+                page_results = search_results[current_page * HISTORY_PAGE_SIZE:(current_page + 1) * HISTORY_PAGE_SIZE]
+                filtered_sessions = [history_index.get(result['session_id']) for result in page_results]
+                search_snippets = {result['session_id']: result['snippet'] for result in page_results}
+            else:
+                # 필터링 적용 (날짜순 인덱스에서 이분 탐색, 현재 페이지의 대화만 최신 순으로 반환)
+                total_sessions, _ = history_index.query(
+                    emotions=st.session_state.filter_emotion,
+                    start=st.session_state.filter_date_start,
+                    end=st.session_state.filter_date_end,
+                    limit=0
+                )
+                current_page = get_current_page(total_sessions, HISTORY_PAGE_SIZE, key="history")
+                _, filtered_sessions = history_index.query(
+                    emotions=st.session_state.filter_emotion,
+                    start=st.session_state.filter_date_start,
+                    end=st.session_state.filter_date_end,
+                    offset=current_page * HISTORY_PAGE_SIZE,
+                    limit=HISTORY_PAGE_SIZE
+                )
+        
+            # 필터링 결과 안내
+            if st.session_state.filter_emotion or st.session_state.filter_date_start or st.session_state.filter_date_end:
+                st.markdown("<div style='margin-bottom: 15px;'>", unsafe_allow_html=True)
+                st.markdown("<strong>적용된 필터:</strong>", unsafe_allow_html=True)
+            
+                # 감정 필터 배지
+                if st.session_state.filter_emotion:
+                    st.markdown("<div>", unsafe_allow_html=True)
+                    for emotion in st.session_state.filter_emotion:
+                        emotion_icon = EMOTION_ICONS.get(emotion, "")
+                        st.markdown(f"<span class='filter-badge'>{emotion_icon} {emotion}</span>", unsafe_allow_html=True)
+                    st.markdown("</div>", unsafe_allow_html=True)
+            
+                # 날짜 필터 배지
+                if st.session_state.filter_date_start or st.session_state.filter_date_end:
+                    st.markdown("<div>", unsafe_allow_html=True)
+                    if st.session_state.filter_date_start:
+                        start_date_str = st.session_state.filter_date_start.strftime("%Y-%m-%d")
+                        st.markdown(f"<span class='filter-badge'>시작일: {start_date_str}</span>", unsafe_allow_html=True)
+                
+                    if st.session_state.filter_date_end:
+                        end_date_str = st.session_state.filter_date_end.strftime("%Y-%m-%d")
+                        st.markdown(f"<span class='filter-badge'>종료일: {end_date_str}</span>", unsafe_allow_html=True)
+                    st.markdown("</div>", unsafe_allow_html=True)
+            
+                st.markdown("</div>", unsafe_allow_html=True)
+            
+                if not filtered_sessions:
+                    st.warning("필터 조건에 맞는 채팅 기록이 없습니다.")
+        
+            if search_query and not filtered_sessions:
+                st.warning(f"'{search_query}'에 대한 검색 결과가 없습니다.")
+        
+            # 결과 갯수 표시
+            if filtered_sessions:
+                st.markdown(f"<div style='margin-bottom: 10px;'><strong>{total_sessions}개</strong>의 대화 기록이 있습니다.</div>", unsafe_allow_html=True)
+        
+            # 필터링된 채팅 기록 표시
+            for chat in filtered_sessions:
+                # 검색 결과는 미리보기 대신 일치한 메시지 부분을 표시
+                if chat['id'] in search_snippets:
+                    card_preview = html.escape(search_snippets[chat['id']])
+                else:
+                    card_preview = f"{chat.get('preview', '대화 내용 없음')[:100]}..."
+            
+                # 카드 컨테이너 (상대 위치로 설정)
+                card_container = st.container()
+            
+                with card_container:
+                    # 로그인 버튼과 충돌하지 않도록 div에 특정 클래스 추가
+                    st.markdown('<div class="chat-history-card">', unsafe_allow_html=True)
+                
+                    # 카드 스타일 컨테이너
+                    st.markdown(f"""
+                    <div class="chat-card">
+                        <div class="chat-card-header">
+                            <span class="chat-card-emotion">{EMOTION_ICONS.get(chat.get('emotion', ''), '')} {chat.get('emotion', '알 수 없음')}</span>
+                            <span class="chat-card-date">{datetime.datetime.fromisoformat(chat.get('date', '')).strftime("%Y년 %m월 %d일 %H:%M")}</span>
+                        </div>
+                        <div class="chat-card-preview">{card_preview}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                    # 카드 클릭 감지를 위한 버튼 (숨김)
+                    card_clicked = st.button(
+                        "보기",
+                        key=f"chat_card_{chat['id']}"
+                    )
+                
+                    st.markdown('</div>', unsafe_allow_html=True)
+                
+                    if card_clicked:
+                        st.session_state.selected_chat_id = chat['id']
+                        st.rerun()
+        
+            # 페이지 이동 (대화가 한 페이지를 넘을 때만 표시)
+            if total_sessions > HISTORY_PAGE_SIZE:
+                display_pagination_controls(total_sessions, HISTORY_PAGE_SIZE, key="history")
\ No newline at end of file
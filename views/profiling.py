@@ -0,0 +1,86 @@
+import pandas as pd
+import streamlit as st
+import profiling
+
+# 성능 프로파일 페이지 (ADMIN_USERS에 등록된 사용자만 접근)
+
+# 측정값 이름 접미사별 표시 단위와 배율
+UNITS = {
+    "_seconds": ("ms", 1000),
+    "_bytes": ("KB", 1 / 1024),
+    "_tokens": ("토큰", 1),
+}
+
+
+def get_unit(name):
+    """
+    측정값 이름에 맞는 표시 단위와 배율을 반환하는 함수
+    """
+    for suffix, unit in UNITS.items():
+        if name.endswith(suffix):
+            return unit
+    return UNITS["_seconds"]
+
+
+def format_labels(labels):
+    """
+    레이블을 "page=chat, call=chat" 형식의 문자열로 만드는 함수
+    """
+    return ", ".join(f"{label}={value}" for label, value in labels.items()) or "-"
+
+
+def render():
+    """
+    성능 프로파일 페이지를 표시하는 함수
+    """
+    st.markdown("<h2 class='sub-header'>성능 프로파일</h2>", unsafe_allow_html=True)
+
+    if not profiling.is_admin(st.session_state.get("username")):
+        st.error("관리자만 볼 수 있는 페이지입니다.")
+        return
+
+    st.caption(
+        "이 프로세스가 시작된 뒤 모든 사용자 세션에서 모은 측정값입니다. "
+        f"JSONL: {profiling.PROFILE_LOG_PATH or '기록 안 함'} · Prometheus: {profiling.PROFILE_METRICS_PATH or '기록 안 함'}"
+    )
+
+    all_series = profiling.snapshot()
+    if not all_series:
+        st.info("아직 측정값이 없습니다.")
+        return
+
+    # 항목별 요약 (분위수는 히스토그램 구간에서 추정)
+    summary = []
+    for series in all_series:
+        unit, scale = get_unit(series["name"])
+        quantiles = [profiling.quantile(series, q) for q in (0.5, 0.95, 0.99)]
+        summary.append({
+            "측정 항목": series["name"],
+            "레이블": format_labels(series["labels"]),
+            "횟수": series["count"],
+            "단위": unit,
+            "평균": round(series["sum"] / series["count"] * scale, 2),
+            "p50": round(quantiles[0] * scale, 2),
+            "p95": round(quantiles[1] * scale, 2),
+            "p99": round(quantiles[2] * scale, 2),
+            "합계": round(series["sum"] * scale, 2),
+        })
+    st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+
+    # 선택한 항목의 히스토그램
+    st.markdown("#### 히스토그램")
+    options = [f"{series['name']} ({format_labels(series['labels'])})" for series in all_series]
+    selected = st.selectbox("측정 항목", range(len(options)), format_func=lambda index: options[index], key="profiling_series")
+    series = all_series[selected]
+    unit, scale = get_unit(series["name"])
+    bucket_labels = [f"≤{bound * scale:g}{unit}" for bound in series["buckets"]] + [f">{series['buckets'][-1] * scale:g}{unit}"]
+    histogram_df = pd.DataFrame({"횟수": series["counts"]}, index=pd.Index(bucket_labels, name="구간"))
+    st.bar_chart(histogram_df, sort=False)
+
+    st.download_button(
+        "Prometheus 텍스트 내려받기",
+        profiling.render_prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain",
+        key="profiling_download"
+    )
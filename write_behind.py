@@ -0,0 +1,198 @@
+import os
+import time
+import atexit
+import logging
+import weakref
+import threading
+
+# 쓰기 지연 버퍼 (write-behind)
+#
+# 채팅 한 턴 동안 save_current_chat, 감정 목표 갱신, 자동 저장 등이 같은 사용자 데이터를
+# 여러 번 저장하므로, 저장 요청을 사용자별로 모아 두었다가 마지막 요청 후 WRITE_BEHIND_DELAY초가
+# 지나면 백그라운드 스레드에서 한 번만 기록합니다. 계속 요청이 들어와도 첫 요청 후
+# WRITE_BEHIND_MAX_DELAY초 안에는 반드시 기록합니다.
+#
+# 내구성:
+# - 기록은 storage의 SQLite 트랜잭션으로 이루어지므로 기록 중 프로세스가 죽어도 마지막으로
+#   완료된 상태가 남습니다 (부분 기록 없음).
+# - 프로세스가 비정상 종료되면 최대 WRITE_BEHIND_MAX_DELAY초 동안의 변경이 유실될 수 있습니다.
+#   (공유 세션 저장소를 사용하면 진행 중인 대화는 session_store에 따로 남습니다.)
+# - 로그아웃, 세션 종료(세션 상태가 정리될 때), 정상 종료(atexit) 시에는 바로 기록하며,
+#   같은 사용자의 데이터를 읽기 전에도 flush()로 기록하여 방금 저장한 내용을 읽을 수 있습니다.
+# WRITE_BEHIND_DELAY=0이면 요청할 때마다 바로 기록합니다.
+# 기록에 실패하면 대기 시간을 두 배씩 늘리며 WRITE_BEHIND_MAX_RETRIES번까지 다시 시도하고,
+# 그래도 실패하면 그 예약을 버리고 오류를 기록합니다 (다음 저장 요청은 다시 예약됨).
+#
+# 예약한 데이터는 백그라운드 스레드에서 읽으므로, 호출한 쪽에서 이후에 바꾸지 않을 복사본을
+# 넘겨야 합니다 (사용자 데이터는 auth가 storage.freeze로 복사하여 넘김).
+#
+# 키가 (사용자 이름, 탭 구분값) 같은 튜플이면 탭마다 따로 모으며, flush(사용자 이름)은
+# 그 사용자의 모든 탭의 기록을 수행합니다.
+
+WRITE_BEHIND_DELAY = float(os.getenv("WRITE_BEHIND_DELAY", "2"))
+WRITE_BEHIND_MAX_DELAY = float(os.getenv("WRITE_BEHIND_MAX_DELAY", "10"))
+
+# 기록 실패 시 다시 시도하기까지의 첫 대기 시간과 최대 대기 시간 (초), 최대 재시도 횟수
+RETRY_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+WRITE_BEHIND_MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+
+logger = logging.getLogger(__name__)
+
+_pending = {}       # 키 -> {"write", "data", "first", "due", "attempts"}
+_key_locks = {}     # 키 -> 기록 순서를 맞추기 위한 잠금 (예약이나 기록이 진행 중인 키만)
+_condition = threading.Condition()
+_flusher = None
+_stats = {"scheduled": 0, "written": 0, "errors": 0, "dropped": 0}
+
+def _acquire(key):
+    """
+    키의 잠금을 얻어 반환합니다.
+    기다리는 동안 잠금이 정리되었으면(_release 참고) 새 잠금으로 다시 시도합니다.
+    """
+    while True:
+        with _condition:
+            lock = _key_locks.setdefault(key, threading.Lock())
+        lock.acquire()
+        with _condition:
+            if _key_locks.get(key) is lock:
+                return lock
+        lock.release()
+
+def _release(key, lock):
+    """키의 잠금을 풀고, 남은 예약이 없으면 잠금을 정리합니다 (끝난 탭의 키가 쌓이지 않도록)."""
+    with _condition:
+        if key not in _pending and _key_locks.get(key) is lock:
+            del _key_locks[key]
+    lock.release()
+
+def _matches(pending_key, key):
+    return pending_key == key or (isinstance(pending_key, tuple) and pending_key[0] == key)
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_run_flusher, name="write-behind", daemon=True)
+        _flusher.start()
+
+def schedule(key, write, data):
+    """
+    write(data) 기록을 예약합니다. 같은 키의 이전 예약은 새 데이터로 교체됩니다.
+    key: 사용자 이름 등 기록 대상, write: 실제로 기록하는 함수,
+    data: 기록할 데이터 (예약한 뒤에 바뀌지 않는 복사본)
+    """
+    if WRITE_BEHIND_DELAY <= 0:
+        lock = _acquire(key)
+        try:
+            write(data)
+        finally:
+            _release(key, lock)
+        return
+
+    now = time.monotonic()
+    with _condition:
+        _stats["scheduled"] += 1
+        entry = _pending.get(key)
+        first = entry["first"] if entry else now
+        _pending[key] = {
+            "write": write,
+            "data": data,
+            "first": first,
+            "due": min(now + WRITE_BEHIND_DELAY, first + WRITE_BEHIND_MAX_DELAY),
+            "attempts": 0,
+        }
+        _ensure_flusher()
+        _condition.notify()
+
+def _write(key):
+    """예약된 기록 하나를 수행합니다 (실패하면 다시 예약)."""
+    lock = _acquire(key)
+    try:
+        with _condition:
+            entry = _pending.pop(key, None)
+        if entry is None:
+            return True
+        try:
+            entry["write"](entry["data"])
+        except Exception:
+            with _condition:
+                _stats["errors"] += 1
+                entry["attempts"] += 1
+                if key in _pending:
+                    # 그 사이 새 예약이 있으면 그 예약이 이번 데이터를 대신함
+                    logger.warning("지연 저장 오류 (%s), 새 예약으로 대체합니다", key, exc_info=True)
+                elif entry["attempts"] > WRITE_BEHIND_MAX_RETRIES:
+                    _stats["dropped"] += 1
+                    logger.error("지연 저장 오류 (%s), %d번 실패하여 포기합니다", key, entry["attempts"], exc_info=True)
+                else:
+                    # 대기 시간을 두 배씩 늘려 다시 시도
+                    delay = min(RETRY_DELAY * 2 ** (entry["attempts"] - 1), RETRY_MAX_DELAY)
+                    entry["due"] = time.monotonic() + delay
+                    _pending[key] = entry
+                    logger.warning("지연 저장 오류 (%s), %g초 뒤 다시 시도합니다 (%d번째)",
+                                   key, delay, entry["attempts"], exc_info=True)
+                _condition.notify()
+            return False
+        with _condition:
+            _stats["written"] += 1
+        return True
+    finally:
+        _release(key, lock)
+
+def flush(key):
+    """
+    키(또는 키가 튜플이면 첫 항목이 key인 모든 키)의 예약된 기록을 바로 수행합니다
+    (로그아웃, 데이터 읽기 전). 성공 여부를 반환합니다.
+    백그라운드 스레드가 같은 키를 기록하는 중이면 끝날 때까지 기다립니다.
+    """
+    with _condition:
+        # 기록 중인 키는 _pending에 없으므로 잠금이 있는 키도 함께 확인
+        keys = [k for k in set(_pending) | set(_key_locks) if _matches(k, key)] or [key]
+    results = [_write(k) for k in keys]
+    return all(results)
+
+def flush_all():
+    """예약된 모든 기록을 수행합니다 (프로세스 종료 시)."""
+    with _condition:
+        keys = list(_pending)
+    for key in keys:
+        _write(key)
+
+def _run_flusher():
+    """기한이 지난 기록을 수행하는 백그라운드 스레드"""
+    while True:
+        with _condition:
+            now = time.monotonic()
+            due = [key for key, entry in _pending.items() if entry["due"] <= now]
+            if not due:
+                next_due = min((entry["due"] for entry in _pending.values()), default=None)
+                _condition.wait(None if next_due is None else next_due - now)
+                continue
+        for key in due:
+            _write(key)
+
+def _flush_soon(key):
+    with _condition:
+        for pending_key, entry in _pending.items():
+            if _matches(pending_key, key):
+                entry["due"] = time.monotonic()
+        _condition.notify()
+
+class SessionGuard:
+    """세션 상태에 보관해 두면 세션이 정리될 때 해당 키의 예약된 기록을 바로 수행하게 하는 객체"""
+
+    def __init__(self, key):
+        self.key = key
+        weakref.finalize(self, _flush_soon, key)
+
+def pending_count():
+    """아직 기록되지 않은 예약 수를 반환합니다."""
+    with _condition:
+        return len(_pending)
+
+def get_stats():
+    """예약/기록/오류/포기 횟수를 반환합니다."""
+    with _condition:
+        return dict(_stats)
+
+atexit.register(flush_all)